@@ -2,6 +2,8 @@
 
 from flask import Flask
 from db import db
+from models import ensure_indexes, compact_route_history
+import importlib
 import os
 from dotenv import load_dotenv 
 
@@ -10,8 +12,21 @@ load_dotenv() # <-- ADD THIS LINE to load variables from .env
 # Import blueprints from the backend package
 from backend.auth import auth_bp
 from backend.views import views_bp
-from backend.admin import admin_bp
-from backend.aiservice import ai_bp
+from backend.admin import admin_bp, RISKLOG_PATH
+from backend.aiservice import ai_bp, init_risk_data, init_ai_caches, init_safety_snapshots, load_safety_predictor, risk_data
+from backend import risk_store
+from backend.search_counter import search_counts
+from backend.history_writer import route_history
+from backend.search_index import init_search_index, destination_index
+from backend.safety_snapshot import safety_snapshots
+from backend.data_version import destination_version
+from backend.warmup import health_bp, warmup
+from backend.db_profile import configure_database
+from backend import metrics
+
+def _flag(value):
+    """Reads an on/off setting: 0, false, no and off (any case) mean off."""
+    return str(value).strip().lower() not in ('0', 'false', 'no', 'off', '')
 
 def create_app():
     """Application Factory Pattern"""
@@ -42,20 +57,152 @@ def create_app():
     else:
         app.config['GEMINI_API_KEY'] = os.getenv('GEMINI_API_KEY')
 
+    def setting(name, default=None, cast=str):
+        """Reads a tuning setting from config_local, then the environment, then `default`."""
+        value = getattr(local_config, name, None) if local_config else None
+        if value is None:
+            value = os.getenv(name)
+        return default if value is None else cast(value)
+
+    # Deadline for each Gemini call; slower answers fall back to the built-in texts
+    app.config['GEMINI_TIMEOUT_SECONDS'] = setting('GEMINI_TIMEOUT_SECONDS', 8.0, float)
+
+    # Safety engine behind calculate_safety: 'rule' (default) or 'ml' (Random Forest)
+    app.config['SAFETY_ENGINE'] = setting('SAFETY_ENGINE', 'rule')
+
+    # How often each worker checks whether another worker changed the risk data (0 disables)
+    app.config['RISK_DATA_POLL_SECONDS'] = setting('RISK_DATA_POLL_SECONDS', 5.0, float)
+
+    # Risk data snapshots are saved here and memory-mapped by every worker on the host ('' = per-worker copies)
+    app.config['RISK_DATA_SHARED_DIR'] = setting('RISK_DATA_SHARED_DIR', os.path.join(app.instance_path, 'risk_data'))
+
+    # Gemini prediction cache: 'memory' (per worker) or 'sqlite' (shared by all workers on the host)
+    app.config['PREDICTION_CACHE_BACKEND'] = setting('PREDICTION_CACHE_BACKEND', 'memory')
+    app.config['PREDICTION_CACHE_PATH'] = setting('PREDICTION_CACHE_PATH', os.path.join(app.instance_path, 'ai_cache.sqlite'))
+    app.config['PREDICTION_CACHE_TTL_SECONDS'] = setting('PREDICTION_CACHE_TTL_SECONDS', 6 * 3600, float)
+    app.config['PREDICTION_CACHE_SIZE'] = setting('PREDICTION_CACHE_SIZE', 512, int)
+
+    # Destination search clicks are buffered and written in one batch this often (0 = write-through)
+    app.config['SEARCH_COUNT_FLUSH_SECONDS'] = setting('SEARCH_COUNT_FLUSH_SECONDS', 5.0, float)
+
+    # Route history is queued and written in bulk this often, or once a batch is full (0 = write-through)
+    app.config['ROUTE_HISTORY_FLUSH_SECONDS'] = setting('ROUTE_HISTORY_FLUSH_SECONDS', 0.5, float)
+    app.config['ROUTE_HISTORY_BATCH_SIZE'] = setting('ROUTE_HISTORY_BATCH_SIZE', 200, int)
+    app.config['ROUTE_HISTORY_QUEUE_SIZE'] = setting('ROUTE_HISTORY_QUEUE_SIZE', 10000, int)
+
+    # How strongly route planning avoids risky districts (0 = plain shortest path)
+    app.config['ROUTE_SAFETY_WEIGHT'] = setting('ROUTE_SAFETY_WEIGHT', 0.5, float)
+
+    # Planned routes kept per worker for repeated route requests (0 disables)
+    app.config['ROUTE_CACHE_SIZE'] = setting('ROUTE_CACHE_SIZE', 256, int)
+
+    # Precomputed safety scores are recomputed when the risk data changes and at least this often (0 = score live)
+    app.config['SAFETY_SNAPSHOT_MAX_AGE_SECONDS'] = setting('SAFETY_SNAPSHOT_MAX_AGE_SECONDS', 3600, float)
+
+    # 'eager' loads everything before serving; 'lazy' serves at once and warms up in the background (see /readyz)
+    app.config['STARTUP_MODE'] = setting('STARTUP_MODE', 'eager')
+
+    # Create missing tables and indexes on every boot; turn off once the schema is deployed (flask init-db)
+    app.config['DB_AUTO_CREATE'] = setting('DB_AUTO_CREATE', True, _flag)
+
+    # Connection pool profile: 'auto' (from the URI scheme), 'sqlite' (development) or 'mysql' (production);
+    # the DB_POOL_* and statement timeout settings override single values of the profile
+    app.config['DB_PROFILE'] = setting('DB_PROFILE', 'auto')
+    app.config['DB_POOL_SIZE'] = setting('DB_POOL_SIZE', None, int)
+    app.config['DB_MAX_OVERFLOW'] = setting('DB_MAX_OVERFLOW', None, int)
+    app.config['DB_POOL_TIMEOUT'] = setting('DB_POOL_TIMEOUT', None, float)
+    app.config['DB_POOL_RECYCLE'] = setting('DB_POOL_RECYCLE', None, int)
+    app.config['DB_POOL_PRE_PING'] = setting('DB_POOL_PRE_PING', None, _flag)
+    app.config['DB_STATEMENT_TIMEOUT_SECONDS'] = setting('DB_STATEMENT_TIMEOUT_SECONDS', 30, int)
+
+    # Read replica for the destination search pages ('' = read from the primary); reads stay on the
+    # primary for this long after an admin changes the destinations, while the replica catches up
+    app.config['DB_REPLICA_URI'] = setting('DB_REPLICA_URI', '')
+    app.config['DB_REPLICA_MAX_LAG_SECONDS'] = setting('DB_REPLICA_MAX_LAG_SECONDS', 5.0, float)
+
+    # Request, SQL, Gemini and safety timings on /metrics (Prometheus text format, per worker)
+    app.config['METRICS_ENABLED'] = setting('METRICS_ENABLED', True, _flag)
+    # Requests slower than this are logged with their SQL count and time (0 disables)
+    app.config['SLOW_REQUEST_SECONDS'] = setting('SLOW_REQUEST_SECONDS', 1.0, float)
+    # Share of requests run under cProfile; the profiles of slow ones are saved to METRICS_PROFILE_DIR (0 disables)
+    app.config['METRICS_PROFILE_SAMPLE_RATE'] = setting('METRICS_PROFILE_SAMPLE_RATE', 0.0, float)
+    app.config['METRICS_PROFILE_DIR'] = setting('METRICS_PROFILE_DIR', os.path.join(app.instance_path, 'profiles'))
+
     # --- Initialize Extensions ---
+    configure_database(app)
     db.init_app(app)
+    metrics.init_app(app)
 
     # --- Register Blueprints ---
     app.register_blueprint(auth_bp)
     app.register_blueprint(views_bp)
     app.register_blueprint(admin_bp)
     app.register_blueprint(ai_bp)
+    app.register_blueprint(health_bp)
 
-    with app.app_context():
-        db.create_all()
+    def prepare_database():
+        with app.app_context():
+            db.create_all()
+            ensure_indexes()
+            # Seed the RiskEvent table from the legacy CSV once
+            risk_store.ensure_imported(RISKLOG_PATH)
+
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Creates the tables and indexes, seeds the risk log and compacts old route history."""
+        prepare_database()
+        with app.app_context():
+            compact_route_history()
+        print("Database ready.")
+
+    @app.cli.command('compact-route-history')
+    def compact_route_history_command():
+        """Rewrites route history saved in the old JSON layout in the compact stops encoding."""
+        with app.app_context():
+            print(f"Compacted {compact_route_history()} route history rows.")
+
+    init_ai_caches(app)
+    search_counts.init_app(app)
+    route_history.init_app(app)
+    # Shared destination data version: admin writes bump it, per-worker caches follow it
+    destination_version.configure(os.path.join(app.instance_path, 'destinations.version'))
+
+    # --- Startup Steps ---
+    # The model (scikit-learn) and the Gemini SDK are only imported when used, so these
+    # are the slow part of startup; lazy mode runs them after the app starts serving.
+    lazy = app.config['STARTUP_MODE'] == 'lazy'
+    if app.config['DB_AUTO_CREATE']:
+        warmup.add('database', prepare_database)
+    warmup.add('risk_data', lambda: init_risk_data(app))
+    warmup.add('search_index', lambda: init_search_index(app, background=not lazy))
+    if app.config['SAFETY_ENGINE'] == 'ml':
+        warmup.add('safety_model', load_safety_predictor)
+    warmup.add('safety_snapshot', lambda: init_safety_snapshots(app))
+    if lazy and app.config['GEMINI_API_KEY']:
+        warmup.add('gemini_sdk', lambda: importlib.import_module('google.generativeai'))
+    if lazy:
+        warmup.start()
+    else:
+        warmup.run()
 
     return app
 
+def init_worker(app):
+    """
+    Per-process setup for a worker forked from a preloaded app (see gunicorn.conf.py):
+    pooled database connections and background threads are not inherited safely.
+    The risk data snapshot is, as read-only mapped files shared with the master.
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    risk_data.after_fork()
+    search_counts.after_fork()
+    route_history.after_fork()
+    destination_index.after_fork()
+    safety_snapshots.after_fork()
+    warmup.after_fork()
+
 if __name__ == '__main__':
     app = create_app()
     app.run(debug=True)
\ No newline at end of file
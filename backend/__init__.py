@@ -13,4 +13,7 @@ admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
 # Blueprint for the AI service API
 # (This is already in aiservice.py, but defining here is good practice for consistency)
-ai_bp = Blueprint('ai_service', __name__)
\ No newline at end of file
+ai_bp = Blueprint('ai_service', __name__)
+
+# Blueprint for the liveness and readiness probes
+health_bp = Blueprint('health', __name__)
@@ -2,9 +2,17 @@
 
 from flask import render_template, redirect, url_for, request, jsonify, flash
 from . import admin_bp
-from models import db, User, Destination # Removed SafetyRating import
-import pandas as pd
+from models import db, User, Destination, RiskEvent # Removed SafetyRating import
+import datetime
 from backend.auth import admin_required
+from backend.aiservice import apply_risk_event_changes, clear_route_cache, risk_data
+from backend.safety_snapshot import safety_snapshots
+from backend import risk_store
+from backend.search_counter import search_counts
+from backend.search_index import destination_changed
+from backend.http_cache import download_responses, conditional_response
+from backend.db_profile import pool_stats
+from backend.pagination import page_size, encode_cursor, decode_cursor, keyset_page
 
 # --- Constants ---
 KERALA_DISTRICTS = sorted([
@@ -12,7 +20,19 @@ KERALA_DISTRICTS = sorted([
     "Kottayam", "Kozhikode", "Malappuram", "Palakkad", "Pathanamthitta",
     "Thiruvananthapuram", "Thrissur", "Wayanad"
 ])
-RISKLOG_PATH = 'static/data/risklog.csv'
+RISKLOG_PATH = 'static/data/risklog.csv'  # Legacy CSV, imported into RiskEvent on first start
+ADMIN_PAGE_SIZE = 50
+
+# --- Keyset pagination ---
+def _destination_page(cursor, limit):
+    """One page of destinations ordered by (Name, Destination_id) and the next cursor."""
+    rows, last = keyset_page(Destination.query, [Destination.Name, Destination.Destination_id], decode_cursor(cursor), limit)
+    return rows, encode_cursor(last) if last else None
+
+def _risk_event_page(cursor, limit):
+    """One page of risk log rows ordered by id and the next cursor."""
+    rows, last = keyset_page(RiskEvent.query, [RiskEvent.id], decode_cursor(cursor), limit)
+    return [event.to_dict() for event in rows], encode_cursor(last) if last else None
 
 # --- Core Admin Routes ---
 @admin_bp.route('/')
@@ -27,6 +47,7 @@ def dashboard():
     total_destinations = Destination.query.count()
     top_search_name = "N/A"
     try:
+        search_counts.flush()  # this worker's buffered clicks; other workers flush within their interval
         top_destination = Destination.query.filter(Destination.search_count > 0).order_by(Destination.search_count.desc()).first()
         if top_destination:
             top_search_name = top_destination.Place
@@ -41,11 +62,20 @@ def dashboard():
 @admin_bp.route('/manage_destination')
 @admin_required
 def manage_destination():
-    destinations = Destination.query.order_by(Destination.Name).all()
+    destinations, next_cursor = _destination_page(None, ADMIN_PAGE_SIZE)
     return render_template('admin/manage_destination.html', 
-                           destinations=destinations, all_districts=KERALA_DISTRICTS, 
+                           destinations=destinations, next_cursor=next_cursor, all_districts=KERALA_DISTRICTS, 
                            active_page='destinations')
 
+@admin_bp.route('/api/destinations')
+@admin_required
+def api_destinations():
+    """Next page of the destination table, rendered as rows."""
+    destinations, next_cursor = _destination_page(request.args.get('cursor'),
+                                                  page_size(request.args.get('limit'), default=ADMIN_PAGE_SIZE))
+    return jsonify({'html': render_template('admin/_destination_rows.html', destinations=destinations),
+                    'next_cursor': next_cursor})
+
 @admin_bp.route('/add-destination', methods=['POST'])
 @admin_required
 def add_destination():
@@ -59,6 +89,8 @@ def add_destination():
         )
         db.session.add(new_dest)
         db.session.commit()
+        destination_changed(new_dest)
+        clear_route_cache()
         return jsonify({'success': True, 'message': 'Destination added successfully!'})
     except Exception as e:
         db.session.rollback()
@@ -78,6 +110,8 @@ def update_destination(dest_id):
         dest.budget = data.get('budget', dest.budget)
         dest.image_url = data.get('image_url', dest.image_url)
         db.session.commit()
+        destination_changed(dest)
+        clear_route_cache()
         return jsonify({'success': True, 'message': 'Destination updated successfully!'})
     except Exception as e:
         db.session.rollback()
@@ -90,51 +124,67 @@ def delete_destination(dest_id):
         dest = Destination.query.get_or_404(dest_id)
         db.session.delete(dest)
         db.session.commit()
+        destination_changed(deleted_id=dest_id)
+        clear_route_cache()
         flash('Destination deleted successfully!', 'success')
     except Exception as e:
         db.session.rollback()
         flash(f'Error deleting destination: {str(e)}', 'danger')
     return redirect(url_for('admin.manage_destination'))
 
-# --- Risk Log CSV Manager Routes (Formerly Safety Monitor) ---
+# --- Risk Log Manager Routes (Formerly Safety Monitor) ---
+def _risk_event_from_form(event):
+    """Copies the risk log form fields onto a RiskEvent."""
+    event.date = datetime.datetime.strptime(request.form['date'], '%Y-%m-%d').date()
+    event.district = request.form['district']
+    event.place = request.form['place']
+    event.temperature_c = float(request.form['temperature_c'])
+    event.rainfall_mm = float(request.form['rainfall_mm'])
+    event.humidity_percent = int(request.form['humidity_percent'])
+    event.disease_cases = int(request.form['disease_cases'])
+    event.disaster_event = request.form['disaster_event']
+    event.description = request.form['description']
+    return event
+
 @admin_bp.route('/monitor')
 @admin_required
 def monitor():
     try:
-        df = pd.read_csv(RISKLOG_PATH, skipinitialspace=True)
-        df.reset_index(inplace=True)
-        risk_log_data = df.to_dict(orient='records')
-    except FileNotFoundError:
-        flash('risklog.csv not found. You can add the first entry to create it.', 'warning')
-        risk_log_data = []
+        risk_log_data, next_cursor = _risk_event_page(None, ADMIN_PAGE_SIZE)
     except Exception as e:
-        flash(f'Error reading risk log file: {e}', 'danger')
-        risk_log_data = []
+        flash(f'Error reading risk log: {e}', 'danger')
+        risk_log_data, next_cursor = [], None
         
     return render_template('admin/monitor.html', 
                            risk_log_data=risk_log_data,
+                           next_cursor=next_cursor,
+                           risk_data_status=risk_data.status(),
+                           risk_data_memory=risk_data.memory_report(),
+                           safety_snapshot_status=safety_snapshots.status(),
                            all_districts=KERALA_DISTRICTS,
                            active_page='monitor')
 
+@admin_bp.route('/api/risk-events')
+@admin_required
+def api_risk_events():
+    """Next page of the risk log table, rendered as rows."""
+    risk_log_data, next_cursor = _risk_event_page(request.args.get('cursor'),
+                                                  page_size(request.args.get('limit'), default=ADMIN_PAGE_SIZE))
+    return jsonify({'html': render_template('admin/_risk_event_rows.html', risk_log_data=risk_log_data),
+                    'next_cursor': next_cursor})
+
 @admin_bp.route('/add-risk-log-row', methods=['POST'])
 @admin_required
 def add_risk_log_row():
     try:
-        new_data = {
-            'date': [request.form['date']], 'district': [request.form['district']], 'place': [request.form['place']],
-            'temperature_c': [float(request.form['temperature_c'])], 'rainfall_mm': [float(request.form['rainfall_mm'])],
-            'humidity_percent': [int(request.form['humidity_percent'])], 'disease_cases': [int(request.form['disease_cases'])],
-            'disaster_event': [request.form['disaster_event']], 'description': [request.form['description']]
-        }
-        new_row_df = pd.DataFrame(new_data)
-        try:
-            df = pd.read_csv(RISKLOG_PATH)
-            df = pd.concat([df, new_row_df], ignore_index=True)
-        except FileNotFoundError:
-            df = new_row_df
-        df.to_csv(RISKLOG_PATH, index=False)
+        new_event = _risk_event_from_form(RiskEvent())
+        db.session.add(new_event)
+        db.session.commit()
+        apply_risk_event_changes(upserted=[new_event.to_dict()])
+        clear_route_cache()
         flash('New risk log entry added successfully!', 'success')
     except Exception as e:
+        db.session.rollback()
         flash(f'Error adding entry: {e}', 'danger')
     return redirect(url_for('admin.monitor'))
 
@@ -142,23 +192,18 @@ def add_risk_log_row():
 @admin_required
 def update_risk_log_row():
     try:
-        row_index = int(request.form['row_index'])
-        df = pd.read_csv(RISKLOG_PATH)
-        if not (0 <= row_index < len(df)):
+        event_id = int(request.form['row_index'])
+        event = RiskEvent.query.get(event_id)
+        if not event:
             flash('Invalid row index for update.', 'danger')
             return redirect(url_for('admin.monitor'))
-        df.loc[row_index, 'date'] = request.form['date']
-        df.loc[row_index, 'district'] = request.form['district']
-        df.loc[row_index, 'place'] = request.form['place']
-        df.loc[row_index, 'temperature_c'] = float(request.form['temperature_c'])
-        df.loc[row_index, 'rainfall_mm'] = float(request.form['rainfall_mm'])
-        df.loc[row_index, 'humidity_percent'] = int(request.form['humidity_percent'])
-        df.loc[row_index, 'disease_cases'] = int(request.form['disease_cases'])
-        df.loc[row_index, 'disaster_event'] = request.form['disaster_event']
-        df.loc[row_index, 'description'] = request.form['description']
-        df.to_csv(RISKLOG_PATH, index=False)
-        flash(f'Row {row_index} updated successfully!', 'success')
+        _risk_event_from_form(event)
+        db.session.commit()
+        apply_risk_event_changes(upserted=[event.to_dict()])
+        clear_route_cache()
+        flash(f'Row {event_id} updated successfully!', 'success')
     except Exception as e:
+        db.session.rollback()
         flash(f'Error updating row: {e}', 'danger')
     return redirect(url_for('admin.monitor'))
 
@@ -166,31 +211,66 @@ def update_risk_log_row():
 @admin_required
 def delete_risk_log_row(row_index):
     try:
-        df = pd.read_csv(RISKLOG_PATH)
-        df = df.drop(index=row_index).reset_index(drop=True)
-        df.to_csv(RISKLOG_PATH, index=False)
+        event = RiskEvent.query.get_or_404(row_index)
+        db.session.delete(event)
+        db.session.commit()
+        apply_risk_event_changes(deleted_ids=[row_index])
+        clear_route_cache()
         flash(f'Row {row_index} deleted successfully!', 'success')
     except Exception as e:
+        db.session.rollback()
         flash(f'Error deleting row: {e}', 'danger')
     return redirect(url_for('admin.monitor'))
 
+@admin_bp.route('/reload-risk-data', methods=['POST'])
+@admin_required
+def reload_risk_data():
+    """Reloads the in-memory risk data in every worker, in the background."""
+    risk_data.request_reload()
+    clear_route_cache()
+    flash('Risk data reload started. All workers will pick up the latest events shortly.', 'success')
+    return redirect(url_for('admin.monitor'))
+
+@admin_bp.route('/refresh-safety-snapshot', methods=['POST'])
+@admin_required
+def refresh_safety_snapshot():
+    """Recomputes the precomputed safety scores now instead of waiting for the scheduler."""
+    if safety_snapshots.refresh_async() is None:
+        flash('Safety scores are already being recomputed, or precomputed scores are disabled.', 'warning')
+    else:
+        flash('Safety score refresh started. All workers will use the new scores shortly.', 'success')
+    return redirect(url_for('admin.monitor'))
+
+@admin_bp.route('/api/db-pool-stats')
+@admin_required
+def api_db_pool_stats():
+    """Connection pool occupancy and checkout wait times of this worker, per database, for ops dashboards."""
+    return jsonify(pool_stats())
+
+@admin_bp.route('/export-risk-log')
+@admin_required
+def export_risk_log():
+    """Downloads the risk log in the original risklog.csv layout; unchanged since the last download -> 304."""
+    # Every risk log write publishes a new version, so the export is only rebuilt after one
+    return conditional_response(download_responses, risk_data.published_version(), 'risklog.csv',
+                                risk_store.export_csv, mimetype='text/csv', cache_control='private, no-cache',
+                                headers={'Content-Disposition': 'attachment; filename=risklog.csv'})
+
 # --- Safety Analysis Visualization Route ---
 @admin_bp.route('/safety-analysis')
 @admin_required
 def safety_analysis():
     safety_data = []
     try:
-        df = pd.read_csv(RISKLOG_PATH, skipinitialspace=True)
-        df.columns = [c.strip().lower().replace(' ', '_') for c in df.columns]
-        df['date'] = pd.to_datetime(df['date'], errors='coerce').dt.strftime('%Y-%m-%d')
-        df = df.where(pd.notnull(df), None)
-        safety_data = df.to_dict(orient='records')
-    except FileNotFoundError:
-        flash('risklog.csv not found. Safety analysis data is unavailable.', 'warning')
+        # The page only analyzes the last two years, so let the date index do the filtering
+        two_years_ago = datetime.date.today() - datetime.timedelta(days=730)
+        events = RiskEvent.query.filter(RiskEvent.date >= two_years_ago).order_by(RiskEvent.date).all()
+        safety_data = [event.to_dict() for event in events]
     except Exception as e:
         flash(f'An error occurred while reading safety data: {str(e)}', 'danger')
     return render_template('admin/safety.html', 
                            safety_data=safety_data,
+                           safety_snapshot_status=safety_snapshots.status(),
                            active_page='safety_analysis')
 
 # --- User Management Routes ---
@@ -0,0 +1,162 @@
+# backend/ai_cache.py
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class _CacheStats:
+    """Hit/miss counters kept by every cache backend (per process)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.evictions = 0
+
+    def count(self, name, amount=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def as_dict(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits, 'misses': self.misses, 'sets': self.sets,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+class MemoryCache:
+    """In-process LRU cache with a per-entry TTL. Values are stored as-is."""
+
+    backend = 'memory'
+
+    def __init__(self, max_size=512, ttl=6 * 3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = _CacheStats()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > now:
+                self._data.move_to_end(key)
+                self.stats.count('hits')
+                return entry[1]
+            if entry is not None:
+                del self._data[key]
+        self.stats.count('misses')
+        return None
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.time() + self.ttl, value)
+            self._data.move_to_end(key)
+            evicted = 0
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                evicted += 1
+        self.stats.count('sets')
+        if evicted:
+            self.stats.count('evictions', evicted)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def info(self):
+        with self._lock:
+            size = len(self._data)
+        return dict(self.stats.as_dict(), backend=self.backend, size=size, max_size=self.max_size, ttl=self.ttl)
+
+
+class SQLiteCache:
+    """
+    Cache shared by every worker on the host through a local SQLite file.
+    Keys are strings, values must be JSON-serializable. Expired rows are
+    ignored on read. The least recently used rows are evicted once the table
+    grows past `max_size`.
+    """
+
+    backend = 'sqlite'
+
+    def __init__(self, path, max_size=512, ttl=6 * 3600):
+        self.path = path
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stats = _CacheStats()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                ' key TEXT PRIMARY KEY, value TEXT NOT NULL,'
+                ' expires_at REAL NOT NULL, accessed_at REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_cache_accessed_at ON cache (accessed_at)')
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    def get(self, key):
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                row = conn.execute('SELECT value FROM cache WHERE key = ? AND expires_at > ?', (key, now)).fetchone()
+                if row is not None:
+                    conn.execute('UPDATE cache SET accessed_at = ? WHERE key = ?', (now, key))
+        except sqlite3.Error as e:
+            print(f"AI Cache WARNING: SQLite read failed: {e}")
+            row = None
+        if row is None:
+            self.stats.count('misses')
+            return None
+        self.stats.count('hits')
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute('INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)',
+                             (key, json.dumps(value), now + self.ttl, now))
+                conn.execute('DELETE FROM cache WHERE expires_at <= ?', (now,))
+                evicted = conn.execute(
+                    'DELETE FROM cache WHERE key IN ('
+                    ' SELECT key FROM cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)',
+                    (self.max_size,)
+                ).rowcount
+        except sqlite3.Error as e:
+            print(f"AI Cache WARNING: SQLite write failed: {e}")
+            return
+        self.stats.count('sets')
+        if evicted > 0:
+            self.stats.count('evictions', evicted)
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM cache')
+
+    def info(self):
+        try:
+            with self._connect() as conn:
+                size = conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        except sqlite3.Error:
+            size = None
+        return dict(self.stats.as_dict(), backend=self.backend, size=size, max_size=self.max_size, ttl=self.ttl)
+
+
+def create_cache(backend='memory', path=None, max_size=512, ttl=6 * 3600):
+    """Builds a cache for the configured backend ('memory' or 'sqlite')."""
+    if backend == 'sqlite':
+        return SQLiteCache(path, max_size=max_size, ttl=ttl)
+    return MemoryCache(max_size=max_size, ttl=ttl)
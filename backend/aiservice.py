@@ -1,24 +1,51 @@
 # backend/aiservice.py
 
-from flask import Blueprint, jsonify, request, current_app, session
-from models import db, Destination, User, RouteHistory
+from flask import Blueprint, jsonify, request, current_app, session, has_app_context, Response
+from models import Destination, User
 import pandas as pd
+from pandas.api.types import union_categoricals
 import datetime
-import google.generativeai as genai
 import json
-import joblib
+import os
+import threading
+import time
+from backend.risk_dataset import RiskDataset
+from backend.safety_snapshot import safety_snapshots
+from backend.data_version import destination_version
+from backend.history_writer import route_history
+from backend.ml_engine import SafetyPredictor
+from backend.district_graph import DistrictGraph, KERALA_DISTRICTS_COORDS
+from backend import risk_store, gemini_client, ai_cache, metrics
+from backend.auth import admin_required
 
 ai_bp = Blueprint('ai_service', __name__)
 
-# --- Load the ML Model and Columns on App Start (Used for other AI features) ---
-try:
-    safety_model = joblib.load('ml_model/safety_model.joblib')
-    model_columns = joblib.load('ml_model/model_columns.joblib')
-    print("AI Service: Random Forest safety model loaded successfully.")
-except Exception as e:
-    safety_model = None
-    model_columns = None
-    print(f"AI Service WARNING: Could not load ML model: {e}. Some features may be limited.")
+# --- Random Forest safety model (used by the 'ml' safety engine), loaded on first use ---
+SAFETY_MODEL_PATH = 'ml_model/safety_model.joblib'
+MODEL_COLUMNS_PATH = 'ml_model/model_columns.joblib'
+safety_predictor = None
+_safety_model_loaded = False
+_safety_model_lock = threading.Lock()
+
+def load_safety_predictor():
+    """
+    Returns the SafetyPredictor, unpickling the model on the first call
+    (this imports scikit-learn, so it is kept out of module import), or None
+    if the model could not be loaded.
+    """
+    global safety_predictor, _safety_model_loaded
+    if _safety_model_loaded:
+        return safety_predictor
+    with _safety_model_lock:
+        if not _safety_model_loaded:
+            try:
+                import joblib
+                safety_predictor = SafetyPredictor(joblib.load(SAFETY_MODEL_PATH), joblib.load(MODEL_COLUMNS_PATH))
+                print("AI Service: Random Forest safety model loaded successfully.")
+            except Exception as e:
+                print(f"AI Service WARNING: Could not load ML model: {e}. Some features may be limited.")
+            _safety_model_loaded = True
+    return safety_predictor
 
 
 # --- Centralized AI Model Configuration ---
@@ -35,6 +62,7 @@ def _get_gemini_model():
         print("AI Service WARNING: GEMINI_API_KEY not configured.")
         return None
     try:
+        import google.generativeai as genai  # slow to import, so only when Gemini is first used
         genai.configure(api_key=api_key)
         _gemini_model = genai.GenerativeModel(GEMINI_MODEL_NAME)
         return _gemini_model
@@ -42,29 +70,72 @@ def _get_gemini_model():
         print(f"AI Service ERROR: Failed to initialize Gemini model: {e}")
         return None
 
+# Gemini prediction cache; init_ai_caches() swaps in the configured backend at startup
+prediction_cache = ai_cache.MemoryCache()
+
+# Planned routes (stops, alerts, overall safety) by inputs and data versions, per worker
+route_cache = ai_cache.MemoryCache(max_size=256, ttl=24 * 3600)
+
+def init_ai_caches(app):
+    """Builds the prediction cache from the PREDICTION_CACHE_* settings and sizes the route cache."""
+    global prediction_cache, route_cache
+    prediction_cache = ai_cache.create_cache(
+        app.config.get('PREDICTION_CACHE_BACKEND', 'memory'),
+        path=app.config.get('PREDICTION_CACHE_PATH'),
+        max_size=app.config.get('PREDICTION_CACHE_SIZE', 512),
+        ttl=app.config.get('PREDICTION_CACHE_TTL_SECONDS', 6 * 3600),
+    )
+    route_cache = ai_cache.MemoryCache(max_size=app.config.get('ROUTE_CACHE_SIZE', 256), ttl=24 * 3600)
+
+def clear_route_cache():
+    """Drops this worker's planned routes; admin writes call it, other workers move on with the data versions."""
+    route_cache.clear()
+
+def _gemini_timeout():
+    """Per-call deadline (seconds) for Gemini requests, from GEMINI_TIMEOUT_SECONDS."""
+    return float(current_app.config.get('GEMINI_TIMEOUT_SECONDS') or gemini_client.DEFAULT_TIMEOUT_SECONDS)
+
 # --- Helper Functions ---
 def _build_travel_tip(stop_names: list[str] | None) -> str:
     """Return a short travel tip string for the given stop names."""
     tip_locations = ", ".join(stop_names) if stop_names else "your destinations"
     return f"Enjoy your journey! When travelling through {tip_locations}, always check local news for the latest updates on weather and road conditions."
 
-def _generate_ai_prediction(destination_district: str, model):
+PREDICTION_FALLBACK = {
+    'disaster_alert': 'Could not generate a prediction. Always check local news and weather reports.', 
+    'disease_alert': 'General health precautions are recommended.',
+    'overall_safety_level': 'Moderate Risk'
+}
+
+def _prepare_ai_prediction(destination_district: str):
     """
-    Uses the AI model to predict future risks based on historical data.
+    Builds the prediction prompt from historical data. Returns (prediction, None, None)
+    when no Gemini call is needed (no data, or a cache hit), else (None, cache_key, prompt).
+    The prompt depends only on the district, the month and the risk data,
+    so successful predictions are cached under exactly that key.
     """
+    snapshot = risk_data.current
+    risk_log_df = snapshot.df
     if risk_log_df.empty:
-        return {'disaster_alert': 'Historical data is unavailable for analysis.', 'disease_alert': 'Historical data is unavailable for analysis.', 'overall_safety_level': 'Moderate Risk'}
+        return {'disaster_alert': 'Historical data is unavailable for analysis.', 'disease_alert': 'Historical data is unavailable for analysis.', 'overall_safety_level': 'Moderate Risk'}, None, None
+
+    cache_key = f"prediction:{destination_district.lower()}:{datetime.datetime.now():%Y-%m}:{snapshot.version}"
+    cached = prediction_cache.get(cache_key)
+    if cached is not None:
+        return dict(cached), None, None
 
     two_years_ago = datetime.datetime.now() - datetime.timedelta(days=730)
     district_data = risk_log_df[
-        (risk_log_df['district'].str.lower() == destination_district.lower()) &
+        (risk_log_df['district_key'] == destination_district.lower()) &
         (risk_log_df['date'] > two_years_ago)
     ]
 
     if district_data.empty:
-        return {'disaster_alert': f'No significant events recorded for {destination_district} in the last two years. General caution is advised.', 'disease_alert': 'No specific disease outbreaks reported recently.', 'overall_safety_level': 'Low Risk'}
+        return {'disaster_alert': f'No significant events recorded for {destination_district} in the last two years. General caution is advised.', 'disease_alert': 'No specific disease outbreaks reported recently.', 'overall_safety_level': 'Low Risk'}, None, None
 
-    disaster_counts = district_data[district_data['disaster_event'].str.lower() != 'none']['disaster_event'].value_counts().to_dict()
+    # Categorical value_counts lists every category, so keep only the events that occurred
+    event_counts = district_data.loc[district_data['event_key'] != 'none', 'disaster_event'].value_counts()
+    disaster_counts = {event: int(count) for event, count in event_counts.items() if count}
     disease_total = district_data['disease_cases'].sum()
     recent_event_date = district_data['date'].max().strftime('%B %Y') if not district_data.empty else "N/A"
     
@@ -88,66 +159,155 @@ def _generate_ai_prediction(destination_district: str, model):
     Example: {{"disaster_alert": "Given the history of landslides and the current monsoon season, travelers should monitor weather forecasts.", "disease_alert": "A slight increase in water-borne diseases is possible. Drink bottled water.", "overall_safety_level": "Moderate Risk"}}
     """
     
+    return None, cache_key, prompt
+
+def _finish_ai_prediction(response_future, cache_key, timeout):
+    """Waits for the (shared) Gemini call, parses its JSON answer and caches it."""
     try:
-        response = model.generate_content(prompt)
+        response = gemini_client.wait_for(response_future, timeout)
         cleaned_response = response.text.strip().replace("```json", "").replace("```", "")
         prediction = json.loads(cleaned_response)
         if 'overall_safety_level' not in prediction:
             prediction['overall_safety_level'] = 'Moderate Risk'
-        return prediction
+        prediction_cache.set(cache_key, prediction)
+        return dict(prediction)
+    except TimeoutError as e:
+        print(f"AI Service WARNING: Route prediction: {e}; using fallback.")
+        return dict(PREDICTION_FALLBACK)
     except Exception as e:
         print(f"AI Prediction ERROR: {e}")
-        return {
-            'disaster_alert': 'Could not generate a prediction. Always check local news and weather reports.', 
-            'disease_alert': 'General health precautions are recommended.',
-            'overall_safety_level': 'Moderate Risk'
-        }
+        return dict(PREDICTION_FALLBACK)
+
+def _generate_ai_prediction(destination_district: str, model, timeout=gemini_client.DEFAULT_TIMEOUT_SECONDS):
+    """
+    Uses the AI model to predict future risks based on historical data.
+    Identical concurrent predictions share one Gemini call.
+    """
+    prediction, cache_key, prompt = _prepare_ai_prediction(destination_district)
+    if prediction is not None:
+        return prediction
+    return _finish_ai_prediction(gemini_client.shared_generate(model, prompt, timeout), cache_key, timeout)
 
 # --- Data Loading ---
-KERALA_DISTRICTS_ORDER = [
-    "Thiruvananthapuram", "Kollam", "Pathanamthitta", "Alappuzha", "Kottayam",
-    "Idukki", "Ernakulam", "Thrissur", "Palakkad", "Malappuram",
-    "Kozhikode", "Wayanad", "Kannur", "Kasaragod"
-]
-try:
-    csv_path = 'static/data/risklog.csv'
-    risk_log_df = pd.read_csv(csv_path, skipinitialspace=True, on_bad_lines='skip')
-    risk_log_df.columns = [c.strip().lower().replace(' ', '_') for c in risk_log_df.columns]
-    if 'date' in risk_log_df.columns:
-        risk_log_df['date'] = pd.to_datetime(risk_log_df['date'], errors='coerce')
-    print("AI Service: Risk log CSV loaded successfully.")
-except Exception as e:
-    print(f"AI Service WARNING: Could not read {csv_path}: {e}. Risk analysis will be limited.")
-    risk_log_df = pd.DataFrame()
+# Text columns kept as categoricals, each with a lowercased key column for lookups
+RISK_LOG_KEYS = {'district': 'district_key', 'place': 'place_key', 'disaster_event': 'event_key'}
+
+def _lowered_categories(values):
+    """Lowercased copy of a categorical column, computed once per category."""
+    lowered = values.cat.categories.astype(str).str.lower()
+    uniques = lowered.unique()
+    codes = values.cat.codes.to_numpy()
+    mapped = uniques.get_indexer(lowered)[codes]
+    mapped[codes < 0] = -1
+    return pd.Categorical.from_codes(mapped, uniques)
+
+def _prepare_risk_log(df):
+    """
+    Normalizes a raw risk log DataFrame into the compact in-memory layout:
+    parsed dates, categorical text columns with lowercased key columns
+    (so lookups never lowercase strings per request) and narrow integers.
+    Descriptions are dropped; route alerts read them from the RiskEvent table.
+    """
+    df = df.copy()
+    df.columns = [c.strip().lower().replace(' ', '_') for c in df.columns]
+    df = df.drop(columns=['description'], errors='ignore')
+    if 'date' in df.columns:
+        df['date'] = pd.to_datetime(df['date'], errors='coerce')
+    for column, key in RISK_LOG_KEYS.items():
+        if column in df.columns:
+            df[column] = df[column].astype('category')
+            df[key] = _lowered_categories(df[column])
+    for column in ('humidity_percent', 'disease_cases'):
+        if column in df.columns:
+            df[column] = pd.to_numeric(df[column], errors='coerce', downcast='integer')
+    return df
+
+def _append_risk_events(df, upserted):
+    """Appends raw event dicts to a prepared log, keeping the categorical columns categorical."""
+    df = df.copy(deep=False)  # never touch the live snapshot's frame
+    new_rows = _prepare_risk_log(pd.DataFrame(upserted))
+    for column in set(RISK_LOG_KEYS) | set(RISK_LOG_KEYS.values()):
+        if column in df.columns and column in new_rows.columns:
+            combined = union_categoricals([df[column], new_rows[column]]).categories
+            df[column] = df[column].cat.set_categories(combined)
+            new_rows[column] = new_rows[column].cat.set_categories(combined)
+    return pd.concat([df, new_rows], ignore_index=True)
+
+# Versioned, atomically swapped risk data. Filled by init_risk_data() when the app starts;
+# readers take `risk_data.current` once and never lock.
+risk_data = RiskDataset(prepare=_prepare_risk_log)
+
+def init_risk_data(app):
+    """
+    Loads the risk log from the RiskEvent table and starts the watcher that
+    reloads it in the background when another worker publishes a change.
+    With RISK_DATA_SHARED_DIR the loaded snapshot is saved there and published,
+    so the other workers (or, with a preloaded app, the forked ones) map it
+    instead of building their own copy.
+    """
+    def loader():
+        with app.app_context():
+            return risk_store.load_dataframe(with_descriptions=False)
+
+    stamp_path = app.config.get('RISK_DATA_STAMP') or os.path.join(app.instance_path, 'risk_data.version')
+    shared_dir = app.config.get('RISK_DATA_SHARED_DIR') or None
+    risk_data.configure(loader, stamp_path, shared_dir)
+    snapshot = risk_data.reload(publish=shared_dir is not None)
+    if risk_data.last_error:
+        print(f"AI Service WARNING: Could not load the risk log: {risk_data.last_error}. Risk analysis will be limited.")
+    else:
+        print(f"AI Service: Risk log loaded successfully ({len(snapshot.df)} events).")
+    risk_data.start_watching(app.config.get('RISK_DATA_POLL_SECONDS', 5))
 
-# --- UNIFIED SAFETY CALCULATION (from safety.html logic) ---
-MAX_RISK_SCORE = 75.0  # Use float for division
+def refresh_risk_log(df, districts=None):
+    """
+    Replaces the in-memory risk log with `df` and rebuilds
+    the safety index buckets of the given districts (all of them if None).
+    """
+    snapshot = risk_data.replace(df, districts)
+    safety_snapshots.refresh_async()
+    return snapshot
 
-def calculate_safety_rule_based(district_name, place_name=None):
+def apply_risk_event_changes(upserted=(), deleted_ids=()):
     """
-    Calculates a safety score and level based on historical data,
-    replicating the logic from the admin safety analysis page for consistency.
+    Applies admin edits to the in-memory risk log without re-reading the table.
+    `upserted` holds RiskEvent.to_dict() rows (new or updated); only the districts
+    touched by the edit get their safety index buckets rebuilt.
     """
-    status_map = {'High Risk': 'unsafe', 'Moderate Risk': 'caution', 'Low Risk': 'safe'}
-    
-    if risk_log_df.empty:
-        return {'text': 'Moderate Risk', 'class': 'caution', 'score': 50}
+    upserted = list(upserted)
+    changed_ids = set(deleted_ids) | {event['id'] for event in upserted}
+
+    def change(df):
+        if 'id' in df.columns:
+            touched = df['id'].isin(changed_ids)
+            districts = set(df.loc[touched, 'district'].dropna())
+            df = df[~touched].copy()
+        else:
+            districts = set()
+        districts |= {event['district'] for event in upserted}
+        if upserted:
+            df = _append_risk_events(df, upserted)
+        return df.reset_index(drop=True), districts
+
+    snapshot = risk_data.update(change)
+    safety_snapshots.refresh_async()
+    return snapshot
 
-    two_years_ago = datetime.datetime.now() - datetime.timedelta(days=730)
-    mask = (risk_log_df['district'].str.lower() == district_name.lower()) & (risk_log_df['date'] > two_years_ago)
-    if place_name:
-        mask &= (risk_log_df['place'].str.lower() == place_name.lower())
-    
-    relevant_events = risk_log_df[mask]
+# --- UNIFIED SAFETY CALCULATION (from safety.html logic) ---
+MAX_RISK_SCORE = 75.0  # Use float for division
 
-    if relevant_events.empty:
+STATUS_MAP = {'High Risk': 'unsafe', 'Moderate Risk': 'caution', 'Low Risk': 'safe'}
+
+def _safety_from_counts(counts):
+    """Turns the risk counters of one location into the safety result dict."""
+    if not counts:
         return {'text': 'Low Risk', 'class': 'safe', 'score': 0}
 
     raw_score = 0
-    raw_score += (relevant_events['disaster_event'].str.lower() != 'none').sum() * 5
-    raw_score += (relevant_events['disease_cases'] > 0).sum() * 3
-    raw_score += (relevant_events['temperature_c'] > 34).sum() * 1
-    raw_score += (relevant_events['rainfall_mm'] > 60).sum() * 2
+    raw_score += counts['disasters'] * 5
+    raw_score += counts['disease'] * 3
+    raw_score += counts['heat'] * 1
+    raw_score += counts['rain'] * 2
 
     if raw_score > MAX_RISK_SCORE * 0.60:
         safety_text = "High Risk"
@@ -160,53 +320,271 @@ def calculate_safety_rule_based(district_name, place_name=None):
 
     return {
         'text': safety_text,
-        'class': status_map.get(safety_text, 'caution'),
+        'class': STATUS_MAP.get(safety_text, 'caution'),
         'score': normalized_score
     }
 
+def calculate_safety_rule_based(district_name, place_name=None):
+    """
+    Calculates a safety score and level based on historical data,
+    replicating the logic from the admin safety analysis page for consistency.
+    """
+    snapshot = risk_data.current
+    if snapshot.df.empty:
+        return {'text': 'Moderate Risk', 'class': 'caution', 'score': 50}
+
+    two_years_ago = datetime.datetime.now() - datetime.timedelta(days=730)
+    return _safety_from_counts(snapshot.index.counts(district_name, place_name, since=two_years_ago))
+
+
+# --- ML SAFETY CALCULATION (Random Forest) ---
+_location_features_cache = (None, None, {})   # (snapshot, day, features), replaced as a whole
+_location_features_lock = threading.Lock()
+
+def _location_features(snapshot, since):
+    """
+    Builds one ML feature row per location from the events after `since`:
+    mean weather and disease figures plus the most recent disaster event.
+    Keys match SafetyIndex ((district, place) and (district, None), lowercased).
+    Rows are cached until the risk data snapshot is replaced or the day changes;
+    one thread builds them while concurrent callers wait for its result.
+    """
+    global _location_features_cache
+    cached_snapshot, cached_day, features = _location_features_cache
+    if cached_snapshot is snapshot and cached_day == since.date():
+        return features
+    with _location_features_lock:
+        cached_snapshot, cached_day, features = _location_features_cache
+        if cached_snapshot is snapshot and cached_day == since.date():
+            return features
+        features = _build_location_features(snapshot, since)
+        _location_features_cache = (snapshot, since.date(), features)
+        return features
+
+def _build_location_features(snapshot, since):
+    risk_log_df = snapshot.df
+    frame = risk_log_df[(risk_log_df['date'] > since) & risk_log_df['district'].notna()].sort_values('date')
+    frame = frame.assign(event=frame['disaster_event'].where(frame['event_key'] != 'none'))
+    numeric = ['temperature_c', 'rainfall_mm', 'humidity_percent', 'disease_cases']
+    aggregations = {name: (name, 'mean') for name in numeric}
+    # 'last' skips missing values, so `event` is the most recent real disaster
+    aggregations.update(district=('district', 'last'), place=('place', 'last'), event=('event', 'last'))
+    features = {}
+    for by in (['district_key', 'place_key'], ['district_key']):
+        summary = frame.groupby(by, observed=True).agg(**aggregations)
+        summary[numeric] = summary[numeric].fillna(0)
+        for key, row in zip(summary.index, summary.itertuples(index=False)):
+            with_place = len(by) == 2
+            features[key if with_place else (key, None)] = (
+                float(row.temperature_c), float(row.rainfall_mm),
+                float(row.humidity_percent), float(row.disease_cases),
+                row.district, row.place if with_place else None,
+                row.event if isinstance(row.event, str) else None,
+            )
+
+    return features
+
+def calculate_safety_ml_batch(pairs, snapshot=None):
+    """
+    Scores (district, place) pairs with the Random Forest in one batched prediction.
+    Locations without recent events are Low Risk, as in the rule-based engine.
+    """
+    pairs = list(pairs)
+    snapshot = snapshot or risk_data.current
+    if snapshot.df.empty:
+        return [{'text': 'Moderate Risk', 'class': 'caution', 'score': 50} for _ in pairs]
+
+    now = datetime.datetime.now()
+    features = _location_features(snapshot, now - datetime.timedelta(days=730))
+    results = [None] * len(pairs)
+    rows, slots = [], []
+    for i, (district_name, place_name) in enumerate(pairs):
+        feature = features.get((district_name.lower(), place_name.lower() if place_name else None))
+        if feature is None:
+            results[i] = {'text': 'Low Risk', 'class': 'safe', 'score': 0}
+            continue
+        rows.append(feature[:4] + (now.month,) + feature[4:])
+        slots.append(i)
+
+    for i, (label, high_risk) in zip(slots, load_safety_predictor().predict(rows)):
+        results[i] = {'text': label, 'class': STATUS_MAP.get(label, 'caution'), 'score': round(high_risk * 100)}
+    return results
+
 
 # --- Main Safety Calculation Wrapper ---
+SAFETY_ENGINES = ('rule', 'ml')
+
+def _safety_engine():
+    """Returns the configured safety engine, falling back to 'rule' if the model is unavailable."""
+    engine = current_app.config.get('SAFETY_ENGINE', 'rule') if has_app_context() else 'rule'
+    if engine == 'ml' and load_safety_predictor() is None:
+        return 'rule'
+    return engine if engine in SAFETY_ENGINES else 'rule'
+
+def _score_locations(pairs, snapshot, engine):
+    """
+    Scores (district, place) pairs from the risk data `snapshot` with `engine`,
+    sharing a single time window and looking each distinct location up only once.
+    """
+    if engine == 'ml':
+        return calculate_safety_ml_batch(pairs, snapshot)
+    two_years_ago = datetime.datetime.now() - datetime.timedelta(days=730)
+    index = snapshot.index
+    scored = {}
+    results = []
+    for district_name, place_name in pairs:
+        key = (district_name.lower(), place_name.lower() if place_name else None)
+        if key not in scored:
+            scored[key] = _safety_from_counts(index.counts(district_name, place_name, since=two_years_ago))
+        results.append(dict(scored[key]))
+    return results
+
 def calculate_safety(district_name, place_name):
     """
-    Calculates safety using the single, unified rule-based method
-    to ensure consistency across the entire application.
+    Calculates safety with the configured engine (SAFETY_ENGINE): the unified
+    rule-based method by default, or the Random Forest when set to 'ml'.
+    Reads the precomputed SafetySnapshot row when there is a current one.
+    """
+    return calculate_safety_batch([(district_name, place_name)])[0]
+
+def calculate_safety_batch(pairs):
+    """
+    Scores a list of (district, place) pairs in one pass. Locations come from
+    the SafetySnapshot table when it was computed from the live risk data
+    with the configured engine; the others are scored on the spot.
+    Returns the safety dicts in the same order as `pairs`.
+    """
+    pairs = list(pairs)
+    snapshot = risk_data.current
+    if snapshot.df.empty:
+        return [{'text': 'Moderate Risk', 'class': 'caution', 'score': 50} for _ in pairs]
+
+    started = time.perf_counter()
+    engine = _safety_engine()
+    keys = [(district_name.lower(), place_name.lower() if place_name else None) for district_name, place_name in pairs]
+    stored = safety_snapshots.lookup(keys, snapshot.version, engine)
+    if stored is None:
+        results, source = _score_locations(pairs, snapshot, engine), 'live'
+    else:
+        results = [{'text': row[0], 'class': STATUS_MAP.get(row[0], 'caution'), 'score': row[1]} if row else None
+                   for row in stored]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            for i, result in zip(missing, _score_locations([pairs[i] for i in missing], snapshot, engine)):
+                results[i] = result
+        source = 'mixed' if missing else 'snapshot'
+    metrics.safety_seconds.observe(time.perf_counter() - started, engine=engine, source=source)
+    return results
+
+def _safety_snapshot_rows():
+    """Scores every location in the risk data for the SafetySnapshot table: (risk version, engine, rows)."""
+    snapshot = risk_data.current
+    engine = _safety_engine()
+    keys = [key for key in snapshot.index.keys if key[1] != '']  # '' is the district row in the table
+    two_years_ago = datetime.datetime.now() - datetime.timedelta(days=730)
+    rows = []
+    for (district, place), result in zip(keys, _score_locations(keys, snapshot, engine)):
+        counts = snapshot.index.counts(district, place, since=two_years_ago) or {}
+        rows.append({'district': district, 'place': place or '', 'score': result['score'], 'level': result['text'],
+                     'disasters': counts.get('disasters', 0), 'disease': counts.get('disease', 0),
+                     'heat': counts.get('heat', 0), 'rain': counts.get('rain', 0)})
+    return snapshot.version, engine, rows
+
+def _safety_snapshot_source():
+    """(risk version, engine) this worker would score with, or None while its risk data is not the published one."""
+    snapshot = risk_data.current
+    if snapshot.df.empty or snapshot.version != risk_data.published_version():
+        return None
+    return snapshot.version, _safety_engine()
+
+def init_safety_snapshots(app):
+    """Loads the SafetySnapshot table, refreshes it if it is out of date and starts the scheduler."""
+    safety_snapshots.configure(app, _safety_snapshot_rows, _safety_snapshot_source,
+                               stamp_path=os.path.join(app.instance_path, 'safety_snapshot.version'),
+                               max_age=app.config.get('SAFETY_SNAPSHOT_MAX_AGE_SECONDS', 3600),
+                               interval=app.config.get('RISK_DATA_POLL_SECONDS', 5))
+    safety_snapshots.refresh_if_due()
+    safety_snapshots.start()
+
+def prefetch_safety(destinations):
+    """
+    Scores a whole query result with calculate_safety_batch and stores each
+    result on its Destination, so `dest.safety_info` in templates is a plain read.
+    Returns the destinations as a list.
     """
-    return calculate_safety_rule_based(district_name, place_name)
+    destinations = list(destinations)
+    try:
+        results = calculate_safety_batch((dest.Name, dest.Place) for dest in destinations)
+    except Exception as e:
+        # Leave the cache empty; safety_info falls back to per-row calculation
+        print(f"AI Service WARNING: Could not prefetch safety data: {e}")
+        return destinations
+    for dest, safety_info in zip(destinations, results):
+        dest._safety_info = safety_info
+    return destinations
 
 
-# --- API Endpoints ---
-@ai_bp.route('/api/generate-route', methods=['POST'])
-def generate_ai_route():
-    data = request.get_json()
-    source_district, dest_district = data.get('source'), data.get('destination')
-    interest = data.get('interest')
-    budget_str = data.get('budget')
-    model = _get_gemini_model()
+# --- District Route Planning ---
+_route_graph_cache = {'snapshot': None, 'day': None, 'weight': None, 'graph': None}
+
+def _route_safety_weight():
+    return current_app.config.get('ROUTE_SAFETY_WEIGHT', 0.5) if has_app_context() else 0.5
 
+def _route_graph():
+    """
+    District graph whose edge costs include each district's current risk score,
+    so path lookups favour safer districts. Rebuilt when the risk data snapshot,
+    the day or ROUTE_SAFETY_WEIGHT changes.
+    """
+    snapshot, today, weight = risk_data.current, datetime.date.today(), _route_safety_weight()
+    cache = _route_graph_cache
+    if cache['snapshot'] is snapshot and cache['day'] == today and cache['weight'] == weight:
+        return cache['graph']
+
+    risk = {}
+    if weight and not snapshot.df.empty:
+        two_years_ago = datetime.datetime.now() - datetime.timedelta(days=730)
+        for district in KERALA_DISTRICTS_COORDS:
+            risk[district] = _safety_from_counts(snapshot.index.counts(district, since=two_years_ago))['score'] / 100.0
+    graph = DistrictGraph(risk=risk, safety_weight=weight)
+    cache.update(snapshot=snapshot, day=today, weight=weight, graph=graph)
+    return graph
+
+
+# --- Route Planning Results ---
+def _route_budget(budget_str):
     try:
-        source_index = KERALA_DISTRICTS_ORDER.index(source_district)
-        dest_index = KERALA_DISTRICTS_ORDER.index(dest_district)
-    except ValueError:
-        return jsonify({'success': False, 'message': 'Invalid source or destination provided.'}), 400
+        return int(budget_str) if budget_str else None
+    except (ValueError, TypeError):
+        return None
+
+def _route_cache_key(source_district, dest_district, interest, budget_str):
+    """Route inputs plus every version a planned route depends on (data, safety scores, settings and day)."""
+    return (source_district, dest_district, interest or None, _route_budget(budget_str),
+            destination_version.current(), risk_data.current.version, safety_snapshots.stamp.current(),
+            _safety_engine(), _route_safety_weight(), datetime.date.today())
 
-    travel_path_districts = KERALA_DISTRICTS_ORDER[source_index : dest_index + 1] if source_index < dest_index else list(reversed(KERALA_DISTRICTS_ORDER[dest_index : source_index + 1]))
+def _plan_route(travel_path_districts, interest, budget_str):
+    """
+    The deterministic part of a route along `travel_path_districts`: the three
+    safest matching stops, their recent alerts, the tip and the overall safety.
+    Returns {} if no destination matches.
+    """
     districts_for_stops = travel_path_districts[1:]
 
     query = Destination.query.filter(Destination.Name.in_(districts_for_stops))
     if interest: query = query.filter(Destination.Type == interest)
-    if budget_str:
-        try:
-            user_budget = int(budget_str)
-            query = query.filter(Destination.budget <= user_budget)
-        except (ValueError, TypeError): pass
+    user_budget = _route_budget(budget_str)
+    if user_budget is not None:
+        query = query.filter(Destination.budget <= user_budget)
 
     potential_stops = query.all()
     if not potential_stops:
-        return jsonify({'success': False, 'message': 'No stops found matching your criteria.'})
+        return {}
 
     analyzed_stops = []
-    for stop in potential_stops:
-        safety_info = calculate_safety(stop.Name, stop.Place)
+    safety_results = calculate_safety_batch((stop.Name, stop.Place) for stop in potential_stops)
+    for stop, safety_info in zip(potential_stops, safety_results):
         analyzed_stops.append({
             'id': stop.Destination_id, 'name': stop.Place, 'district': stop.Name,
             'type': stop.Type.capitalize(), 'budget': stop.budget,
@@ -218,22 +596,21 @@ def generate_ai_route():
     best_stops = sorted_stops[:3]
 
     alerts, stop_names_for_tip = [], []
-    if not risk_log_df.empty:
+    snapshot = risk_data.current
+    if not snapshot.df.empty:
         two_years_ago = datetime.datetime.now() - datetime.timedelta(days=730)
-        severity_map = {'landslide': 'alert-high', 'flood': 'alert-high', 'cyclone': 'alert-high', 'heatwave': 'alert-medium', 'drought': 'alert-medium'}
+        stop_alerts = []
         for stop in best_stops:
             stop_names_for_tip.append(stop['name'])
-            mask = ((risk_log_df['place'].str.lower() == stop['name'].lower()) & (risk_log_df['district'].str.lower() == stop['district'].lower()) & (risk_log_df['date'] > two_years_ago))
-            for _, alert_row in risk_log_df[mask].iterrows():
-                event_type = alert_row.get('disaster_event', 'Alert')
-                if str(event_type).lower() == 'none': continue
-                severity = severity_map.get(str(event_type).lower(), 'alert-low')
-                alerts.append({
-                    'type': f"{str(event_type).capitalize()} in {stop['name']}",
-                    'description': alert_row.get('description', 'No details available.'),
-                    'date': alert_row['date'].strftime('%d %B %Y') if pd.notna(alert_row.get('date')) else 'N/A',
-                    'severity_class': severity 
-                })
+            stop_alerts.extend((stop, alert) for alert in snapshot.index.alerts(stop['district'], stop['name'], since=two_years_ago))
+        # Descriptions are not kept in memory; fetch the ones shown in one query
+        descriptions = risk_store.descriptions([alert['event_id'] for _, alert in stop_alerts if alert['description'] is None])
+        for stop, alert in stop_alerts:
+            alerts.append({
+                'type': f"{alert['event']} in {stop['name']}",
+                'description': alert['description'] or descriptions.get(alert['event_id']) or 'No details available.',
+                'date': alert['date'], 'severity_class': alert['severity_class']
+            })
 
     tip = _build_travel_tip(stop_names_for_tip)
     
@@ -241,47 +618,112 @@ def generate_ai_route():
     if any(s['safety_class'] == 'unsafe' for s in best_stops): overall_safety_text = "High Risk"
     elif any(s['safety_class'] == 'caution' for s in best_stops): overall_safety_text = "Moderate Risk"
     status_map = {'Low Risk': 'safe', 'Moderate Risk': 'caution', 'High Risk': 'unsafe'}
+    return {
+        'stops': best_stops, 'alerts': alerts, 'tip': tip,
+        'overall_safety_text': overall_safety_text, 'overall_safety_class': status_map.get(overall_safety_text, 'caution'),
+    }
 
+# --- API Endpoints ---
+@ai_bp.route('/api/generate-route', methods=['POST'])
+def generate_ai_route():
+    data = request.get_json()
+    source_district, dest_district = data.get('source'), data.get('destination')
+    interest = data.get('interest')
+    budget_str = data.get('budget')
+    model = _get_gemini_model()
+
+    travel_path_districts = _route_graph().path(source_district, dest_district) if source_district and dest_district else None
+    if not travel_path_districts:
+        return jsonify({'success': False, 'message': 'Invalid source or destination provided.'}), 400
+
+    # Start the Gemini prediction now; it runs on the pool while the rule-based route is built below.
+    # Identical in-flight prompts from other requests share the same upstream call.
     prediction_alerts = {'disaster_alert': 'AI analysis not available.', 'disease_alert': 'AI analysis not available.', 'overall_safety_level': 'Moderate Risk'}
+    pending_prediction, prediction_deadline = None, None
     if model:
-        prediction_alerts = _generate_ai_prediction(dest_district, model)
+        gemini_timeout = _gemini_timeout()
+        prediction_deadline = time.monotonic() + gemini_timeout
+        ready_prediction, cache_key, prompt = _prepare_ai_prediction(dest_district)
+        if ready_prediction is not None:
+            prediction_alerts = ready_prediction
+        else:
+            pending_prediction = (gemini_client.shared_generate(model, prompt, gemini_timeout), cache_key)
+
+    # Everything but the Gemini prediction depends only on the inputs and the data versions
+    key = _route_cache_key(source_district, dest_district, interest, budget_str)
+    plan = route_cache.get(key)
+    if plan is None:
+        plan = _plan_route(travel_path_districts, interest, budget_str)
+        route_cache.set(key, plan)
+    if not plan:
+        return jsonify({'success': False, 'message': 'No stops found matching your criteria.'})
+    best_stops = plan['stops']
+
+    if pending_prediction:
+        prediction_alerts = _finish_ai_prediction(*pending_prediction, prediction_deadline - time.monotonic())
 
     final_route = {
         'source': source_district, 'destination': dest_district, 'interest': interest.capitalize() if interest else 'Any',
-        'overall_safety_text': overall_safety_text, 'overall_safety_class': status_map.get(overall_safety_text, 'caution'),
-        'stops': best_stops, 'alerts': alerts, 'tip': tip,
+        'overall_safety_text': plan['overall_safety_text'], 'overall_safety_class': plan['overall_safety_class'],
+        'stops': best_stops, 'alerts': plan['alerts'], 'tip': plan['tip'],
         'prediction': prediction_alerts
     }
     
     if 'user_id' in session:
+        # Queued and written in bulk by the background writer, off the request path
+        route_history.submit(session['user_id'], source_district, dest_district,
+                             interest or 'Any', budget_str or 'Any', best_stops)
+
+    return jsonify({'success': True, 'route': final_route})
+
+def _chat_prompt(user_message):
+    return f"""
+        You are a friendly travel assistant for Kerala, India. Provide safe and useful advice.
+        Format answers using Markdown (lists, bold text, etc.).
+        User question: "{user_message}"
+        """
+
+def _sse(data, event=None):
+    """Formats one server-sent event."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+def _stream_chat_reply(model, user_message, started_at):
+    """
+    Streams the reply as server-sent events: one `data: {"delta": ...}` event
+    per Gemini chunk, then `event: done` (or `event: error`).
+    """
+    timeout = _gemini_timeout()  # read while the app context is still active
+
+    def events():
         try:
-            new_history = RouteHistory(
-                user_id=session['user_id'],
-                source=source_district, destination=dest_district,
-                interest=(interest or 'Any'), budget=(budget_str or 'Any'),
-                stops_data=json.dumps(best_stops)
-            )
-            db.session.add(new_history)
-            db.session.commit()
+            chunks = gemini_client.stream_content(model, _chat_prompt(user_message), timeout)
+            for text in gemini_client.timed_stream(chunks, started_at):
+                yield _sse({'delta': text})
+            yield _sse({'success': True}, event='done')
         except Exception as e:
-            db.session.rollback()
-            print(f"ERROR: Could not save route history. {e}")
-    
-    return jsonify({'success': True, 'route': final_route})
+            print(f"AI Chat ERROR: {e}")
+            yield _sse({'success': False, 'error': "AI assistant connection error."}, event='error')
+
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @ai_bp.route('/api/chat', methods=['POST'])
 def chat_with_gemini():
-    user_message = (request.get_json() or {}).get('message')
+    """
+    Answers a chat message. With {"stream": true} (or ?stream=1) the reply is
+    sent as server-sent events while Gemini generates it; otherwise as one JSON body.
+    """
+    started_at = time.perf_counter()
+    payload = request.get_json() or {}
+    user_message = payload.get('message')
     if not user_message: return jsonify({'success': False, 'error': 'No message provided.'}), 400
     model = _get_gemini_model()
     if not model: return jsonify({'success': False, 'error': 'AI assistant is not configured.'}), 500
+    if payload.get('stream') or request.args.get('stream') == '1':
+        return _stream_chat_reply(model, user_message, started_at)
     try:
-        prompt = f"""
-        You are a friendly travel assistant for Kerala, India. Provide safe and useful advice.
-        Format answers using Markdown (lists, bold text, etc.).
-        User question: "{user_message}"
-        """
-        response = model.generate_content(prompt)
+        response = gemini_client.generate_with_deadline(model, _chat_prompt(user_message), _gemini_timeout())
         return jsonify({'success': True, 'reply': response.text})
     except Exception as e:
         return jsonify({'success': False, 'error': "AI assistant connection error."}), 500
@@ -299,8 +741,21 @@ def get_travel_tip():
         Include a 1-2 sentence summary, up to 3 short bullet points, and a packing/precaution sentence.
         Return plain text only, no markdown.
         """
-        response = model.generate_content(prompt)
+        response = gemini_client.generate_with_deadline(model, prompt, _gemini_timeout())
         generated_tip = response.text.strip() if response.text else _build_travel_tip(stops)
         return jsonify({'success': True, 'tip': generated_tip, 'source': 'gemini'})
     except Exception as e:
-        return jsonify({'success': True, 'tip': _build_travel_tip(stops), 'source': 'fallback', 'warning': 'AI generation failed.'})
\ No newline at end of file
+        return jsonify({'success': True, 'tip': _build_travel_tip(stops), 'source': 'fallback', 'warning': 'AI generation failed.'})
+
+@ai_bp.route('/api/ai/cache-stats')
+@admin_required
+def ai_cache_stats():
+    """Hit/miss counters of the AI caches and chat streaming latency in this worker, for ops dashboards."""
+    return jsonify({
+        'prediction_cache': prediction_cache.info(),
+        'route_cache': route_cache.info(),
+        'route_history_writer': route_history.stats(),
+        'safety_model_cache': safety_predictor.cache_info() if safety_predictor else None,
+        'chat_stream_ttfb_seconds': gemini_client.chat_ttfb.as_dict(),
+        'gemini_calls': gemini_client.gemini_calls.stats(),
+    })
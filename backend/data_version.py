@@ -0,0 +1,68 @@
+# backend/data_version.py
+
+import os
+import threading
+import time
+
+
+class VersionStamp:
+    """
+    A data version shared by all workers on the host through a small file.
+    Writers call bump() after committing a change; readers compare current()
+    with the version they built their in-memory copy from. current() only
+    stats the file unless its mtime changed, so it is cheap to call per request.
+    Without a path the version is kept in this process only.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._version = '0'
+
+    def configure(self, path):
+        self.path = path
+        self._mtime = None
+
+    def current(self):
+        if not self.path:
+            return self._version
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return self._version
+        if mtime != self._mtime:
+            try:
+                with open(self.path) as stamp:
+                    version = stamp.read().strip() or str(mtime)
+            except OSError:
+                return self._version
+            with self._lock:
+                self._mtime, self._version = mtime, version
+        return self._version
+
+    def bump(self):
+        """Publishes a new version and returns it."""
+        version = str(time.time_ns())
+        with self._lock:
+            self._version = version
+            if self.path:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'w') as stamp:
+                    stamp.write(version)
+                os.replace(tmp_path, self.path)
+                self._mtime = os.stat(self.path).st_mtime_ns
+        return version
+
+    def age_seconds(self):
+        """Seconds since the current version was published, or None if it never was."""
+        try:
+            published_ns = int(self.current())
+        except ValueError:
+            return None
+        return (time.time_ns() - published_ns) / 1e9 if published_ns else None
+
+
+# Bumped by every admin write to the Destination table (configured in create_app)
+destination_version = VersionStamp()
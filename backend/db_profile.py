@@ -0,0 +1,133 @@
+# backend/db_profile.py
+
+import time
+
+from flask import current_app, g
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import QueuePool
+
+from db import db
+from backend.gemini_client import LatencyStats
+from backend.data_version import destination_version
+
+# Engine settings per database profile. Every value can be overridden with
+# the DB_* setting of the same name (see create_app).
+DB_PROFILES = {
+    # Development: a local file, one writer at a time; waiting on a lock is normal, a dead connection is not
+    'sqlite': {
+        'pool_size': 5, 'max_overflow': 10, 'pool_timeout': 30, 'pool_recycle': -1, 'pool_pre_ping': False,
+        'connect_args': {'timeout': 15},
+    },
+    # Production: MySQL closes idle connections (wait_timeout) and proxies drop them, so connections
+    # are recycled early and pinged on checkout; a query that hangs gives up after the statement timeout
+    'mysql': {
+        'pool_size': 10, 'max_overflow': 20, 'pool_timeout': 10, 'pool_recycle': 280, 'pool_pre_ping': True,
+        'connect_args': {'connect_timeout': 5, 'charset': 'utf8mb4'},
+    },
+}
+
+# Name of the read-replica bind in SQLALCHEMY_BINDS
+REPLICA_BIND = 'replica'
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection, and how many timed out."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = LatencyStats()
+        self.timeouts = 0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeout:
+            self.timeouts += 1
+            raise
+        finally:
+            self.wait_stats.observe(time.perf_counter() - start)
+
+
+def profile_name(uri, profile='auto'):
+    """The profile for `uri`: `profile` itself, or picked from the URI scheme for 'auto'."""
+    if profile == 'auto':
+        return 'sqlite' if uri.startswith('sqlite') else 'mysql'
+    if profile not in DB_PROFILES:
+        raise ValueError(f"Unknown DB_PROFILE '{profile}'; use 'auto' or one of {', '.join(DB_PROFILES)}.")
+    return profile
+
+
+def engine_options(uri, profile='auto', pool_size=None, max_overflow=None, pool_timeout=None,
+                   pool_recycle=None, pool_pre_ping=None, statement_timeout=None):
+    """SQLAlchemy engine options for `uri` from its profile, with the given overrides (None keeps the profile's)."""
+    name = profile_name(uri, profile)
+    options = dict(DB_PROFILES[name], connect_args=dict(DB_PROFILES[name]['connect_args']))
+    overrides = {'pool_size': pool_size, 'max_overflow': max_overflow, 'pool_timeout': pool_timeout,
+                 'pool_recycle': pool_recycle, 'pool_pre_ping': pool_pre_ping}
+    options.update({key: value for key, value in overrides.items() if value is not None})
+    if statement_timeout and name == 'mysql':
+        # PyMySQL socket timeouts: a statement (or write) slower than this fails instead of holding the worker
+        options['connect_args'].update(read_timeout=statement_timeout, write_timeout=statement_timeout)
+    if name == 'sqlite' and (':memory:' in uri or uri.rstrip('/') in ('sqlite:', 'sqlite:/')):
+        # In-memory databases live in a single connection; SQLAlchemy picks the pool for them
+        return {'connect_args': options['connect_args']}
+    options['poolclass'] = TimedQueuePool
+    return options
+
+
+def configure_database(app):
+    """Sets the engine options (and the replica bind, if any) from the DB_* settings. Call before db.init_app."""
+    tuning = {key: app.config.get(f'DB_{key.upper()}') for key in
+              ('pool_size', 'max_overflow', 'pool_timeout', 'pool_recycle', 'pool_pre_ping')}
+    timeout = app.config.get('DB_STATEMENT_TIMEOUT_SECONDS')
+    profile = app.config.get('DB_PROFILE', 'auto')
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(
+        app.config['SQLALCHEMY_DATABASE_URI'], profile, statement_timeout=timeout, **tuning)
+    replica_uri = app.config.get('DB_REPLICA_URI')
+    if replica_uri:
+        binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+        binds[REPLICA_BIND] = dict(engine_options(replica_uri, profile, statement_timeout=timeout, **tuning),
+                                   url=replica_uri)
+        app.config['SQLALCHEMY_BINDS'] = binds
+
+    @app.teardown_appcontext
+    def close_read_session(exc):
+        session = g.pop('read_session', None)
+        if session is not None:
+            session.close()
+
+
+def read_session():
+    """
+    Session for read-only queries that can be served slightly stale: the
+    replica when one is configured, else the primary (db.session). Right
+    after an admin changed the destinations (within DB_REPLICA_MAX_LAG_SECONDS)
+    reads stay on the primary, so a lagging replica cannot put the old rows
+    in a response cached under the new destination version.
+    """
+    engine = db.engines.get(REPLICA_BIND)
+    if engine is None:
+        return db.session
+    age = destination_version.age_seconds()
+    if age is not None and age < current_app.config.get('DB_REPLICA_MAX_LAG_SECONDS', 5.0):
+        return db.session
+    if 'read_session' not in g:
+        g.read_session = Session(bind=engine, autoflush=False)
+    return g.read_session
+
+
+def pool_stats():
+    """Pool occupancy and checkout wait times of each engine in this worker ('primary' and binds)."""
+    stats = {}
+    for key, engine in db.engines.items():
+        pool = engine.pool
+        entry = {'pool': type(pool).__name__}
+        if isinstance(pool, QueuePool):
+            entry.update(size=pool.size(), checked_in=pool.checkedin(), checked_out=pool.checkedout(),
+                         overflow=pool.overflow())
+        if isinstance(pool, TimedQueuePool):
+            entry.update(checkout_wait_seconds=pool.wait_stats.as_dict(), timeouts=pool.timeouts)
+        stats[key or 'primary'] = entry
+    return stats
@@ -0,0 +1,116 @@
+# backend/district_graph.py
+
+import heapq
+import math
+
+# Centralized district data with coordinates for the map
+KERALA_DISTRICTS_COORDS = {
+    'Alappuzha': {'lat': 9.4981, 'lng': 76.3388}, 'Ernakulam': {'lat': 9.9816, 'lng': 76.2996},
+    'Idukki': {'lat': 9.8392, 'lng': 76.9746}, 'Kannur': {'lat': 11.8745, 'lng': 75.3704},
+    'Kasaragod': {'lat': 12.5002, 'lng': 74.9896}, 'Kollam': {'lat': 8.8932, 'lng': 76.6141},
+    'Kottayam': {'lat': 9.5916, 'lng': 76.5222}, 'Kozhikode': {'lat': 11.2588, 'lng': 75.7804},
+    'Malappuram': {'lat': 11.0736, 'lng': 76.0742}, 'Palakkad': {'lat': 10.7867, 'lng': 76.6548},
+    'Pathanamthitta': {'lat': 9.2648, 'lng': 76.7870}, 'Thiruvananthapuram': {'lat': 8.5241, 'lng': 76.9366},
+    'Thrissur': {'lat': 10.5276, 'lng': 76.2144}, 'Wayanad': {'lat': 11.6854, 'lng': 76.1320}
+}
+
+# Districts sharing a land border. static/data/kerala.geojson only holds the
+# state outline, so the adjacency is listed here (each pair once).
+DISTRICT_BORDERS = (
+    ('Thiruvananthapuram', 'Kollam'),
+    ('Kollam', 'Pathanamthitta'), ('Kollam', 'Alappuzha'),
+    ('Pathanamthitta', 'Alappuzha'), ('Pathanamthitta', 'Kottayam'), ('Pathanamthitta', 'Idukki'),
+    ('Alappuzha', 'Kottayam'), ('Alappuzha', 'Ernakulam'),
+    ('Kottayam', 'Idukki'), ('Kottayam', 'Ernakulam'),
+    ('Idukki', 'Ernakulam'), ('Idukki', 'Thrissur'),
+    ('Ernakulam', 'Thrissur'),
+    ('Thrissur', 'Palakkad'), ('Thrissur', 'Malappuram'),
+    ('Palakkad', 'Malappuram'),
+    ('Malappuram', 'Kozhikode'), ('Malappuram', 'Wayanad'),
+    ('Kozhikode', 'Wayanad'), ('Kozhikode', 'Kannur'),
+    ('Wayanad', 'Kannur'),
+    ('Kannur', 'Kasaragod'),
+)
+
+
+def haversine_km(a, b):
+    """Great-circle distance between two {'lat', 'lng'} points in kilometres."""
+    lat1, lng1, lat2, lng2 = map(math.radians, (a['lat'], a['lng'], b['lat'], b['lng']))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(h))
+
+
+class DistrictGraph:
+    """
+    District adjacency graph with a precomputed all-pairs path table.
+
+    Moving from district u into a neighbour v costs the distance between
+    their centres, scaled by v's risk: km * (1 + safety_weight * risk[v]),
+    with risk in [0, 1]. A weight of 0 gives plain shortest paths. Paths for
+    every pair are computed once (Floyd-Warshall), so lookups are dict reads.
+    """
+
+    def __init__(self, coords=KERALA_DISTRICTS_COORDS, borders=DISTRICT_BORDERS, risk=None, safety_weight=0.0):
+        self.districts = sorted(coords)
+        self.safety_weight = safety_weight
+        risk = risk or {}
+        self.edges = {name: {} for name in self.districts}
+        for u, v in borders:
+            km = haversine_km(coords[u], coords[v])
+            self.edges[u][v] = km * (1 + safety_weight * risk.get(v, 0.0))
+            self.edges[v][u] = km * (1 + safety_weight * risk.get(u, 0.0))
+        self._paths = self._all_pairs()
+
+    def _all_pairs(self):
+        """Floyd-Warshall with next-hop reconstruction; returns {(src, dst): (cost, path)}."""
+        nodes = self.districts
+        cost = {u: {v: (0.0 if u == v else self.edges[u].get(v, math.inf)) for v in nodes} for u in nodes}
+        next_hop = {u: {v: (v if v == u or v in self.edges[u] else None) for v in nodes} for u in nodes}
+        for k in nodes:
+            cost_k = cost[k]
+            for i in nodes:
+                cost_ik = cost[i][k]
+                if cost_ik == math.inf:
+                    continue
+                cost_i, next_i = cost[i], next_hop[i]
+                for j in nodes:
+                    through_k = cost_ik + cost_k[j]
+                    if through_k < cost_i[j]:
+                        cost_i[j] = through_k
+                        next_i[j] = next_i[k]
+
+        paths = {}
+        for u in nodes:
+            for v in nodes:
+                if next_hop[u][v] is None:
+                    continue
+                path, node = [u], u
+                while node != v:
+                    node = next_hop[node][v]
+                    path.append(node)
+                paths[(u, v)] = (cost[u][v], tuple(path))
+        return paths
+
+    def path(self, source, destination):
+        """Districts from source to destination (both included), or None if unreachable."""
+        entry = self._paths.get((source, destination))
+        return list(entry[1]) if entry else None
+
+    def cost(self, source, destination):
+        entry = self._paths.get((source, destination))
+        return entry[0] if entry else None
+
+    def dijkstra(self, source, destination):
+        """On-demand single-pair search over the same edges. Returns (cost, path) or None."""
+        queue, seen = [(0.0, source, (source,))], set()
+        while queue:
+            cost, node, path = heapq.heappop(queue)
+            if node == destination:
+                return cost, path
+            if node in seen:
+                continue
+            seen.add(node)
+            for neighbour, weight in self.edges[node].items():
+                if neighbour not in seen:
+                    heapq.heappush(queue, (cost + weight, neighbour, path + (neighbour,)))
+        return None
@@ -0,0 +1,55 @@
+# backend/favorites.py
+
+from sqlalchemy import select, insert, delete, exists, literal
+from models import db, Destination, user_favorites
+
+# --- Favorites access layer ---
+# Works on the user_favorites association table directly, so membership checks
+# and add/remove never load the user's Destination rows.
+
+
+def favorite_ids(user_id):
+    """Set of Destination ids the user has favorited (one query, ids only)."""
+    if user_id is None:
+        return set()
+    rows = db.session.execute(
+        select(user_favorites.c.destination_id).where(user_favorites.c.user_id == user_id)
+    )
+    return {dest_id for (dest_id,) in rows}
+
+
+def favorite_destinations(user_id):
+    """Full Destination rows of the user's favorites, for pages that render them."""
+    return (Destination.query
+            .join(user_favorites, user_favorites.c.destination_id == Destination.Destination_id)
+            .filter(user_favorites.c.user_id == user_id)
+            .order_by(Destination.Name, Destination.Place)
+            .all())
+
+
+def add_favorite(user_id, dest_id):
+    """
+    Adds a favorite with set semantics. Returns True if a row was inserted,
+    False if it already existed or the destination does not exist.
+    """
+    already_favorite = exists().where(
+        (user_favorites.c.user_id == user_id) & (user_favorites.c.destination_id == dest_id))
+    statement = insert(user_favorites).from_select(
+        ['user_id', 'destination_id'],
+        select(literal(user_id), Destination.Destination_id)
+        .where(Destination.Destination_id == dest_id, ~already_favorite)
+    )
+    return db.session.execute(statement).rowcount > 0
+
+
+def remove_favorite(user_id, dest_id):
+    """Removes a favorite. Returns True if a row was deleted."""
+    statement = delete(user_favorites).where(
+        (user_favorites.c.user_id == user_id) & (user_favorites.c.destination_id == dest_id))
+    return db.session.execute(statement).rowcount > 0
+
+
+def destination_exists(dest_id):
+    return db.session.execute(
+        select(Destination.Destination_id).where(Destination.Destination_id == dest_id)
+    ).first() is not None
@@ -0,0 +1,179 @@
+# backend/gemini_client.py
+
+import hashlib
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from backend.metrics import gemini_seconds
+
+# Default deadline for a single Gemini round-trip, overridable with GEMINI_TIMEOUT_SECONDS
+DEFAULT_TIMEOUT_SECONDS = 8.0
+
+# Shared pool for Gemini calls, so a slow LLM never runs on the request thread itself
+executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('GEMINI_MAX_WORKERS', 8)),
+    thread_name_prefix='gemini'
+)
+
+
+def request_options(timeout):
+    """
+    Per-call options for the SDK: a transport timeout and no automatic retry.
+    The SDK's default retry keeps retrying unavailable errors for up to 10
+    minutes regardless of the timeout, which only bounds each attempt; with
+    a single attempt the call really ends at its deadline. Callers fall back
+    to the built-in texts instead of retrying.
+    """
+    return {'timeout': timeout, 'retry': None}
+
+
+def generate_content(model, prompt, timeout=DEFAULT_TIMEOUT_SECONDS, deadline=None):
+    """
+    Blocking generate_content call bounded by `timeout` (one attempt), so the
+    pool thread is released even if nobody waits for the answer anymore.
+    With `deadline` (time.monotonic()) a call that waited on the pool only
+    gets the time left, and is not sent at all once its callers gave up.
+    """
+    if deadline is not None:
+        timeout = min(timeout, deadline - time.monotonic())
+        if timeout <= 0:
+            raise TimeoutError("Gemini call expired while queued")
+    start, outcome = time.perf_counter(), 'error'
+    try:
+        response = model.generate_content(prompt, request_options=request_options(timeout))
+        outcome = 'ok'
+        return response
+    finally:
+        gemini_seconds.observe(time.perf_counter() - start, kind='generate', outcome=outcome)
+
+
+def submit(fn, *args, **kwargs):
+    """Runs `fn` on the Gemini pool and returns its Future."""
+    return executor.submit(fn, *args, **kwargs)
+
+
+class SingleFlight:
+    """
+    Deduplicates identical in-flight calls: the first caller for a key starts
+    the upstream call on the pool, and every concurrent caller with the same
+    key gets that same Future instead of starting another one.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self.upstream = 0
+        self.coalesced = 0
+
+    def submit(self, key, fn, *args):
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future
+            future = executor.submit(fn, *args)
+            self._inflight[key] = future
+            self.upstream += 1
+        future.add_done_callback(lambda done: self._forget(key, done))
+        return future
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def stats(self):
+        with self._lock:
+            return {'upstream_calls': self.upstream, 'coalesced_calls': self.coalesced, 'in_flight': len(self._inflight)}
+
+
+# Every non-streaming Gemini call goes through here, keyed by model + prompt hash
+gemini_calls = SingleFlight()
+
+
+def shared_generate(model, prompt, timeout=DEFAULT_TIMEOUT_SECONDS):
+    """Returns a Future for generate_content, shared with identical in-flight prompts."""
+    key = hashlib.sha256(f"{getattr(model, 'model_name', '')}\n{prompt}".encode('utf-8')).hexdigest()
+    return gemini_calls.submit(key, generate_content, model, prompt, timeout, time.monotonic() + timeout)
+
+
+def wait_for(future, timeout):
+    """
+    Waits up to `timeout` seconds for a shared call and raises TimeoutError on expiry.
+    The call is not cancelled, because other callers may still be waiting on it;
+    the transport timeout bounds it instead.
+    """
+    try:
+        return future.result(timeout=max(timeout, 0))
+    except FutureTimeoutError:
+        raise TimeoutError(f"Gemini call exceeded its {timeout:.1f}s deadline")
+
+
+def generate_with_deadline(model, prompt, timeout=DEFAULT_TIMEOUT_SECONDS):
+    """
+    Runs generate_content on the pool (coalesced with identical in-flight
+    prompts) and waits at most `timeout` seconds. Raises TimeoutError when
+    the deadline expires.
+    """
+    return wait_for(shared_generate(model, prompt, timeout), timeout)
+
+
+def stream_content(model, prompt, timeout=DEFAULT_TIMEOUT_SECONDS):
+    """Yields the text of each chunk as Gemini produces it."""
+    start, outcome = time.perf_counter(), 'error'
+    try:
+        for chunk in model.generate_content(prompt, stream=True, request_options=request_options(timeout)):
+            text = getattr(chunk, 'text', '')
+            if text:
+                yield text
+        outcome = 'ok'
+    finally:
+        gemini_seconds.observe(time.perf_counter() - start, kind='stream', outcome=outcome)
+
+
+class LatencyStats:
+    """Running count/sum/max plus percentiles over the most recent samples (seconds)."""
+
+    def __init__(self, window=500):
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        with self._lock:
+            self._recent.append(seconds)
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    def as_dict(self):
+        with self._lock:
+            recent = sorted(self._recent)
+            count, total, maximum = self.count, self.total, self.max
+
+        def percentile(p):
+            return round(recent[min(len(recent) - 1, int(p * len(recent)))], 4) if recent else None
+
+        return {
+            'count': count, 'avg': round(total / count, 4) if count else None,
+            'p50': percentile(0.50), 'p95': percentile(0.95), 'max': round(maximum, 4),
+        }
+
+
+# Time from receiving a streamed /api/chat request to sending its first token
+chat_ttfb = LatencyStats()
+
+
+def timed_stream(chunks, started_at, stats=chat_ttfb):
+    """Passes `chunks` through, recording the time to the first one in `stats`."""
+    first = True
+    for chunk in chunks:
+        if first:
+            stats.observe(time.perf_counter() - started_at)
+            first = False
+        yield chunk
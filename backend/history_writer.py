@@ -0,0 +1,133 @@
+# backend/history_writer.py
+
+import atexit
+import datetime
+import queue
+import threading
+
+from models import db, RouteHistory, encode_stops
+
+
+class RouteHistoryWriter:
+    """
+    Write-behind queue for RouteHistory rows.
+
+    Requests only enqueue the row; a daemon thread writes everything queued
+    as one bulk INSERT every `interval` seconds, or as soon as `batch_size`
+    rows are waiting. The queue holds at most `max_pending` rows: when it is
+    full a request waits up to `put_timeout` seconds for room and then writes
+    its own row, so a slow database slows requests down instead of losing
+    history. Queued rows are flushed at interpreter shutdown, and a batch
+    that fails is kept for the next attempt (up to `max_pending` rows).
+    With interval <= 0 every row is written through in the request, as before.
+    """
+
+    def __init__(self, interval=0.5, batch_size=200, max_pending=10000, put_timeout=1.0):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.put_timeout = put_timeout
+        self._app = None
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._retry = []
+        self._wake = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self.written = 0
+        self.batches = 0
+        self.overflows = 0
+        self.failures = 0
+
+    def init_app(self, app):
+        self._app = app
+        self.interval = app.config.get('ROUTE_HISTORY_FLUSH_SECONDS', self.interval)
+        self.batch_size = app.config.get('ROUTE_HISTORY_BATCH_SIZE', self.batch_size)
+        self.max_pending = app.config.get('ROUTE_HISTORY_QUEUE_SIZE', self.max_pending)
+        self._queue = queue.Queue(maxsize=self.max_pending)
+        if self.interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='route-history-writer', daemon=True)
+            self._thread.start()
+            atexit.register(self.flush)
+
+    def after_fork(self):
+        """Restarts the writer thread in a worker forked from a preloaded master."""
+        self._queue = queue.Queue(maxsize=self.max_pending)
+        self._retry = []
+        self._wake = threading.Event()
+        self._flush_lock = threading.Lock()
+        if self._thread is not None:
+            self._thread = threading.Thread(target=self._run, name='route-history-writer', daemon=True)
+            self._thread.start()
+
+    def submit(self, user_id, source, destination, interest, budget, stops):
+        """Saves one generated route for `user_id`; `stops` is serialized by the writer."""
+        row = {'user_id': user_id, 'source': source, 'destination': destination, 'interest': interest,
+               'budget': budget, 'stops': stops, 'created_at': datetime.datetime.now()}
+        if self._thread is None:
+            self._write([row])
+            return
+        try:
+            self._queue.put(row, timeout=self.put_timeout)
+        except queue.Full:
+            self.overflows += 1
+            self._write([row])
+            return
+        if self._queue.qsize() >= self.batch_size:
+            self._wake.set()
+
+    def pending(self):
+        return self._queue.qsize() + len(self._retry)
+
+    def flush(self):
+        """Writes every queued row now, in batches. Returns the number of rows written."""
+        with self._flush_lock:
+            rows, self._retry = self._retry, []
+            try:
+                while True:
+                    rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            written = 0
+            for start in range(0, len(rows), self.batch_size):
+                batch = rows[start:start + self.batch_size]
+                if self._write(batch):
+                    written += len(batch)
+                else:
+                    self._retry = rows[start:][-self.max_pending:]  # keep the rest for the next attempt
+                    if len(rows) - start > self.max_pending:
+                        print(f"Route History WARNING: Dropped {len(rows) - start - self.max_pending} unsaved routes.")
+                    break
+            return written
+
+    def _write(self, rows):
+        if self._app is None:
+            return False
+        records = [{'user_id': row['user_id'], 'source': row['source'], 'destination': row['destination'],
+                    'interest': row['interest'], 'budget': row['budget'], 'created_at': row['created_at'],
+                    'stops_data': encode_stops(row['stops'])} for row in rows]
+        try:
+            with self._app.app_context():
+                db.session.execute(RouteHistory.__table__.insert(), records)
+                db.session.commit()
+        except Exception as e:
+            self.failures += 1
+            print(f"ERROR: Could not save route history. {e}")
+            return False
+        self.written += len(rows)
+        self.batches += 1
+        return True
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+    def stats(self):
+        return {'pending': self.pending(), 'written': self.written, 'batches': self.batches,
+                'overflows': self.overflows, 'failures': self.failures,
+                'interval': self.interval, 'batch_size': self.batch_size, 'max_pending': self.max_pending}
+
+
+# Shared by every request in this worker process
+route_history = RouteHistoryWriter()
@@ -0,0 +1,103 @@
+# backend/http_cache.py
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+from flask import Response, request
+
+
+def make_etag(version, key):
+    """ETag for the response to `key` built from data `version`."""
+    return hashlib.sha1(repr((version, key)).encode('utf-8')).hexdigest()[:24]
+
+
+class ResponseCache:
+    """
+    Serialized response bodies keyed by request (path and arguments).
+
+    Every entry belongs to one data version, a tuple of the versions the
+    response was built from (e.g. destination_version and the risk data
+    snapshot). The first lookup with a different version drops everything,
+    so an admin write invalidates the cache in each worker as soon as that
+    worker sees the bumped version. Least recently used bodies are evicted
+    past `max_bytes`.
+    """
+
+    def __init__(self, max_bytes=16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._bodies = OrderedDict()
+        self._size = 0
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def lookup(self, version, key):
+        with self._lock:
+            if version != self._version:
+                self._bodies.clear()
+                self._size = 0
+                self._version = version
+            body = self._bodies.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._bodies.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def store(self, version, key, body):
+        with self._lock:
+            if version != self._version or len(body) > self.max_bytes:
+                return
+            previous = self._bodies.pop(key, None)
+            self._size += len(body) - (len(previous) if previous is not None else 0)
+            self._bodies[key] = body
+            while self._size > self.max_bytes:
+                _, evicted = self._bodies.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._bodies.clear()
+            self._size = 0
+            self._version = None
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._bodies), 'bytes': self._size, 'hits': self.hits,
+                    'misses': self.misses, 'not_modified': self.not_modified}
+
+
+def conditional_response(cache, version, key, build, mimetype='application/json',
+                         cache_control='no-cache', headers=None):
+    """
+    Answers the current request for `key` at data `version`.
+
+    A matching If-None-Match gets an empty 304 without building anything.
+    Otherwise the body comes from `cache` or from `build()` (which returns
+    bytes or str) and is sent with its ETag. The default Cache-Control makes
+    browsers revalidate every time, so edits show up on the next request.
+    """
+    etag = make_etag(version, key)
+    if request.if_none_match.contains(etag):
+        cache.not_modified += 1
+        response = Response(status=304)
+    else:
+        body = cache.lookup(version, key)
+        if body is None:
+            body = build()
+            if isinstance(body, str):
+                body = body.encode('utf-8')
+            cache.store(version, key, body)
+        response = Response(body, mimetype=mimetype, headers=headers)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+
+# Search API pages and file downloads, shared by every request in this worker process
+search_responses = ResponseCache()
+download_responses = ResponseCache(max_bytes=64 * 1024 * 1024)
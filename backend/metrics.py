@@ -0,0 +1,233 @@
+# backend/metrics.py
+
+import bisect
+import cProfile
+import os
+import random
+import threading
+import time
+
+from flask import Response, abort, current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from backend import health_bp
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Upper bounds of the SQL queries-per-request histogram buckets
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+def _label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    return '{' + ','.join(f'{name}="{_label_value(value)}"' for name, value in pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Prometheus-style histogram: per label set, observation counts per bucket plus their sum."""
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}   # label values -> [count per bucket (last = +Inf), sum]
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.labels)
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][slot] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((key, list(counts), total) for key, (counts, total) in self._series.items())
+        for key, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(self.labels, key, [('le', bound)])} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {total!r}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """The histograms of this worker, plus gauges read from other components at scrape time."""
+
+    def __init__(self):
+        self._histograms = []
+        self._collectors = {}
+
+    def histogram(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        histogram = Histogram(name, help_text, labels, buckets)
+        self._histograms.append(histogram)
+        return histogram
+
+    def add_collector(self, name, collect):
+        """`collect()` returns (metric name, type, help, [(labels dict, value)]) tuples; replaces one of the same name."""
+        self._collectors[name] = collect
+
+    def render(self):
+        lines = []
+        for histogram in self._histograms:
+            lines.extend(histogram.render())
+        for name, collect in self._collectors.items():
+            try:
+                families = collect()
+            except Exception as e:
+                print(f"Metrics WARNING: Collector '{name}' failed: {e}")
+                continue
+            for metric, kind, help_text, samples in families:
+                lines.extend([f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"])
+                for labels, value in samples:
+                    if value is not None:
+                        lines.append(f"{metric}{_labels(labels.keys(), labels.values())} {_number(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+# Shared by every request in this worker process; each worker reports its own numbers
+registry = Registry()
+request_seconds = registry.histogram(
+    'http_request_duration_seconds', 'Time to handle a request, until the response is returned (not streamed).',
+    ('endpoint', 'method', 'status'))
+request_sql_queries = registry.histogram(
+    'http_request_sql_queries', 'SQL statements run while handling a request.', ('endpoint',), QUERY_COUNT_BUCKETS)
+request_sql_seconds = registry.histogram(
+    'http_request_sql_duration_seconds', 'Total SQL time of a request.', ('endpoint',))
+sql_seconds = registry.histogram(
+    'db_query_duration_seconds', 'Duration of each SQL statement, requests and background threads alike.', ('statement',))
+gemini_seconds = registry.histogram(
+    'gemini_call_duration_seconds', 'Duration of Gemini calls, to the last chunk for streamed ones.', ('kind', 'outcome'))
+safety_seconds = registry.histogram(
+    'safety_calculation_duration_seconds', 'Time to score a batch of locations (calculate_safety_batch).',
+    ('engine', 'source'))
+
+
+# --- SQL timing (SQLAlchemy events, every engine) ---
+# The start time lives on the statement's execution context, so a statement that
+# raises (no after_cursor_execute) leaves nothing behind on the pooled connection
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context.metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, 'metrics_started', None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    sql_seconds.observe(elapsed, statement=statement.lstrip().split(None, 1)[0].upper() if statement.strip() else '')
+    if has_request_context() and 'metrics_sql_queries' in g:
+        g.metrics_sql_queries += 1
+        g.metrics_sql_seconds += elapsed
+
+
+def _listen_sql():
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+# --- Slow requests ---
+# Only one request is profiled at a time: profilers of concurrent threads would get in each other's way
+_profile_lock = threading.Lock()
+
+
+def _start_request():
+    g.metrics_started = time.perf_counter()
+    g.metrics_sql_queries = 0
+    g.metrics_sql_seconds = 0.0
+    rate = current_app.config.get('METRICS_PROFILE_SAMPLE_RATE', 0)
+    if rate > 0 and random.random() < rate and _profile_lock.acquire(blocking=False):
+        g.metrics_profile = cProfile.Profile()
+        g.metrics_profile.enable()
+
+
+def _record_status(response):
+    g.metrics_status = response.status_code
+    return response
+
+
+def _finish_request(exc):
+    if 'metrics_started' not in g:
+        return
+    elapsed = time.perf_counter() - g.pop('metrics_started')
+    profile = g.pop('metrics_profile', None)
+    if profile is not None:
+        profile.disable()
+        _profile_lock.release()
+    endpoint = request.endpoint or 'unmatched'
+    status = 500 if exc is not None else g.get('metrics_status', 500)
+    queries, sql_time = g.get('metrics_sql_queries', 0), g.get('metrics_sql_seconds', 0.0)
+    request_seconds.observe(elapsed, endpoint=endpoint, method=request.method, status=status)
+    request_sql_queries.observe(queries, endpoint=endpoint)
+    request_sql_seconds.observe(sql_time, endpoint=endpoint)
+
+    threshold = current_app.config.get('SLOW_REQUEST_SECONDS', 0)
+    if threshold > 0 and elapsed >= threshold:
+        message = (f"Slow Request WARNING: {request.method} {request.full_path.rstrip('?')} ({endpoint}) -> {status} "
+                   f"took {elapsed * 1000:.0f} ms, {queries} SQL queries in {sql_time * 1000:.0f} ms.")
+        if profile is not None:
+            message += f" Profile: {_dump_profile(profile, endpoint)}"
+        print(message)
+
+
+def _dump_profile(profile, endpoint):
+    """Saves the profile of a slow request for `python -m pstats` / snakeviz; returns the path."""
+    directory = current_app.config.get('METRICS_PROFILE_DIR') or os.path.join(current_app.instance_path, 'profiles')
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{endpoint}.prof")
+    profile.dump_stats(path)
+    return path
+
+
+# --- Gauges from other components ---
+def _pool_metrics():
+    from backend.db_profile import pool_stats
+    stats = pool_stats()
+    families = [('db_pool_size', 'size', 'Connections the pool keeps open.'),
+                ('db_pool_checked_out', 'checked_out', 'Connections in use.'),
+                ('db_pool_overflow', 'overflow', 'Connections open beyond the pool size (negative while below it).')]
+    result = [(metric, 'gauge', help_text, [({'bind': bind}, entry.get(key)) for bind, entry in stats.items()])
+              for metric, key, help_text in families]
+    result.append(('db_pool_checkout_timeouts_total', 'counter', 'Checkouts that gave up after pool_timeout.',
+                   [({'bind': bind}, entry.get('timeouts')) for bind, entry in stats.items()]))
+    result.append(('db_pool_checkout_wait_seconds_avg', 'gauge', 'Average time a checkout waited for a connection.',
+                   [({'bind': bind}, (entry.get('checkout_wait_seconds') or {}).get('avg'))
+                    for bind, entry in stats.items()]))
+    return result
+
+
+def init_app(app):
+    """Registers the request hooks, SQL timing and the pool gauges; no-op unless METRICS_ENABLED."""
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+    _listen_sql()
+    app.before_request(_start_request)
+    app.after_request(_record_status)
+    app.teardown_request(_finish_request)
+    registry.add_collector('db_pool', _pool_metrics)
+
+
+@health_bp.route('/metrics')
+def metrics():
+    """Prometheus text exposition of this worker's request, SQL, Gemini and safety timings."""
+    if not current_app.config.get('METRICS_ENABLED', True):
+        abort(404)
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
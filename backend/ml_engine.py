@@ -0,0 +1,97 @@
+# backend/ml_engine.py
+
+import threading
+import warnings
+from collections import OrderedDict
+
+import numpy as np
+
+# Raw feature order used for every prediction row (matches train_model.py)
+FEATURE_FIELDS = (
+    'temperature_c', 'rainfall_mm', 'humidity_percent', 'disease_cases',
+    'month', 'district', 'place', 'disaster_event'
+)
+NUMERIC_FIELDS = FEATURE_FIELDS[:5]
+CATEGORICAL_FIELDS = FEATURE_FIELDS[5:]
+
+
+class SafetyPredictor:
+    """
+    Batched, cached inference around the trained RandomForest.
+    Rows are tuples in FEATURE_FIELDS order. They are one-hot encoded
+    straight into a NumPy matrix using the saved `model_columns`, so no
+    pandas DataFrame is built per call. Results are kept in an LRU cache
+    keyed by the feature tuple.
+    """
+
+    def __init__(self, model, columns, cache_size=4096):
+        self.model = model
+        self.columns = list(columns)
+        self._positions = {name: i for i, name in enumerate(self.columns)}
+        self._numeric_positions = [self._positions[name] for name in NUMERIC_FIELDS]
+        self._high_risk_col = list(model.classes_).index('High Risk') if 'High Risk' in model.classes_ else None
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def encode(self, rows):
+        """One-hot aligns feature rows to the model columns; unknown categories stay all-zero."""
+        matrix = np.zeros((len(rows), len(self.columns)), dtype=np.float64)
+        for r, row in enumerate(rows):
+            matrix[r, self._numeric_positions] = row[:len(NUMERIC_FIELDS)]
+            for field, value in zip(CATEGORICAL_FIELDS, row[len(NUMERIC_FIELDS):]):
+                position = self._positions.get(f"{field}_{value}")
+                if position is not None:
+                    matrix[r, position] = 1.0
+        return matrix
+
+    def predict(self, rows):
+        """
+        Predicts a list of feature rows, running the forest once for all cache misses.
+        Returns (label, high_risk_probability) tuples in input order.
+        """
+        rows = [tuple(row) for row in rows]
+        results = [None] * len(rows)
+        pending = {}
+        with self._lock:
+            for i, row in enumerate(rows):
+                cached = self._cache.get(row)
+                if cached is not None:
+                    self._cache.move_to_end(row)
+                    self.hits += 1
+                    results[i] = cached
+                else:
+                    pending.setdefault(row, []).append(i)
+            self.misses += len(pending)
+
+        if pending:
+            missing = list(pending)
+            with warnings.catch_warnings():
+                # The forest was fitted on a DataFrame; we predict on plain arrays aligned to the same columns
+                warnings.filterwarnings('ignore', message='X does not have valid feature names', category=UserWarning)
+                probabilities = self.model.predict_proba(self.encode(missing))
+            labels = self.model.classes_[probabilities.argmax(axis=1)]
+            with self._lock:
+                for row, label, proba in zip(missing, labels, probabilities):
+                    high = float(proba[self._high_risk_col]) if self._high_risk_col is not None else 0.0
+                    prediction = (str(label), high)
+                    for i in pending[row]:
+                        results[i] = prediction
+                    self._cache[row] = prediction
+                    self._cache.move_to_end(row)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return results
+
+    def predict_one(self, row):
+        return self.predict([row])[0]
+
+    def cache_info(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._cache), 'max_size': self.cache_size}
+
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
@@ -0,0 +1,65 @@
+# backend/pagination.py
+
+import base64
+import datetime
+import json
+
+from sqlalchemy import and_, or_
+
+# Page sizes accepted from ?limit=
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+
+
+def page_size(value, default=DEFAULT_PAGE_SIZE):
+    """Clamps a requested page size to 1..MAX_PAGE_SIZE."""
+    try:
+        return max(1, min(int(value), MAX_PAGE_SIZE))
+    except (TypeError, ValueError):
+        return default
+
+
+def encode_cursor(values):
+    """Opaque, URL-safe cursor for the sort key of the last row of a page."""
+    encoded = [v.isoformat() if isinstance(v, datetime.datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(encoded).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, datetime_positions=()):
+    """Returns the cursor's values, or None for a missing or malformed cursor."""
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if (not isinstance(values, list) or len(values) <= max(datetime_positions, default=-1)
+                or not all(isinstance(value, (str, int, float)) for value in values)):
+            return None
+        for position in datetime_positions:
+            values[position] = datetime.datetime.fromisoformat(values[position])
+        return values
+    except (ValueError, TypeError, IndexError):
+        return None
+
+
+def keyset_page(query, columns, cursor_values, limit, descending=False):
+    """
+    Returns (rows, next_cursor_values) for the page after `cursor_values`.
+
+    `columns` is the full sort key, ending in a unique column. The "after"
+    condition is written as (a > x) OR (a = x AND b > y) rather than a row
+    value comparison, so MySQL and SQLite can both seek on the composite
+    index. One extra row is fetched to know whether another page exists.
+    """
+    if cursor_values is not None and len(cursor_values) == len(columns):
+        conditions, equal = [], []
+        for column, value in zip(columns, cursor_values):
+            beyond = column < value if descending else column > value
+            conditions.append(and_(*equal, beyond))
+            equal.append(column == value)
+        query = query.filter(or_(*conditions))
+    query = query.order_by(*[c.desc() if descending else c.asc() for c in columns])
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, [getattr(rows[-1], column.key) for column in columns]
@@ -0,0 +1,355 @@
+# backend/risk_dataset.py
+
+import datetime
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from backend.safety_index import SafetyIndex
+
+# Shared snapshots kept in the shared directory; older ones are deleted (mapped files stay readable)
+SHARED_SNAPSHOTS_KEPT = 3
+
+
+# --- Memory-mapped snapshot files ---
+def save_frame(directory, df):
+    """
+    Writes a prepared risk log as one .npy file per column plus a JSON list
+    of the columns. Categoricals are stored as codes with their categories
+    in the JSON. Raises TypeError for columns that cannot be mapped
+    (Python object or string columns).
+    """
+    os.makedirs(directory, exist_ok=True)
+    columns = []
+    for position, name in enumerate(df.columns):
+        column = df[name]
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            categories = column.cat.categories
+            if not all(isinstance(c, str) for c in categories):
+                raise TypeError(f"column {name!r} has non-string categories")
+            values, meta = column.array.codes, {'categories': list(categories)}
+        elif column.dtype.kind in 'biufmM':
+            values, meta = column.to_numpy(), {}
+        else:
+            raise TypeError(f"column {name!r} has dtype {column.dtype}")
+        np.save(os.path.join(directory, f'{position}.npy'), values)
+        columns.append(dict(meta, name=name))
+    with open(os.path.join(directory, 'frame.json'), 'w') as meta_file:
+        json.dump({'columns': columns, 'rows': len(df)}, meta_file)
+
+
+def load_frame(directory, mmap_mode='r'):
+    """Opens a frame written by save_frame(); its columns are read-only views of the mapped files."""
+    with open(os.path.join(directory, 'frame.json')) as meta_file:
+        meta = json.load(meta_file)
+    data = {}
+    for position, column in enumerate(meta['columns']):
+        values = np.load(os.path.join(directory, f'{position}.npy'), mmap_mode=mmap_mode)
+        if 'categories' in column:
+            dtype = pd.CategoricalDtype(pd.Index(column['categories'], dtype='str'))
+            values = pd.Categorical.from_codes(values, dtype=dtype, validate=False)
+        data[column['name']] = values
+    return pd.DataFrame(data, copy=False)
+
+
+class RiskSnapshot:
+    """
+    One immutable version of the in-memory risk data: the prepared risk log
+    DataFrame and the SafetyIndex built from it. Never modified after creation.
+    """
+    __slots__ = ('df', 'index', 'version', 'loaded_at')
+
+    def __init__(self, df, index, version, loaded_at=None):
+        self.df = df
+        self.index = index
+        self.version = version
+        self.loaded_at = loaded_at or datetime.datetime.now()
+
+
+class RiskDataset:
+    """
+    Holds the current RiskSnapshot behind a single reference.
+
+    Readers take `dataset.current` once per operation and use that snapshot
+    throughout; they never lock. Writers (admin edits, reloads) build a new
+    snapshot off to the side and swap the reference in one assignment.
+    A stamp file shared by all workers carries the data version: every write
+    rewrites it, and a watcher thread in each worker reloads in the background
+    when the stamp's mtime changes.
+
+    With a shared directory, the worker that builds a version also saves it
+    there (prepared columns and index arrays, see save_frame and
+    SafetyIndex.save) before publishing it, and every worker, the builder
+    included, memory-maps those files read-only. Workers then share one copy
+    of the risk data in the page cache instead of each holding its own, and
+    a reload after another worker's write only maps files.
+    """
+
+    def __init__(self, prepare=None):
+        self._prepare = prepare or (lambda df: df)
+        self.current = RiskSnapshot(pd.DataFrame(), SafetyIndex(), version='0')
+        self._loader = None
+        self._stamp_path = None
+        self._shared_dir = None
+        self._stamp_mtime = None
+        self._write_lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+        self._watch_interval = None
+        self.reload_count = 0
+        self.last_error = None
+
+    # --- Configuration ---
+    def configure(self, loader, stamp_path=None, shared_dir=None):
+        """
+        Sets the function returning a raw risk log DataFrame, the shared stamp
+        file and the directory of memory-mapped snapshots (None keeps every
+        snapshot in this process's heap).
+        """
+        self._loader = loader
+        self._stamp_path = stamp_path
+        self._shared_dir = shared_dir
+
+    # --- Version stamp shared between workers ---
+    def _read_stamp(self):
+        """Returns (mtime_ns, version) of the stamp file, or (None, None) if it is missing."""
+        if not self._stamp_path:
+            return None, None
+        try:
+            mtime = os.stat(self._stamp_path).st_mtime_ns
+            with open(self._stamp_path) as stamp:
+                return mtime, stamp.read().strip() or str(mtime)
+        except OSError:
+            return None, None
+
+    def _write_stamp(self, version=None):
+        """Publishes a data version (a new one by default) to every worker and returns it."""
+        version = version or str(time.time_ns())
+        if self._stamp_path:
+            os.makedirs(os.path.dirname(self._stamp_path) or '.', exist_ok=True)
+            tmp_path = f"{self._stamp_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as stamp:
+                stamp.write(version)
+            os.replace(tmp_path, self._stamp_path)
+            self._stamp_mtime = os.stat(self._stamp_path).st_mtime_ns
+        return version
+
+    # --- Memory-mapped snapshots shared between workers ---
+    def _shared_path(self, version):
+        return os.path.join(self._shared_dir, version) if self._shared_dir and version else None
+
+    def _open_shared(self, version):
+        """Maps the saved snapshot of `version`; returns (df, index) or None if there is none."""
+        path = self._shared_path(version)
+        if path is None or not os.path.isdir(path):
+            return None
+        return load_frame(os.path.join(path, 'frame')), SafetyIndex.load(os.path.join(path, 'index'))
+
+    def _share(self, df, index, version):
+        """
+        Saves a snapshot for `version` (unless another worker already did) and
+        returns the mapped (df, index). Falls back to the in-heap copies if it
+        cannot be saved, e.g. for columns that cannot be mapped.
+        """
+        path = self._shared_path(version)
+        if path is None or df.empty:
+            return df, index
+        try:
+            if not os.path.isdir(path):
+                tmp_path = os.path.join(self._shared_dir, f'.{version}.{os.getpid()}.tmp')
+                save_frame(os.path.join(tmp_path, 'frame'), df)
+                index.save(os.path.join(tmp_path, 'index'))
+                try:
+                    os.rename(tmp_path, path)
+                except OSError:
+                    shutil.rmtree(tmp_path, ignore_errors=True)  # another worker saved it first
+                self._remove_old_shared()
+            return self._open_shared(version)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Risk Dataset WARNING: Could not share snapshot {version}: {e}")
+            return df, index
+
+    def _remove_old_shared(self):
+        """Deletes all but the newest SHARED_SNAPSHOTS_KEPT snapshots; workers still mapping them are unaffected."""
+        snapshots = [entry for entry in os.scandir(self._shared_dir)
+                     if entry.is_dir() and not entry.name.startswith('.')]
+        snapshots.sort(key=lambda entry: entry.stat().st_mtime_ns, reverse=True)
+        for entry in snapshots[SHARED_SNAPSHOTS_KEPT:]:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+    # --- Writers ---
+    def replace(self, df, districts=None, publish=True):
+        """
+        Swaps in a new raw risk log. With `districts`, only those safety index
+        buckets are rebuilt and the rest are shared with the previous snapshot.
+        """
+        prepared = self._prepare(df)
+        with self._write_lock:
+            previous = self.current
+            if districts is None or not self._is_latest(previous):
+                # A stale snapshot's other buckets may miss another worker's edits
+                index = SafetyIndex.from_dataframe(prepared)
+            else:
+                index = previous.index.rebuild_districts(prepared, districts)
+            self._swap(prepared, index, previous, publish)
+        return self.current
+
+    def update(self, change, publish=True):
+        """
+        Applies `change(previous_df) -> (new_prepared_df, touched_districts)`
+        against the current snapshot under the write lock, so concurrent edits
+        in this worker cannot overwrite each other. If another worker published
+        a version this worker has not loaded yet (or nothing was published),
+        patching would drop that worker's edits, so the whole risk log is
+        re-read from the loader and published instead.
+        """
+        with self._write_lock:
+            previous = self.current
+            if self._is_latest(previous):
+                df, districts = change(previous.df)
+                index = previous.index.rebuild_districts(df, districts)
+                if self._swap(df, index, previous, publish, patched=True):
+                    return self.current
+        return self.reload(publish=True)
+
+    def _swap(self, df, index, previous, publish, patched=False):
+        """
+        Installs a new snapshot (write lock held); a published one is shared
+        before the stamp moves. A `patched` copy of `previous` is only shared
+        and published while `previous` is still the latest version: if another
+        worker published meanwhile, nothing is installed and False is returned,
+        so the caller re-reads the loader instead of spreading a stale copy.
+        """
+        if publish:
+            if patched and not self._is_latest(previous):
+                return False
+            version = str(time.time_ns())
+            df, index = self._share(df, index, version)
+            self._write_stamp(version)
+        else:
+            version = previous.version
+        self.current = RiskSnapshot(df, index, version)
+        return True
+
+    def reload(self, publish=False):
+        """
+        Swaps in the published version: mapped from the shared directory when
+        another worker already saved it, else re-read from the loader (and
+        saved for the others). publish=True always re-reads the loader and
+        publishes the result as a new version. Blocks the caller.
+        """
+        if self._loader is None:
+            return self.current
+        with self._reload_lock:
+            stamp_mtime, version = self._read_stamp()
+            try:
+                shared = None if publish else self._open_shared(version)
+                if shared is None:
+                    prepared = self._prepare(self._loader())
+                    index = SafetyIndex.from_dataframe(prepared)
+                    if publish:
+                        version = str(time.time_ns())
+                    prepared, index = self._share(prepared, index, version)
+                else:
+                    prepared, index = shared
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Risk Dataset WARNING: Reload failed: {e}")
+                return self.current
+            with self._write_lock:
+                if publish:
+                    self._write_stamp(version)
+                    stamp_mtime = self._stamp_mtime
+                self.current = RiskSnapshot(prepared, index, version or self.current.version)
+                self._stamp_mtime = stamp_mtime
+            self.reload_count += 1
+            self.last_error = None
+        return self.current
+
+    def reload_async(self, publish=False):
+        """Starts a background reload unless one is already running. Returns the thread or None."""
+        if self._reload_lock.locked():
+            return None
+        thread = threading.Thread(target=self.reload, kwargs={'publish': publish}, name='risk-data-reload', daemon=True)
+        thread.start()
+        return thread
+
+    def _is_latest(self, snapshot):
+        """True if `snapshot` is the version last published by any worker (always, without a stamp file)."""
+        if not self._stamp_path:
+            return True
+        _, version = self._read_stamp()
+        return version is not None and version == snapshot.version
+
+    def published_version(self):
+        """Latest version published by any worker (this worker's own without a stamp file)."""
+        _, version = self._read_stamp()
+        return version or self.current.version
+
+    def request_reload(self):
+        """Explicit trigger: re-reads the loader here and publishes the result, so every worker picks it up."""
+        return self.reload_async(publish=True)
+
+    # --- Change detection ---
+    def check_for_changes(self):
+        """Starts a background reload if another worker published a new version."""
+        stamp_mtime, _ = self._read_stamp()
+        if stamp_mtime is not None and stamp_mtime != self._stamp_mtime:
+            return self.reload_async()
+        return None
+
+    def start_watching(self, interval=5.0):
+        """Polls the stamp file every `interval` seconds in a daemon thread."""
+        if self._watcher is not None or not self._stamp_path or interval <= 0:
+            return
+        self._watch_interval = interval
+
+        def watch():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.check_for_changes()
+                except Exception as e:
+                    print(f"Risk Dataset WARNING: Change check failed: {e}")
+
+        self._watcher = threading.Thread(target=watch, name='risk-data-watcher', daemon=True)
+        self._watcher.start()
+
+    def after_fork(self):
+        """Restarts the watcher in a worker forked from a preloaded master (threads do not survive fork)."""
+        self._write_lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        interval, self._watcher = self._watch_interval, None
+        if interval:
+            self.start_watching(interval)
+
+    def memory_report(self):
+        """Bytes held by the live snapshot: each DataFrame column and the safety index arrays."""
+        snapshot = self.current
+        columns = {name: int(size) for name, size in snapshot.df.memory_usage(deep=True, index=False).items()}
+        index_bytes = snapshot.index.memory_bytes()
+        return {
+            'rows': len(snapshot.df),
+            'columns': columns,
+            'dataframe_bytes': sum(columns.values()),
+            'index_bytes': index_bytes,
+            'total_bytes': sum(columns.values()) + index_bytes,
+            'shared': isinstance(snapshot.index.dates, np.memmap),
+        }
+
+    def status(self):
+        """Summary of the live snapshot for admin pages and ops."""
+        snapshot = self.current
+        return {
+            'version': snapshot.version,
+            'loaded_at': snapshot.loaded_at,
+            'rows': len(snapshot.df),
+            'reloads': self.reload_count,
+            'reloading': self._reload_lock.locked(),
+            'last_error': self.last_error,
+        }
@@ -0,0 +1,79 @@
+# backend/risk_store.py
+
+import io
+import pandas as pd
+from models import db, RiskEvent
+
+# Column order of risklog.csv, used for import and export
+RISK_LOG_COLUMNS = [
+    'date', 'district', 'place', 'temperature_c', 'rainfall_mm',
+    'humidity_percent', 'disease_cases', 'disaster_event', 'description'
+]
+
+
+def _records_from_frame(df):
+    """Converts a raw risk log DataFrame into RiskEvent insert dicts."""
+    df = df.copy()
+    df.columns = [c.strip().lower().replace(' ', '_') for c in df.columns]
+    df = df.reindex(columns=RISK_LOG_COLUMNS)
+    df['date'] = pd.to_datetime(df['date'], errors='coerce').dt.date
+    df = df.astype(object).where(pd.notnull(df), None)
+    return df.to_dict(orient='records')
+
+
+def import_csv(path, replace=False):
+    """
+    Bulk-loads a risklog.csv file into the RiskEvent table in one transaction.
+    With replace=True existing events are deleted first. Returns the number of rows imported.
+    """
+    df = pd.read_csv(path, skipinitialspace=True, on_bad_lines='skip')
+    records = _records_from_frame(df)
+    if replace:
+        RiskEvent.query.delete()
+    if records:
+        db.session.execute(RiskEvent.__table__.insert(), records)
+    db.session.commit()
+    return len(records)
+
+
+def ensure_imported(path):
+    """Seeds an empty RiskEvent table from the legacy CSV file, if it exists."""
+    if db.session.query(RiskEvent.id).first() is not None:
+        return 0
+    try:
+        count = import_csv(path)
+        print(f"Risk Store: Imported {count} events from {path}.")
+        return count
+    except FileNotFoundError:
+        return 0
+
+
+def load_dataframe(with_descriptions=True):
+    """
+    Reads every risk event into a DataFrame with the CSV columns plus `id`.
+    with_descriptions=False leaves out the free-text description column.
+    """
+    table = RiskEvent.__table__
+    columns = ['id'] + [c for c in RISK_LOG_COLUMNS if with_descriptions or c != 'description']
+    rows = db.session.execute(db.select(*[table.c[c] for c in columns]).order_by(table.c.id)).all()
+    df = pd.DataFrame(rows, columns=columns)
+    # An empty event column means "no disaster", the same as the admin form's default 'None'
+    df['disaster_event'] = df['disaster_event'].fillna('None')
+    return df
+
+
+def descriptions(event_ids):
+    """Returns {event id: description} for the given risk events."""
+    event_ids = {i for i in event_ids if i is not None}
+    if not event_ids:
+        return {}
+    rows = db.session.query(RiskEvent.id, RiskEvent.description).filter(RiskEvent.id.in_(event_ids))
+    return {event_id: description for event_id, description in rows}
+
+
+def export_csv():
+    """Returns the whole risk log as CSV text in the original risklog.csv layout."""
+    df = load_dataframe()[RISK_LOG_COLUMNS]
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False)
+    return buffer.getvalue()
@@ -0,0 +1,266 @@
+# backend/safety_index.py
+
+import functools
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# Order of the per-event counters kept in every bucket
+COUNT_FIELDS = ('disasters', 'disease', 'heat', 'rain')
+
+# CSS class of a route alert by lowercased disaster event; anything else is 'alert-low'
+ALERT_SEVERITY = {
+    'landslide': 'alert-high', 'flood': 'alert-high', 'cyclone': 'alert-high',
+    'heatwave': 'alert-medium', 'drought': 'alert-medium',
+}
+
+# Columns of SafetyIndex.bounds: event rows [lo, hi), first prefix row, alert rows [lo, hi)
+_LO, _HI, _PREFIX, _ALERT_LO, _ALERT_HI = range(5)
+# Array attributes saved by SafetyIndex.save() and memory-mapped by load()
+_ARRAYS = ('dates', 'prefix', 'bounds', 'alert_dates', 'alert_events', 'alert_ids')
+
+
+def _key_column(frame, column, key):
+    """
+    Lowercased `column`, taken from the loader's precomputed `key` column when
+    the frame has one (see aiservice._prepare_risk_log).
+    """
+    if key in frame:
+        return frame[key]
+    return frame[column].astype(str).str.lower().where(frame[column].notna())
+
+
+def _event_flags(df):
+    """
+    Returns a DataFrame with one 0/1 column per counter in COUNT_FIELDS,
+    using the same comparisons as the original rule-based scan.
+    """
+    # NaN events are not 'none', so they count as disasters (matches `.str.lower() != 'none'`)
+    disaster = (_key_column(df, 'disaster_event', 'event_key') != 'none').to_numpy()
+    return pd.DataFrame({
+        'disasters': disaster.astype(np.int64),
+        'disease': (df['disease_cases'] > 0).astype(np.int64),
+        'heat': (df['temperature_c'] > 34).astype(np.int64),
+        'rain': (df['rainfall_mm'] > 60).astype(np.int64),
+    }, index=df.index)
+
+
+@functools.lru_cache(maxsize=4096)
+def _alert_day(nanoseconds):
+    return pd.Timestamp(nanoseconds).strftime('%d %B %Y')
+
+
+class SafetyIndex:
+    """
+    Pre-aggregated risk counters keyed by lowercased (district, place).
+    District-wide totals live under (district, None).
+
+    Everything is kept in a few flat NumPy arrays so a built index can be
+    saved once and memory-mapped read-only by every worker (see
+    risk_dataset). Each bucket owns a date-sorted slice of `dates` and a
+    slice of `prefix` holding running counter totals (starting with a zero
+    row), so the rolling two-year window is a binary search instead of a
+    scan. Place buckets also own a slice of the alert arrays: date, event
+    code and RiskEvent id of their non-'none' events. Event labels and
+    severity classes are small lists indexed by the event code.
+    """
+
+    def __init__(self):
+        self.keys = []
+        self.events = []              # event code -> (label, severity class)
+        self.dates = np.empty(0, dtype='datetime64[ns]')
+        self.prefix = np.zeros((0, len(COUNT_FIELDS)), dtype=np.int32)
+        self.bounds = np.zeros((0, 5), dtype=np.int64)
+        self.alert_dates = np.empty(0, dtype='datetime64[ns]')
+        self.alert_events = np.empty(0, dtype=np.int16)
+        self.alert_ids = np.empty(0, dtype=np.int64)
+        # Only kept in memory, for frames that still carry descriptions
+        self.alert_descriptions = None
+        self._slots = {}
+
+    @classmethod
+    def from_dataframe(cls, df):
+        index = cls()
+        index._load(df)
+        return index
+
+    def _load(self, df, districts=None):
+        """Builds buckets from `df`, optionally restricted to a set of lowercased districts."""
+        required = {'district', 'date', 'disaster_event', 'disease_cases', 'temperature_c', 'rainfall_mm'}
+        if df.empty or not required.issubset(df.columns):
+            return
+        frame = df[df['date'].notna() & df['district'].notna()]
+        keys = pd.DataFrame({
+            'district': _key_column(frame, 'district', 'district_key').to_numpy(dtype=object),
+            'place': _key_column(frame, 'place', 'place_key').to_numpy(dtype=object) if 'place' in frame else None,
+        })
+        if districts is not None:
+            keep = keys['district'].isin(districts).to_numpy()
+            frame, keys = frame[keep], keys[keep].reset_index(drop=True)
+
+        flags = _event_flags(frame).to_numpy()
+        dates = frame['date'].to_numpy(dtype='datetime64[ns]')
+        is_alert = flags[:, 0] == 1
+        # One code per distinct event; labels and severities are computed once per code
+        event_codes, event_values = pd.factorize(frame['disaster_event'], use_na_sentinel=False)
+        self.events = [(str(value).capitalize(), ALERT_SEVERITY.get(str(value).lower(), 'alert-low'))
+                       for value in event_values]
+        ids = frame['id'].to_numpy(dtype=np.int64) if 'id' in frame else np.full(len(frame), -1, dtype=np.int64)
+        descriptions = (frame['description'].fillna('No details available.').astype(str).to_numpy(dtype=object)
+                        if 'description' in frame else None)
+
+        groups = list(keys.groupby('district').indices.items())
+        groups += [(key, rows) for key, rows in keys.groupby(['district', 'place']).indices.items()]
+        self.keys = [key if isinstance(key, tuple) else (key, None) for key, _ in groups]
+        row_lists, prefixes, alert_rows, bounds = [], [], [], []
+        row_count = alert_count = 0
+        for key, (_, rows) in zip(self.keys, groups):
+            rows = rows[np.argsort(dates[rows], kind='stable')]
+            row_lists.append(rows)
+            prefixes.append(np.zeros((1, len(COUNT_FIELDS)), dtype=np.int32))
+            prefixes.append(np.cumsum(flags[rows], axis=0, dtype=np.int32))
+            alerts = rows[is_alert[rows]] if key[1] is not None else rows[:0]
+            alert_rows.append(alerts)
+            bounds.append((row_count, row_count + len(rows), row_count + len(bounds),
+                           alert_count, alert_count + len(alerts)))
+            row_count += len(rows)
+            alert_count += len(alerts)
+
+        order = np.concatenate(row_lists) if row_lists else np.empty(0, dtype=np.int64)
+        alert_order = np.concatenate(alert_rows) if alert_rows else np.empty(0, dtype=np.int64)
+        self.dates = dates[order]
+        self.prefix = np.vstack(prefixes) if prefixes else self.prefix
+        self.bounds = np.array(bounds, dtype=np.int64).reshape(-1, 5)
+        self.alert_dates = dates[alert_order]
+        self.alert_events = event_codes[alert_order].astype(np.int16)
+        self.alert_ids = ids[alert_order]
+        self.alert_descriptions = descriptions[alert_order] if descriptions is not None else None
+        self._slots = {key: slot for slot, key in enumerate(self.keys)}
+
+    def rebuild_districts(self, df, districts):
+        """
+        Returns a new index with the buckets of the given districts rebuilt from `df`.
+        The other buckets are copied over, and this index is left unchanged for its readers.
+        """
+        districts = {str(d).lower() for d in districts if d is not None}
+        rebuilt = SafetyIndex()
+        rebuilt._load(df, districts)
+        kept = [slot for slot, key in enumerate(self.keys) if key[0] not in districts]
+        return SafetyIndex._merge([(self, kept), (rebuilt, range(len(rebuilt.keys)))])
+
+    @classmethod
+    def _merge(cls, parts):
+        """New index made of the given buckets, as (index, bucket slots) pairs."""
+        merged = cls()
+        events = {}
+        dates, prefixes, alert_dates, alert_events, alert_ids, descriptions, bounds = [], [], [], [], [], [], []
+        row_count = prefix_count = alert_count = 0
+        with_descriptions = any(index.alert_descriptions is not None for index, _ in parts)
+        for index, slots in parts:
+            # Event codes are per index; translate them into the merged index's codes
+            recode = np.array([events.setdefault(event, len(events)) for event in index.events] or [0], dtype=np.int16)
+            for slot in slots:
+                lo, hi, prefix_lo, alert_lo, alert_hi = (int(v) for v in index.bounds[slot])
+                merged.keys.append(index.keys[slot])
+                dates.append(index.dates[lo:hi])
+                prefixes.append(index.prefix[prefix_lo:prefix_lo + hi - lo + 1])
+                alert_dates.append(index.alert_dates[alert_lo:alert_hi])
+                alert_events.append(recode[index.alert_events[alert_lo:alert_hi]])
+                alert_ids.append(index.alert_ids[alert_lo:alert_hi])
+                if with_descriptions:
+                    descriptions.append(index.alert_descriptions[alert_lo:alert_hi]
+                                        if index.alert_descriptions is not None
+                                        else np.full(alert_hi - alert_lo, None, dtype=object))
+                bounds.append((row_count, row_count + hi - lo, prefix_count,
+                               alert_count, alert_count + alert_hi - alert_lo))
+                row_count += hi - lo
+                prefix_count += hi - lo + 1
+                alert_count += alert_hi - alert_lo
+        merged.events = list(events)
+        if merged.keys:
+            merged.dates = np.concatenate(dates)
+            merged.prefix = np.vstack(prefixes)
+            merged.bounds = np.array(bounds, dtype=np.int64)
+            merged.alert_dates = np.concatenate(alert_dates)
+            merged.alert_events = np.concatenate(alert_events)
+            merged.alert_ids = np.concatenate(alert_ids)
+            merged.alert_descriptions = np.concatenate(descriptions) if with_descriptions else None
+        merged._slots = {key: slot for slot, key in enumerate(merged.keys)}
+        return merged
+
+    # --- Lookups ---
+    def _bounds(self, district_name, place_name):
+        slot = self._slots.get((district_name.lower(), place_name.lower() if place_name else None))
+        return None if slot is None else [int(v) for v in self.bounds[slot]]
+
+    def counts(self, district_name, place_name=None, since=None):
+        """
+        Returns a dict of counter totals for events after `since`,
+        or None if the key has no events at all.
+        """
+        bounds = self._bounds(district_name, place_name)
+        if bounds is None:
+            return None
+        lo, hi, prefix_lo = bounds[_LO], bounds[_HI], bounds[_PREFIX]
+        start = np.searchsorted(self.dates[lo:hi], np.datetime64(since, 'ns'), side='right') if since is not None else 0
+        totals = self.prefix[prefix_lo + hi - lo] - self.prefix[prefix_lo + start]
+        return dict(zip(COUNT_FIELDS, (int(v) for v in totals)))
+
+    def alerts(self, district_name, place_name, since=None):
+        """
+        Ready-to-serialize alert records of one place for events after `since`,
+        oldest first. Each has 'event', 'description', 'date', 'severity_class'
+        and 'event_id'; 'description' is None when the index was built without one.
+        """
+        bounds = self._bounds(district_name, place_name) if place_name else None
+        if bounds is None:
+            return []
+        lo, hi = bounds[_ALERT_LO], bounds[_ALERT_HI]
+        if since is not None:
+            lo += int(np.searchsorted(self.alert_dates[lo:hi], np.datetime64(since, 'ns'), side='right'))
+        records = []
+        for row in range(lo, hi):
+            label, severity = self.events[self.alert_events[row]]
+            event_id = int(self.alert_ids[row])
+            records.append({
+                'event': label,
+                'description': self.alert_descriptions[row] if self.alert_descriptions is not None else None,
+                'date': _alert_day(int(self.alert_dates[row].astype(np.int64))),
+                'severity_class': severity,
+                'event_id': event_id if event_id >= 0 else None,
+            })
+        return records
+
+    # --- Persistence ---
+    def save(self, directory):
+        """Writes the arrays as .npy files plus a JSON file with the keys and event labels."""
+        os.makedirs(directory, exist_ok=True)
+        for name in _ARRAYS:
+            np.save(os.path.join(directory, f'{name}.npy'), getattr(self, name))
+        with open(os.path.join(directory, 'index.json'), 'w') as meta:
+            json.dump({'keys': self.keys, 'events': self.events}, meta)
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        """Opens an index written by save(); with mmap_mode='r' the arrays stay shared page cache."""
+        index = cls()
+        for name in _ARRAYS:
+            setattr(index, name, np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode))
+        with open(os.path.join(directory, 'index.json')) as meta:
+            saved = json.load(meta)
+        index.keys = [tuple(key) for key in saved['keys']]
+        index.events = [tuple(event) for event in saved['events']]
+        index._slots = {key: slot for slot, key in enumerate(index.keys)}
+        return index
+
+    def memory_bytes(self):
+        """Bytes of the index arrays (memory-mapped ones are shared between workers)."""
+        total = sum(getattr(self, name).nbytes for name in _ARRAYS)
+        if self.alert_descriptions is not None:
+            total += self.alert_descriptions.nbytes
+        return total
+
+    def __len__(self):
+        return len(self.keys)
@@ -0,0 +1,207 @@
+# backend/safety_snapshot.py
+
+import datetime
+import threading
+import time
+
+from models import db, SafetySnapshot
+from backend.data_version import VersionStamp
+
+
+class SafetySnapshotStore:
+    """
+    Safety results of every location in the risk log, materialized in the
+    SafetySnapshot table so requests read a precomputed score instead of
+    counting events against a moving two-year window each time.
+
+    A refresh scores every location in one pass (`compute()`), replaces the
+    table in a single transaction and bumps a version stamp shared by all
+    workers; each worker keeps the rows in a dict and re-reads the table
+    when the stamp moves. A background thread refreshes when the risk data
+    or the safety engine changed (rows carry the risk data version and
+    engine they were computed with) and once the rows are older than
+    `max_age` seconds. lookup() only answers for the risk data version and
+    engine the caller is on, so until a refresh lands callers score live.
+    """
+
+    def __init__(self):
+        self.stamp = VersionStamp()
+        self._app = None
+        self._compute = None
+        self._source = None
+        self._lock = threading.Lock()
+        self._refreshing = threading.Lock()
+        self._thread = None
+        self._rows = {}          # (district, place or None) -> (level, score)
+        self._loaded = None      # stamp version the rows were read at
+        self.risk_version = None
+        self.engine = None
+        self.computed_at = None
+        self.max_age = 3600
+        self.interval = 5.0
+        self.refresh_count = 0
+        self.last_error = None
+
+    # --- Configuration ---
+    def configure(self, app, compute, source, stamp_path=None, max_age=3600, interval=5.0):
+        """
+        `compute()` returns (risk version, engine, row dicts) for the table;
+        `source()` returns the (risk version, engine) this worker would
+        compute with now, or None while its risk data is not the latest.
+        Both are called in an app context. max_age=0 disables the snapshot.
+        """
+        self._app = app
+        self._compute = compute
+        self._source = source
+        self.stamp.configure(stamp_path)
+        self.max_age = max_age
+        self.interval = interval
+
+    @property
+    def enabled(self):
+        return self._app is not None and self.max_age > 0
+
+    # --- Reading ---
+    def _sync(self):
+        """Re-reads the table if another worker refreshed it since this worker last did."""
+        version = self.stamp.current()
+        if version == self._loaded:
+            return
+        with self._lock:
+            if version == self._loaded:
+                return
+            try:
+                with self._app.app_context():
+                    rows = db.session.query(SafetySnapshot.district, SafetySnapshot.place, SafetySnapshot.level,
+                                            SafetySnapshot.score, SafetySnapshot.risk_version,
+                                            SafetySnapshot.engine, SafetySnapshot.computed_at).all()
+            except Exception as e:
+                print(f"Safety Snapshot WARNING: Could not read the snapshot table: {e}")
+                rows = []
+            self._install(rows, version)
+
+    def _install(self, rows, version):
+        self._rows = {(row.district, row.place or None): (row.level, row.score) for row in rows}
+        first = rows[0] if rows else None
+        self.risk_version = first.risk_version if first else None
+        self.engine = first.engine if first else None
+        self.computed_at = first.computed_at if first else None
+        self._loaded = version
+
+    def lookup(self, keys, risk_version, engine):
+        """
+        (level, score) for each lowercased (district, place) key, None for keys
+        without a row; or None altogether if the snapshot is disabled or was
+        computed from other risk data or with another engine.
+        """
+        if not self.enabled:
+            return None
+        self._sync()
+        if risk_version != self.risk_version or engine != self.engine:
+            return None
+        rows = self._rows
+        return [rows.get(key) for key in keys]
+
+    # --- Refreshing ---
+    def refresh(self):
+        """Recomputes every row and replaces the table. Blocks the caller; returns True if it wrote a snapshot."""
+        if not self.enabled:
+            return False
+        with self._refreshing:
+            computed_at = datetime.datetime.now().replace(microsecond=0)
+            with self._app.app_context():
+                try:
+                    risk_version, engine, rows = self._compute()
+                    for row in rows:
+                        row.update(engine=engine, risk_version=risk_version, computed_at=computed_at)
+                    db.session.query(SafetySnapshot).delete()
+                    if rows:
+                        db.session.execute(SafetySnapshot.__table__.insert(), rows)
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    self.last_error = str(e)
+                    print(f"Safety Snapshot WARNING: Refresh failed: {e}")
+                    return False
+            with self._lock:
+                self._install([SafetySnapshot(**row) for row in rows], self.stamp.bump())
+            self.refresh_count += 1
+            self.last_error = None
+            print(f"Safety Snapshot: {len(rows)} locations scored ({engine} engine).")
+            return True
+
+    def refresh_async(self):
+        """Starts a background refresh unless one is already running. Returns the thread or None."""
+        if not self.enabled or self._refreshing.locked():
+            return None
+        thread = threading.Thread(target=self.refresh, name='safety-snapshot-refresh', daemon=True)
+        thread.start()
+        return thread
+
+    def age_seconds(self):
+        return (datetime.datetime.now() - self.computed_at).total_seconds() if self.computed_at else None
+
+    def due(self):
+        """True if the stored rows are behind this worker's risk data or engine, or older than max_age."""
+        if not self.enabled:
+            return False
+        self._sync()
+        with self._app.app_context():
+            source = self._source()
+        if source is None:
+            return False
+        age = self.age_seconds()
+        return source != (self.risk_version, self.engine) or age is None or age > self.max_age
+
+    def refresh_if_due(self):
+        return self.refresh() if self.due() else False
+
+    def start(self):
+        """Checks every `interval` seconds in a daemon thread whether a refresh is due."""
+        if not self.enabled or self.interval <= 0 or self._thread is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(self.interval)
+                try:
+                    self.refresh_if_due()
+                except Exception as e:
+                    print(f"Safety Snapshot WARNING: Scheduled refresh failed: {e}")
+
+        self._thread = threading.Thread(target=run, name='safety-snapshot-scheduler', daemon=True)
+        self._thread.start()
+
+    def after_fork(self):
+        """Restarts the scheduler in a worker forked from a preloaded master."""
+        self._lock = threading.Lock()
+        self._refreshing = threading.Lock()
+        if self._thread is not None:
+            self._thread = None
+            self.start()
+
+    def status(self):
+        """Freshness of the snapshot for admin pages and ops."""
+        if not self.enabled:
+            return {'enabled': False}
+        self._sync()
+        age = self.age_seconds()
+        with self._app.app_context():
+            source = self._source()
+        return {
+            'enabled': True,
+            'locations': len(self._rows),
+            'computed_at': self.computed_at,
+            'age_seconds': round(age) if age is not None else None,
+            'engine': self.engine,
+            'risk_version': self.risk_version,
+            'current': source is not None and source == (self.risk_version, self.engine)
+                       and age is not None and age <= self.max_age,
+            'refreshing': self._refreshing.locked(),
+            'refreshes': self.refresh_count,
+            'last_error': self.last_error,
+        }
+
+
+# Shared by every request in this worker process
+safety_snapshots = SafetySnapshotStore()
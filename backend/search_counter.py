@@ -0,0 +1,94 @@
+# backend/search_counter.py
+
+import atexit
+import threading
+import time
+from collections import Counter
+
+from sqlalchemy import bindparam
+from models import db, Destination
+
+
+class SearchCountBuffer:
+    """
+    Write-behind buffer for Destination.search_count.
+
+    Clicks are only added to an in-process Counter. A daemon thread flushes
+    the totals every `interval` seconds as atomic
+    `UPDATE ... SET search_count = search_count + n` statements in one
+    transaction, so concurrent workers never lose increments. Pending counts
+    are also flushed at interpreter shutdown. With interval <= 0 every
+    increment is written through immediately.
+    """
+
+    def __init__(self, interval=5.0, max_pending=10000):
+        self.interval = interval
+        self.max_pending = max_pending
+        self._app = None
+        self._pending = Counter()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self.flushes = 0
+        self.flushed_clicks = 0
+
+    def init_app(self, app):
+        self._app = app
+        self.interval = app.config.get('SEARCH_COUNT_FLUSH_SECONDS', self.interval)
+        if self.interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='search-count-flush', daemon=True)
+            self._thread.start()
+            atexit.register(self.flush)
+
+    def after_fork(self):
+        """Restarts the flush thread in a worker forked from a preloaded master."""
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = Counter()
+        if self._thread is not None:
+            self._thread = threading.Thread(target=self._run, name='search-count-flush', daemon=True)
+            self._thread.start()
+
+    def increment(self, dest_id, amount=1):
+        with self._lock:
+            self._pending[dest_id] += amount
+            overflow = len(self._pending) >= self.max_pending
+        if self.interval <= 0 or overflow:
+            self.flush()
+
+    def pending(self):
+        with self._lock:
+            return dict(self._pending)
+
+    def flush(self):
+        """Writes all pending increments in one transaction. Returns the number of rows updated."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, Counter()
+            if not batch or self._app is None:
+                return 0
+            table = Destination.__table__
+            statement = (table.update()
+                         .where(table.c.Destination_id == bindparam('dest_id'))
+                         .values(search_count=table.c.search_count + bindparam('amount')))
+            try:
+                with self._app.app_context():
+                    db.session.execute(statement, [{'dest_id': k, 'amount': n} for k, n in batch.items()])
+                    db.session.commit()
+            except Exception as e:
+                with self._lock:
+                    self._pending.update(batch)  # keep the clicks for the next attempt
+                print(f"Search Counter WARNING: Flush failed: {e}")
+                return 0
+            self.flushes += 1
+            self.flushed_clicks += sum(batch.values())
+            return len(batch)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.flush()
+
+
+# Shared by every request in this worker process
+search_counts = SearchCountBuffer()
@@ -0,0 +1,284 @@
+# backend/search_index.py
+
+import bisect
+import re
+import threading
+from array import array
+from collections import OrderedDict
+
+import numpy as np
+
+from models import db, Destination
+from backend.data_version import destination_version
+
+# Field weights used for ranking: a hit in the place name beats one in the description
+FIELD_WEIGHTS = (('Place', 4), ('Name', 3), ('Type', 2), ('Description', 1))
+# Match kinds: the whole word, the start of a word, or inside a word (3+ characters)
+EXACT, PREFIX, INFIX = 3, 2, 1
+
+# Gap between the place-name ranks assigned at build time, so later inserts can slot in between
+_RANK_GAP = 64
+_MAX_SCORE = 1 << 20
+# Ranked results of recent queries are kept until the next write, up to this many matches in total
+RESULT_CACHE_BUDGET = 2_000_000
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+
+def _tokens(text):
+    return _TOKEN.findall(str(text).lower()) if text else []
+
+
+def _trigrams(token):
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+class DestinationSearchIndex:
+    """
+    In-memory typeahead index over Destination Place, Name (district), Type
+    and Description.
+
+    Each destination occupies a dense slot. Every field is split into
+    lowercase word tokens with postings token -> (slots, field weights) kept
+    in flat arrays. Word prefixes are found by binary search in the sorted
+    vocabulary; infixes (3+ characters) through a trigram index over the
+    vocabulary, so memory grows with distinct words, not text length.
+    Scoring and ranking run as NumPy operations over the slots: every query
+    word must match, and results are ordered by summed score, then place name.
+
+    The index follows destination_version: admin writes update it in place
+    (an updated destination moves to a new slot and the old one is marked
+    dead) and bump the version; other workers notice the new version and
+    rebuild in the background. Until the first build finishes, search()
+    returns None and callers fall back to the database.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._slot_of = {}            # destination id -> slot
+        self._ids = array('q')        # slot -> destination id
+        self._ranks = array('q')      # slot -> place name order
+        self._alive = bytearray()     # slot -> 1 while current
+        self._place_keys = []         # sorted (place, id) at the last build
+        self._postings = {}           # token -> (array of slots, array of weights)
+        self._vocab = []              # sorted tokens
+        self._grams = {}              # trigram -> set of tokens
+        self._results = OrderedDict() # query words -> (sorted keys, ids), dropped on every write
+        self._cached_matches = 0
+        self._loader = None
+        self._rebuilding = threading.Lock()
+        self.version = None
+        self.ready = False
+
+    # --- Building ---
+    def configure(self, loader):
+        """`loader()` returns (id, Place, Name, Type, Description) rows for every destination."""
+        self._loader = loader
+
+    def rebuild(self):
+        """Rebuilds the whole index from the loader and swaps it in. Blocks the caller."""
+        if self._loader is None:
+            return
+        with self._rebuilding:
+            version = destination_version.current()
+            try:
+                rows = sorted(self._loader(), key=lambda row: ((row[1] or '').lower(), row[0]))
+            except Exception as e:
+                print(f"Search Index WARNING: Rebuild failed: {e}")
+                return
+            fresh = DestinationSearchIndex()
+            for position, row in enumerate(rows):
+                fresh._add(*row, rank=(position + 1) * _RANK_GAP, keep_sorted=False)
+            fresh._vocab.sort()
+            fresh._place_keys = [((row[1] or '').lower(), row[0]) for row in rows]
+            with self._lock:
+                for name in ('_slot_of', '_ids', '_ranks', '_alive', '_place_keys', '_postings', '_vocab', '_grams'):
+                    setattr(self, name, getattr(fresh, name))
+                self._clear_results()
+                self.version = version
+                self.ready = True
+
+    def rebuild_async(self):
+        if self._rebuilding.locked():
+            return None
+        thread = threading.Thread(target=self.rebuild, name='search-index-rebuild', daemon=True)
+        thread.start()
+        return thread
+
+    def after_fork(self):
+        """Resets the locks in a worker forked from a preloaded master and finishes a build the fork cut off."""
+        self._lock = threading.RLock()
+        self._rebuilding = threading.Lock()
+        if not self.ready:
+            self.rebuild_async()
+
+    def _add(self, dest_id, place, name, type_, description, rank, keep_sorted=True):
+        slot = len(self._ids)
+        self._slot_of[dest_id] = slot
+        self._ids.append(dest_id)
+        self._ranks.append(rank)
+        self._alive.append(1)
+        tokens = {}
+        for (_, weight), text in zip(FIELD_WEIGHTS, (place, name, type_, description)):
+            for token in _tokens(text):
+                tokens[token] = max(weight, tokens.get(token, 0))
+        for token, weight in tokens.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = (array('i'), array('b'))
+                if keep_sorted:
+                    bisect.insort(self._vocab, token)
+                else:
+                    self._vocab.append(token)
+                for gram in _trigrams(token):
+                    self._grams.setdefault(gram, set()).add(token)
+            postings[0].append(slot)
+            postings[1].append(weight)
+
+    def _kill(self, dest_id):
+        slot = self._slot_of.pop(dest_id, None)
+        if slot is not None:
+            self._alive[slot] = 0
+
+    def _rank_for(self, place, dest_id):
+        """Place-name rank for a destination added after the last build (between its neighbours)."""
+        position = bisect.bisect_left(self._place_keys, ((place or '').lower(), dest_id))
+        return position * _RANK_GAP + _RANK_GAP // 2
+
+    # --- Admin writes ---
+    def upsert(self, dest):
+        with self._lock:
+            self._kill(dest.Destination_id)
+            self._add(dest.Destination_id, dest.Place, dest.Name, dest.Type, dest.Description,
+                      rank=self._rank_for(dest.Place, dest.Destination_id))
+            self._clear_results()
+            self._compact_if_needed()
+
+    def remove(self, dest_id):
+        with self._lock:
+            self._kill(dest_id)
+            self._clear_results()
+            self._compact_if_needed()
+
+    def _compact_if_needed(self):
+        dead = len(self._ids) - len(self._slot_of)
+        if dead > max(1000, len(self._ids) // 4):
+            self.rebuild_async()
+
+    def _clear_results(self):
+        self._results.clear()
+        self._cached_matches = 0
+
+    # --- Queries ---
+    def _term_scores(self, term):
+        """Best score per slot for words equal to, starting with or containing `term` (0 = no match)."""
+        scores = np.zeros(len(self._ids), dtype=np.int16)
+
+        def collect(token, kind):
+            slots, weights = self._postings[token]
+            slots = np.frombuffer(slots, dtype=np.int32)
+            scores[slots] = np.maximum(scores[slots], np.frombuffer(weights, dtype=np.int8) * kind)
+
+        vocab = self._vocab
+        for i in range(bisect.bisect_left(vocab, term), len(vocab)):
+            if not vocab[i].startswith(term):
+                break
+            collect(vocab[i], EXACT if vocab[i] == term else PREFIX)
+        if len(term) >= 3:
+            grams = sorted((self._grams.get(g, ()) for g in _trigrams(term)), key=len)
+            candidates = set(grams[0]).intersection(*grams[1:]) if grams else set()
+            for token in candidates:
+                if term in token and not token.startswith(term):
+                    collect(token, INFIX)
+        return scores
+
+    def search(self, query, limit, after=None):
+        """
+        Returns (destination ids, cursor values [key, id] of the last one or
+        None) for the page after `after`, or None if the index is not ready
+        or the query has no searchable words.
+        """
+        if destination_version.current() != self.version:
+            self.rebuild_async()
+        terms = set(_tokens(query))
+        if not self.ready or not terms:
+            return None
+        with self._lock:
+            key = ' '.join(sorted(terms))
+            ranked = self._results.get(key)
+            if ranked is None:
+                ranked = self._rank(terms)
+                self._results[key] = ranked
+                self._cached_matches += len(ranked[0])
+                while self._cached_matches > RESULT_CACHE_BUDGET and len(self._results) > 1:
+                    self._cached_matches -= len(self._results.popitem(last=False)[1][0])
+            else:
+                self._results.move_to_end(key)
+        keys, ids = ranked
+        start = 0
+        if after is not None and all(isinstance(value, int) for value in after):
+            if len(after) == 2:
+                # Destinations added since the last build can share a key; the id breaks the tie
+                low = int(np.searchsorted(keys, after[0], side='left'))
+                high = int(np.searchsorted(keys, after[0], side='right'))
+                start = low + int(np.searchsorted(ids[low:high], after[1], side='right'))
+            elif len(after) == 1:
+                start = int(np.searchsorted(keys, after[0], side='right'))
+        page = ids[start:start + limit + 1].tolist()
+        if len(page) <= limit:
+            return page, None
+        return page[:limit], [int(keys[start + limit - 1]), int(ids[start + limit - 1])]
+
+    def _rank(self, terms):
+        """Sorted rank keys and destination ids of every live destination matching all `terms`."""
+        total = None
+        for term in terms:
+            scores = self._term_scores(term)
+            if total is None:
+                total = scores
+            else:
+                matched = (total > 0) & (scores > 0)
+                total += scores
+                total *= matched
+        total *= np.frombuffer(self._alive, dtype=np.uint8)
+        slots = np.flatnonzero(total)
+        # One sortable int64 per match: higher score first, then place name order
+        keys = ((_MAX_SCORE - total[slots].astype(np.int64)) << 32) | np.frombuffer(self._ranks, dtype=np.int64)[slots]
+        ids = np.frombuffer(self._ids, dtype=np.int64)[slots]
+        order = np.lexsort((ids, keys))  # by key, then destination id
+        return keys[order], ids[order]
+
+    def stats(self):
+        with self._lock:
+            return {'ready': self.ready, 'version': self.version, 'destinations': len(self._slot_of),
+                    'slots': len(self._ids), 'tokens': len(self._vocab), 'trigrams': len(self._grams),
+                    'cached_queries': len(self._results), 'cached_matches': self._cached_matches}
+
+
+# Shared by every request in this worker process
+destination_index = DestinationSearchIndex()
+
+
+def destination_changed(dest=None, deleted_id=None):
+    """Applies an admin write to this worker's index and tells the other workers."""
+    if deleted_id is not None:
+        destination_index.remove(deleted_id)
+    if dest is not None:
+        destination_index.upsert(dest)
+    version = destination_version.bump()
+    if destination_index.ready:
+        destination_index.version = version
+
+
+def init_search_index(app, background=True):
+    """Builds this worker's index (in the background by default); reloads read the DB in an app context."""
+    def load():
+        with app.app_context():
+            return db.session.query(Destination.Destination_id, Destination.Place, Destination.Name,
+                                    Destination.Type, Destination.Description).all()
+
+    destination_index.configure(load)
+    if background:
+        destination_index.rebuild_async()
+    else:
+        destination_index.rebuild()
@@ -1,23 +1,20 @@
 # backend/views.py
 
-from flask import render_template, flash, jsonify, request, session, redirect, url_for
+from flask import render_template, flash, jsonify, request, session, redirect, url_for, current_app
 from functools import wraps
+import datetime
 from . import views_bp
-from models import db, Destination, User, RouteHistory
-from sqlalchemy import func, desc
-from sqlalchemy.orm import joinedload
-from backend.aiservice import calculate_safety 
-
-# Centralized district data with coordinates for the map
-KERALA_DISTRICTS_COORDS = {
-    'Alappuzha': {'lat': 9.4981, 'lng': 76.3388}, 'Ernakulam': {'lat': 9.9816, 'lng': 76.2996},
-    'Idukki': {'lat': 9.8392, 'lng': 76.9746}, 'Kannur': {'lat': 11.8745, 'lng': 75.3704},
-    'Kasaragod': {'lat': 12.5002, 'lng': 74.9896}, 'Kollam': {'lat': 8.8932, 'lng': 76.6141},
-    'Kottayam': {'lat': 9.5916, 'lng': 76.5222}, 'Kozhikode': {'lat': 11.2588, 'lng': 75.7804},
-    'Malappuram': {'lat': 11.0736, 'lng': 76.0742}, 'Palakkad': {'lat': 10.7867, 'lng': 76.6548},
-    'Pathanamthitta': {'lat': 9.2648, 'lng': 76.7870}, 'Thiruvananthapuram': {'lat': 8.5241, 'lng': 76.9366},
-    'Thrissur': {'lat': 10.5276, 'lng': 76.2144}, 'Wayanad': {'lat': 11.6854, 'lng': 76.1320}
-}
+from models import db, Destination, RouteHistory
+from backend import favorites as favorites_store
+from backend.search_counter import search_counts
+from backend.history_writer import route_history
+from backend.pagination import page_size, encode_cursor, decode_cursor, keyset_page
+from backend.search_index import destination_index
+from backend.data_version import destination_version
+from backend.http_cache import search_responses, conditional_response
+from backend.db_profile import read_session
+from backend.aiservice import prefetch_safety, risk_data
+from backend.district_graph import KERALA_DISTRICTS_COORDS
 
 # Decorator to ensure a user is logged in for protected pages
 def login_required(f):
@@ -29,6 +26,22 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+# --- Keyset pagination ---
+HISTORY_PAGE_SIZE = 10
+
+def _destination_page(query, cursor, limit):
+    """One page of destinations ordered by (Name, Destination_id) and the cursor of the next one."""
+    rows, last = keyset_page(query, [Destination.Name, Destination.Destination_id], decode_cursor(cursor), limit)
+    return rows, encode_cursor(last) if last else None
+
+def _history_page(user_id, cursor, limit):
+    """One page of a user's routes, newest first by (created_at, id), and the next cursor."""
+    route_history.flush()  # routes this worker still has queued; other workers write theirs within their interval
+    query = RouteHistory.query.filter_by(user_id=user_id)
+    rows, last = keyset_page(query, [RouteHistory.created_at, RouteHistory.id],
+                             decode_cursor(cursor, datetime_positions=(0,)), limit, descending=True)
+    return rows, encode_cursor(last) if last else None
+
 @views_bp.route('/')
 def landing():
     """Renders the public landing page."""
@@ -42,11 +55,7 @@ def dashboard():
         districts = sorted(list(KERALA_DISTRICTS_COORDS.keys()))
         types_query = db.session.query(Destination.Type).distinct().all()
         interests = [t[0] for t in types_query if t[0] is not None]
-        
-        favorite_ids = set()
-        if 'user_id' in session:
-            user = User.query.get(session['user_id'])
-            if user: favorite_ids = {dest.Destination_id for dest in user.favorites}
+        favorite_ids = favorites_store.favorite_ids(session.get('user_id'))
     except Exception as e:
         print(f"Error fetching dashboard data: {e}")
         districts, interests, favorite_ids = [], [], set()
@@ -63,18 +72,18 @@ def dashboard():
 def search():
     """Renders the destination search page."""
     try:
-        destinations = Destination.query.order_by(Destination.Name, Destination.Place).all()
-        favorite_ids = set()
-        if 'user_id' in session:
-            user = User.query.get(session['user_id'])
-            if user: favorite_ids = {dest.Destination_id for dest in user.favorites}
+        # Only the first page is rendered; the page fetches the rest from /api/search-destinations
+        destinations, next_cursor = _destination_page(read_session().query(Destination), None, page_size(None))
+        destinations = prefetch_safety(destinations)
+        favorite_ids = favorites_store.favorite_ids(session.get('user_id'))
     except Exception as e:
         print(f"Error fetching destinations for search page: {e}")
-        destinations, favorite_ids = [], set()
+        destinations, next_cursor, favorite_ids = [], None, set()
         flash("Could not load destination data.", "danger")
     
     return render_template('user/search.html', 
                            destinations=destinations,
+                           next_cursor=next_cursor,
                            favorite_ids=favorite_ids,
                            active_page='search')
 
@@ -83,11 +92,8 @@ def search():
 @login_required
 def favorites():
     """Renders the user's personal favorites page."""
-    user = User.query.get(session['user_id'])
-    favorite_destinations = user.favorites 
-    
-    # The model property `dest.safety_info` now handles the calculation automatically.
-    # No extra logic is needed here.
+    # Score every favorite in one batch; the template then reads the cached `dest.safety_info`
+    favorite_destinations = prefetch_safety(favorites_store.favorite_destinations(session['user_id']))
 
     return render_template('user/favorites.html', 
                            destinations=favorite_destinations, 
@@ -97,32 +103,55 @@ def favorites():
 @login_required
 def previous_routes():
     """Renders the user's previously generated routes."""
-    user = User.query.get(session['user_id'])
-    # Query histories and order by most recent first
-    histories = RouteHistory.query.filter_by(user_id=user.User_id).order_by(desc(RouteHistory.created_at)).all()
+    # Most recent first; older pages are loaded from /api/route-history
+    histories, next_cursor = _history_page(session['user_id'], None, page_size(None, default=HISTORY_PAGE_SIZE))
     
     return render_template('user/previous_routes.html', 
                            histories=histories, 
+                           next_cursor=next_cursor,
                            active_page='previous_routes')
 
 # --- API Endpoints ---
 
 @views_bp.route('/api/search-destinations')
 def api_search_destinations():
-    """API endpoint for live searching destinations."""
+    """
+    API endpoint for live searching destinations, one page at a time.
+    Returns {'items': [...], 'next_cursor': str|None}; pass ?cursor= to continue.
+    """
     query = request.args.get('q', '', type=str)
-    
-    base_query = Destination.query
-    if query:
-        search_term = f"%{query}%"
-        search_results = base_query.filter(
-            (Destination.Place.ilike(search_term)) | (Destination.Name.ilike(search_term))
-        ).order_by(Destination.Name).all()
+    cursor, limit = request.args.get('cursor'), page_size(request.args.get('limit'))
+
+    # Pages only change with the destinations, the risk data, the day (safety windows) and
+    # the version the index was built from: while it rebuilds after another worker's write it
+    # answers from the old destinations, so those pages must not outlive the rebuild.
+    # Unchanged pages are answered with 304 or a cached body
+    version = (destination_version.current(), risk_data.current.version,
+               datetime.date.today().isoformat(), destination_index.version)
+    return conditional_response(search_responses, version, (query, cursor, limit),
+                                lambda: _search_destinations_json(query, cursor, limit))
+
+def _search_destinations_json(query, cursor, limit):
+    # Typeahead queries are ranked by the in-memory index; the database only loads the page by id.
+    # Read-only, so served by the replica when one is configured
+    db_session = read_session()
+    ranked = destination_index.search(query, limit, after=decode_cursor(cursor)) if query else None
+    if ranked is not None:
+        ids, last = ranked
+        by_id = {d.Destination_id: d for d in db_session.query(Destination).filter(Destination.Destination_id.in_(ids))} if ids else {}
+        search_results = [by_id[i] for i in ids if i in by_id]
+        next_cursor = encode_cursor(last) if last else None
     else:
-        search_results = base_query.order_by(Destination.Name).all()
+        base_query = db_session.query(Destination)
+        if query:
+            search_term = f"%{query}%"
+            base_query = base_query.filter(
+                (Destination.Place.ilike(search_term)) | (Destination.Name.ilike(search_term))
+            )
+        search_results, next_cursor = _destination_page(base_query, cursor, limit)
 
     results_list = []
-    for dest in search_results:
+    for dest in prefetch_safety(search_results):
         # Return the full safety info object from the model property
         safety_info = dest.safety_info
         results_list.append({
@@ -132,21 +161,22 @@ def api_search_destinations():
             'safety': {'text': safety_info['text'], 'class_name': safety_info['class']}
         })
 
-    return jsonify(results_list)
+    return current_app.json.dumps({'items': results_list, 'next_cursor': next_cursor})
+
+@views_bp.route('/api/route-history')
+@login_required
+def api_route_history():
+    """Next page of the user's route history, rendered as history cards."""
+    histories, next_cursor = _history_page(session['user_id'], request.args.get('cursor'),
+                                           page_size(request.args.get('limit'), default=HISTORY_PAGE_SIZE))
+    return jsonify({'html': render_template('user/_history_cards.html', histories=histories),
+                    'next_cursor': next_cursor})
 
 @views_bp.route('/api/increment-search-count/<int:dest_id>', methods=['POST'])
 def increment_search_count(dest_id):
-    """API endpoint to increment the search count for a destination."""
-    try:
-        destination = Destination.query.get(dest_id)
-        if destination:
-            destination.search_count = (destination.search_count or 0) + 1
-            db.session.commit()
-            return jsonify({'success': True, 'message': 'Count incremented.'})
-        return jsonify({'success': False, 'message': 'Destination not found.'}), 404
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'success': False, 'message': 'Server error.'}), 500
+    """API endpoint to increment the search count for a destination (buffered, written in batches)."""
+    search_counts.increment(dest_id)
+    return jsonify({'success': True, 'message': 'Count incremented.'})
 
 
 @views_bp.route('/api/favorites/add/<int:dest_id>', methods=['POST'])
@@ -154,11 +184,9 @@ def increment_search_count(dest_id):
 def add_favorite(dest_id):
     """API endpoint to add a destination to the user's favorites."""
     try:
-        user = User.query.get(session['user_id'])
-        destination = Destination.query.get_or_404(dest_id)
-        if destination not in user.favorites:
-            user.favorites.append(destination)
-            db.session.commit()
+        if not favorites_store.add_favorite(session['user_id'], dest_id) and not favorites_store.destination_exists(dest_id):
+            return jsonify({'success': False, 'message': 'Destination not found.'}), 404
+        db.session.commit()
         return jsonify({'success': True, 'message': 'Added to favorites.'})
     except Exception as e:
         db.session.rollback()
@@ -169,11 +197,8 @@ def add_favorite(dest_id):
 def remove_favorite(dest_id):
     """API endpoint to remove a destination from the user's favorites."""
     try:
-        user = User.query.get(session['user_id'])
-        destination = Destination.query.get_or_404(dest_id)
-        if destination in user.favorites:
-            user.favorites.remove(destination)
-            db.session.commit()
+        favorites_store.remove_favorite(session['user_id'], dest_id)
+        db.session.commit()
         return jsonify({'success': True, 'message': 'Removed from favorites.'})
     except Exception as e:
         db.session.rollback()
@@ -0,0 +1,90 @@
+# backend/warmup.py
+
+import threading
+import time
+
+from flask import jsonify
+
+from backend import health_bp
+
+
+class Warmup:
+    """
+    The slow startup steps (database schema, risk data, search index, safety
+    model, Gemini client), run in order either inline by create_app or, with
+    STARTUP_MODE = 'lazy', in a background thread so the app can accept
+    connections right away. Each step records its state and duration for
+    /readyz; a failed step is reported but does not stop the ones after it,
+    as the app runs with limited features without them.
+    """
+
+    def __init__(self):
+        self._steps = []
+        self._lock = threading.Lock()
+        self._thread = None
+        self.status = {}
+        self.started_at = time.time()
+        self.finished_at = None
+
+    def add(self, name, step):
+        """Adds a step, replacing one of the same name (create_app may run more than once)."""
+        self._steps = [(n, s) for n, s in self._steps if n != name] + [(name, step)]
+        self.status[name] = {'state': 'pending', 'seconds': None}
+
+    @property
+    def ready(self):
+        return all(status['state'] in ('done', 'failed') for status in self.status.values())
+
+    def run(self):
+        """Runs every step that has not finished yet. Blocks the caller."""
+        with self._lock:
+            for name, step in self._steps:
+                if self.status[name]['state'] in ('done', 'failed'):
+                    continue
+                self.status[name] = {'state': 'running', 'seconds': None}
+                start = time.perf_counter()
+                try:
+                    step()
+                    self.status[name] = {'state': 'done', 'seconds': round(time.perf_counter() - start, 3)}
+                except Exception as e:
+                    print(f"Warmup WARNING: Startup step '{name}' failed: {e}")
+                    self.status[name] = {'state': 'failed', 'seconds': round(time.perf_counter() - start, 3),
+                                         'error': str(e)}
+            self.finished_at = time.time()
+
+    def start(self):
+        thread = threading.Thread(target=self.run, name='startup-warmup', daemon=True)
+        thread.start()
+        self._thread = thread
+        return thread
+
+    def after_fork(self):
+        """Finishes, in a worker forked from a preloaded master, the steps the fork cut off."""
+        self._lock = threading.Lock()
+        if not self.ready:
+            for status in self.status.values():
+                if status['state'] == 'running':
+                    status['state'] = 'pending'
+            self.start()
+
+    def report(self):
+        finished = self.finished_at if self.ready else None
+        return {'ready': self.ready, 'steps': self.status,
+                'seconds': round(finished - self.started_at, 3) if finished else None}
+
+
+# Startup steps of this process; create_app fills it in
+warmup = Warmup()
+
+
+@health_bp.route('/healthz')
+def healthz():
+    """Liveness: the process is up and serving requests."""
+    return jsonify({'status': 'ok'})
+
+
+@health_bp.route('/readyz')
+def readyz():
+    """Readiness: 200 once every startup step has finished, 503 while warming up."""
+    report = warmup.report()
+    return jsonify(report), 200 if report['ready'] else 503
@@ -0,0 +1,97 @@
+# benchmarks/bench_import_time.py
+#
+# Startup cost of the app, each part measured in a fresh interpreter:
+#   import      `python -X importtime -c "import app"`: total and the slowest
+#               packages, and whether scikit-learn or the Gemini SDK were
+#               pulled in (both should only load when first used)
+#   create_app  eager vs lazy STARTUP_MODE: time until create_app returns
+#               (the app can serve) and until /readyz answers 200
+# The app runs against a throwaway SQLite database with the 'ml' safety
+# engine, so the model load is part of the warmup.
+#
+# Run from the project root:  python benchmarks/bench_import_time.py [top]
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOP = int(sys.argv[1]) if len(sys.argv) > 1 else 12
+# Imported lazily by the app; finding them at import time is a regression
+DEFERRED = ('sklearn', 'joblib', 'google.generativeai')
+
+STARTUP = """
+import sys, time
+start = time.perf_counter()
+sys.path.insert(0, {config_dir!r})
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+client = app.test_client()
+while client.get('/readyz').status_code != 200:
+    time.sleep(0.01)
+ready = time.perf_counter()
+print('RESULT', {{'import': imported - start, 'create_app': created - start, 'ready': ready - start}})
+"""
+
+
+def environment(**extra):
+    env = dict(os.environ, GEMINI_API_KEY='', RISK_DATA_SHARED_DIR='', RISK_DATA_POLL_SECONDS='0',
+               SEARCH_COUNT_FLUSH_SECONDS='0', PYTHONWARNINGS='ignore')
+    env.update(extra)
+    return env
+
+
+def import_profile():
+    """(module, self us, cumulative us, depth) for every import of `import app`."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=ROOT,
+                            env=environment(), capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def startup(mode, config_dir):
+    code = STARTUP.format(config_dir=config_dir)
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True,
+                            env=environment(STARTUP_MODE=mode, SAFETY_ENGINE='ml'))
+    line = next(line for line in result.stdout.splitlines() if line.startswith('RESULT '))
+    return json.loads(line[len('RESULT '):].replace("'", '"'))
+
+
+if __name__ == '__main__':
+    rows = import_profile()
+    end = next(i for i, row in enumerate(rows) if row[0] == 'app')
+    start = max(i for i in range(end) if rows[i][3] == 0) + 1 if any(row[3] == 0 for row in rows[:end]) else 0
+    print(f"import app: {rows[end][2] / 1000:.0f} ms\n")
+    # Output is post-order, so everything app imported sits right before it; a package's outermost import has the largest total
+    packages = {}
+    for name, _, cumulative_us, _ in rows[start:end]:
+        top = name.split('.')[0]
+        packages[top] = max(packages.get(top, 0), cumulative_us)
+    print(f"{'slowest packages under app':<28} | {'cumulative':>10}")
+    for name, cumulative_us in sorted(packages.items(), key=lambda item: -item[1])[:TOP]:
+        print(f"{name:<28} | {cumulative_us / 1000:7.0f} ms")
+    imported = {row[0] for row in rows}
+    eager = [name for name in DEFERRED if name in imported]
+    print(f"\ndeferred modules imported at startup: {', '.join(eager) if eager else 'none'}")
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        with open(os.path.join(config_dir, 'config_local.py'), 'w') as config:
+            config.write(f"SQLALCHEMY_DATABASE_URI = 'sqlite:///{os.path.join(config_dir, 'app.db')}'\n"
+                         "SECRET_KEY = 'bench'\n")
+        startup('eager', config_dir)  # creates and seeds the database, so both modes start from the same state
+        print(f"\n{'STARTUP_MODE':<12} | {'imports':>9} | {'serving':>9} | {'ready':>9}")
+        for mode in ('eager', 'lazy'):
+            timings = startup(mode, config_dir)
+            print(f"{mode:<12} | {timings['import'] * 1000:6.0f} ms | {timings['create_app'] * 1000:6.0f} ms"
+                  f" | {timings['ready'] * 1000:6.0f} ms")
+    sys.exit(1 if eager else 0)
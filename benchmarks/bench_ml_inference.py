@@ -0,0 +1,75 @@
+# benchmarks/bench_ml_inference.py
+#
+# Per-prediction latency of the Random Forest safety model:
+# the naive pandas path (one DataFrame + get_dummies per call) versus
+# backend.ml_engine.SafetyPredictor for single, cached and batched calls.
+#
+# Run from the project root:  python benchmarks/bench_ml_inference.py
+
+import os
+import sys
+import time
+import warnings
+
+import joblib
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+warnings.filterwarnings('ignore')
+
+from backend.ml_engine import SafetyPredictor, FEATURE_FIELDS
+
+model = joblib.load(os.path.join(ROOT, 'ml_model', 'safety_model.joblib'))
+model_columns = joblib.load(os.path.join(ROOT, 'ml_model', 'model_columns.joblib'))
+risk_log = pd.read_csv(os.path.join(ROOT, 'static', 'data', 'risklog.csv'))
+risk_log['month'] = pd.to_datetime(risk_log['date'], errors='coerce').dt.month.fillna(1).astype(int)
+rows = [tuple(r) for r in risk_log[list(FEATURE_FIELDS)].itertuples(index=False)]
+
+
+def predict_with_dataframe(row):
+    """What a straightforward implementation would do for every request."""
+    frame = pd.get_dummies(pd.DataFrame([row], columns=FEATURE_FIELDS),
+                           columns=['district', 'place', 'disaster_event'])
+    return model.predict_proba(frame.reindex(columns=model_columns, fill_value=0))[0]
+
+
+def per_call_ms(fn, calls):
+    start = time.perf_counter()
+    for i in range(calls):
+        fn(i)
+    return (time.perf_counter() - start) / calls * 1000
+
+
+predictor = SafetyPredictor(model, model_columns, cache_size=len(rows))
+
+# Sanity check: the array encoding must give the same probabilities as the DataFrame path
+for row in rows[:20]:
+    expected = predict_with_dataframe(row)
+    predicted = model.predict_proba(predictor.encode([row]))[0]
+    assert abs(expected - predicted).max() < 1e-12, row
+
+calls = 50
+print(f"Rows available: {len(rows)}")
+print(f"DataFrame per call          : {per_call_ms(lambda i: predict_with_dataframe(rows[i]), calls):8.3f} ms/prediction")
+
+
+def uncached(i):
+    predictor.clear_cache()
+    predictor.predict_one(rows[i])
+
+
+print(f"SafetyPredictor single      : {per_call_ms(uncached, calls):8.3f} ms/prediction")
+predictor.clear_cache()
+predictor.predict(rows)
+print(f"SafetyPredictor single, hit : {per_call_ms(lambda i: predictor.predict_one(rows[i % len(rows)]), 10000):8.4f} ms/prediction")
+
+for batch_size in (10, 100, 1000, 10000):
+    # Nudge the temperature so every row is a distinct cache key
+    batch = [(rows[i % len(rows)][0] + i * 1e-3,) + rows[i % len(rows)][1:] for i in range(batch_size)]
+    predictor.clear_cache()
+    start = time.perf_counter()
+    predictor.predict(batch)
+    elapsed = (time.perf_counter() - start) / batch_size * 1000
+    print(f"SafetyPredictor batch {batch_size:>5} : {elapsed:8.4f} ms/prediction")
+print(predictor.cache_info())
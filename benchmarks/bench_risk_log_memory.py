@@ -0,0 +1,137 @@
+# benchmarks/bench_risk_log_memory.py
+#
+# Memory and lookup latency of the in-memory risk log: the previous layout
+# (string columns including descriptions, `.str.lower()` on every lookup)
+# versus the compact one built by backend.aiservice._prepare_risk_log
+# (categorical text with precomputed lowercase keys, narrow integers, no
+# descriptions).
+#
+# Run from the project root:  python benchmarks/bench_risk_log_memory.py [rows]
+
+import datetime
+import os
+import sys
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ['GEMINI_API_KEY'] = ''
+warnings.filterwarnings('ignore')
+
+from backend.aiservice import _prepare_risk_log, _location_features
+from backend.risk_dataset import RiskSnapshot
+from backend.safety_index import SafetyIndex
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+base = pd.read_csv(os.path.join(ROOT, 'static', 'data', 'risklog.csv'))
+base.columns = [c.strip().lower().replace(' ', '_') for c in base.columns]
+rng = np.random.default_rng(17)
+now = datetime.datetime.now()
+two_years_ago = now - datetime.timedelta(days=730)
+
+
+def raw_risk_log(rows):
+    """`rows` events resampled from the shipped risk log, with distinct descriptions like real reports."""
+    df = base.iloc[rng.integers(0, len(base), rows)].reset_index(drop=True)
+    df.insert(0, 'id', np.arange(1, rows + 1))
+    df['date'] = (pd.Timestamp(now) - pd.to_timedelta(rng.integers(0, 4 * 365, rows), unit='D')).strftime('%Y-%m-%d')
+    df['description'] = df['description'] + ' (report ' + df['id'].astype(str) + ')'
+    return df
+
+
+def legacy_prepare(df):
+    """The previous loader: normalized names and parsed dates, everything else as read."""
+    df = df.copy()
+    df.columns = [c.strip().lower().replace(' ', '_') for c in df.columns]
+    df['date'] = pd.to_datetime(df['date'], errors='coerce')
+    return df
+
+
+def legacy_district_summary(df, district):
+    """The previous prediction-prompt scan."""
+    rows = df[(df['district'].str.lower() == district.lower()) & (df['date'] > two_years_ago)]
+    events = rows[rows['disaster_event'].str.lower() != 'none']['disaster_event'].value_counts().to_dict()
+    return events, rows['disease_cases'].sum()
+
+
+def compact_district_summary(df, district):
+    """The same summary as _prepare_ai_prediction now computes it."""
+    rows = df[(df['district_key'] == district.lower()) & (df['date'] > two_years_ago)]
+    counts = rows.loc[rows['event_key'] != 'none', 'disaster_event'].value_counts()
+    return {event: int(count) for event, count in counts.items() if count}, rows['disease_cases'].sum()
+
+
+def legacy_location_features(df):
+    """The previous feature grouping (the key columns were lowercased on every rebuild)."""
+    frame = df[(df['date'] > two_years_ago) & df['district'].notna()].sort_values('date')
+    frame = frame.assign(district_key=frame['district'].str.lower(), place_key=frame['place'].str.lower(),
+                         event=frame['disaster_event'].where(frame['disaster_event'].str.lower() != 'none'))
+    numeric = ['temperature_c', 'rainfall_mm', 'humidity_percent', 'disease_cases']
+    aggregations = {name: (name, 'mean') for name in numeric}
+    aggregations.update(district=('district', 'last'), place=('place', 'last'), event=('event', 'last'))
+    return [frame.groupby(by).agg(**aggregations) for by in (['district_key', 'place_key'], ['district_key'])]
+
+
+def ms(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def mb(size):
+    return f"{size / 1048576:8.1f} MB"
+
+
+raw = raw_risk_log(ROWS)
+load_legacy_ms, legacy = ms(lambda: legacy_prepare(raw), 1)
+load_compact_ms, compact = ms(lambda: _prepare_risk_log(raw), 1)
+
+legacy_columns = legacy.memory_usage(deep=True, index=False)
+compact_columns = compact.memory_usage(deep=True, index=False)
+print(f"Risk log: {ROWS} rows\n")
+print(f"{'column':<18} | {'previous':>11} | {'compact':>11} | compact dtype")
+for name in legacy_columns.index.union(compact_columns.index, sort=False):
+    before = mb(legacy_columns[name]) if name in legacy_columns else f"{'-':>11}"
+    after = mb(compact_columns[name]) if name in compact_columns else f"{'-':>11}"
+    print(f"{name:<18} | {before} | {after} | {compact[name].dtype if name in compact else 'dropped'}")
+print(f"{'total':<18} | {mb(legacy_columns.sum())} | {mb(compact_columns.sum())} |")
+
+
+def retained(build):
+    """Bytes still allocated after `build()` returns, including strings the result references."""
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size, result
+
+
+legacy_index_bytes, _ = retained(lambda: SafetyIndex.from_dataframe(legacy))
+compact_index_bytes, _ = retained(lambda: SafetyIndex.from_dataframe(compact))
+print(f"{'safety index':<18} | {mb(legacy_index_bytes)} | {mb(compact_index_bytes)} | alerts hold event ids, not descriptions")
+print(f"{'per worker':<18} | {mb(legacy_columns.sum() + legacy_index_bytes)} | {mb(compact_columns.sum() + compact_index_bytes)} |")
+
+build_legacy_ms, legacy_index = ms(lambda: SafetyIndex.from_dataframe(legacy), 1)
+build_compact_ms, compact_index = ms(lambda: SafetyIndex.from_dataframe(compact), 1)
+
+print(f"\n{'operation':<34} | {'previous':>10} | {'compact':>10}")
+print(f"{'prepare loaded frame':<34} | {load_legacy_ms:7.0f} ms | {load_compact_ms:7.0f} ms")
+print(f"{'build safety index':<34} | {build_legacy_ms:7.0f} ms | {build_compact_ms:7.0f} ms")
+
+for district in ('Idukki', 'wayanad'):
+    old_ms, old = ms(lambda: legacy_district_summary(legacy, district), 5)
+    new_ms, new = ms(lambda: compact_district_summary(compact, district), 5)
+    assert old == new, (old, new)
+    print(f"{'prediction summary ' + district:<34} | {old_ms:7.1f} ms | {new_ms:7.1f} ms")
+
+old_ms, _ = ms(lambda: legacy_location_features(legacy), 1)
+snapshot = RiskSnapshot(compact, compact_index, version='bench')
+new_ms, _ = ms(lambda: _location_features(snapshot, two_years_ago), 1)
+print(f"{'ML location features (daily)':<34} | {old_ms:7.0f} ms | {new_ms:7.0f} ms")
@@ -0,0 +1,90 @@
+# benchmarks/bench_route_alerts.py
+#
+# Alert construction in /api/generate-route as the risk log grows: the old
+# per-stop lowercase mask + iterrows() scan versus the precomputed alert
+# columns in backend.safety_index.SafetyIndex (built once per data load).
+#
+# Run from the project root:  python benchmarks/bench_route_alerts.py [max_rows]
+
+import datetime
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from backend.safety_index import SafetyIndex, ALERT_SEVERITY
+
+MAX_ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+base = pd.read_csv(os.path.join(ROOT, 'static', 'data', 'risklog.csv'))
+base.columns = [c.strip().lower().replace(' ', '_') for c in base.columns]
+rng = np.random.default_rng(11)
+now = datetime.datetime.now()
+two_years_ago = now - datetime.timedelta(days=730)
+
+
+def risk_log(rows):
+    """`rows` events resampled from the shipped risk log, spread over the last four years."""
+    df = base.iloc[rng.integers(0, len(base), rows)].reset_index(drop=True)
+    df['date'] = pd.Timestamp(now) - pd.to_timedelta(rng.integers(0, 4 * 365, rows), unit='D')
+    return df
+
+
+def alerts_with_iterrows(risk_log_df, stops):
+    """The original implementation."""
+    alerts = []
+    for stop in stops:
+        mask = ((risk_log_df['place'].str.lower() == stop['name'].lower()) & (risk_log_df['district'].str.lower() == stop['district'].lower()) & (risk_log_df['date'] > two_years_ago))
+        for _, alert_row in risk_log_df[mask].iterrows():
+            event_type = alert_row.get('disaster_event', 'Alert')
+            if str(event_type).lower() == 'none': continue
+            alerts.append({
+                'type': f"{str(event_type).capitalize()} in {stop['name']}",
+                'description': alert_row.get('description', 'No details available.'),
+                'date': alert_row['date'].strftime('%d %B %Y') if pd.notna(alert_row.get('date')) else 'N/A',
+                'severity_class': ALERT_SEVERITY.get(str(event_type).lower(), 'alert-low')
+            })
+    return alerts
+
+
+def alerts_with_index(index, stops):
+    alerts = []
+    for stop in stops:
+        for alert in index.alerts(stop['district'], stop['name'], since=two_years_ago):
+            alerts.append({
+                'type': f"{alert['event']} in {stop['name']}",
+                'description': alert['description'], 'date': alert['date'],
+                'severity_class': alert['severity_class']
+            })
+    return alerts
+
+
+def ms(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def as_set(alerts):
+    return sorted(tuple(sorted(a.items())) for a in alerts)
+
+
+places = base.dropna(subset=['place']).drop_duplicates(['district', 'place'])
+stops = [{'district': r.district, 'name': r.place} for r in places.head(3).itertuples()]
+
+print(f"{'rows':>9} | {'index build':>12} | {'iterrows':>12} | {'index lookup':>12} | alerts")
+for rows in (200, 10_000, 100_000, 1_000_000):
+    if rows > MAX_ROWS:
+        break
+    df = risk_log(rows)
+    build_ms, index = ms(lambda: SafetyIndex.from_dataframe(df), 1)
+    old_ms, old = ms(lambda: alerts_with_iterrows(df, stops), 1 if rows >= 100_000 else 5)
+    new_ms, new = ms(lambda: alerts_with_index(index, stops), 20)
+    assert as_set(old) == as_set(new)
+    print(f"{rows:>9} | {build_ms:>9.1f} ms | {old_ms:>9.2f} ms | {new_ms:>9.3f} ms | {len(new)}")
@@ -0,0 +1,86 @@
+# benchmarks/bench_route_history_storage.py
+#
+# RouteHistory.stops_data in the previous layout (a JSON list of stop dicts,
+# decoded on every `history.stops` read) versus the compact encoding
+# (models.encode_stops, decoded once per instance):
+#   storage   bytes per row and for the whole history
+#   rendering templates/user/_history_cards.html for a page of histories,
+#             which reads `history.stops` twice per card
+#
+# Run from the project root:  python benchmarks/bench_route_history_storage.py [routes]
+
+import datetime
+import json
+import os
+import sys
+import time
+
+import numpy as np
+from jinja2 import Environment, FileSystemLoader
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from models import RouteHistory, encode_stops, decode_stops
+
+ROUTES = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+PAGE = 500
+
+rng = np.random.default_rng(23)
+DISTRICTS = ('Idukki', 'Wayanad', 'Thiruvananthapuram', 'Alappuzha', 'Ernakulam', 'Kozhikode')
+LEVELS = (('Low Risk', 'safe'), ('Moderate Risk', 'caution'), ('High Risk', 'unsafe'))
+
+
+def random_stops():
+    stops = []
+    for _ in range(3):
+        text, css = LEVELS[rng.integers(0, 3)]
+        stops.append({'id': int(rng.integers(1, 5000)), 'name': f"Place {rng.integers(1, 5000)}",
+                      'district': DISTRICTS[rng.integers(0, len(DISTRICTS))], 'type': 'Hill',
+                      'budget': int(rng.integers(5, 100)) * 100, 'safety_text': text, 'safety_class': css})
+    return stops
+
+
+def histories(stops_data):
+    """Page of RouteHistory instances as the history views load them."""
+    page = []
+    for data in stops_data:
+        history = RouteHistory(source='Kozhikode', destination='Idukki', stops_data=data)
+        history.created_at = datetime.datetime(2026, 1, 1, 9, 30)
+        page.append(history)
+    return page
+
+
+routes = [random_stops() for _ in range(ROUTES)]
+legacy = [json.dumps(stops) for stops in routes]
+compact = [encode_stops(stops) for stops in routes]
+assert all(decode_stops(data) == stops for data, stops in zip(compact, routes))
+assert all(decode_stops(data) == stops for data, stops in zip(legacy, routes))
+
+legacy_bytes = sum(len(data.encode('utf-8')) for data in legacy)
+compact_bytes = sum(len(data.encode('utf-8')) for data in compact)
+print(f"{ROUTES} routes with 3 stops\n")
+print(f"{'stops_data':<22} | {'previous':>10} | {'compact':>10}")
+print(f"{'bytes per row':<22} | {legacy_bytes / ROUTES:10.0f} | {compact_bytes / ROUTES:10.0f}")
+print(f"{'total':<22} | {legacy_bytes / 1048576:7.2f} MB | {compact_bytes / 1048576:7.2f} MB")
+
+template = Environment(loader=FileSystemLoader(os.path.join(ROOT, 'templates'))).get_template('user/_history_cards.html')
+
+
+def render_ms(histories, repeat=5):
+    """Render time only; fresh instances each time, as every request loads its page from the database."""
+    total = 0.0
+    for _ in range(repeat):
+        page = histories()
+        start = time.perf_counter()
+        template.render(histories=page)
+        total += time.perf_counter() - start
+    return total / repeat * 1000
+
+
+decoded_once = RouteHistory.stops
+RouteHistory.stops = property(lambda self: json.loads(self.stops_data) if self.stops_data else [])  # previous property
+legacy_ms = render_ms(lambda: histories(legacy[:PAGE]))
+RouteHistory.stops = decoded_once
+compact_ms = render_ms(lambda: histories(compact[:PAGE]))
+print(f"{f'render {PAGE} cards':<22} | {legacy_ms:7.1f} ms | {compact_ms:7.1f} ms")
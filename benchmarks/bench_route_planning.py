@@ -0,0 +1,45 @@
+# benchmarks/bench_route_planning.py
+#
+# District path lookup for /api/generate-route: the precomputed all-pairs
+# table in backend.district_graph.DistrictGraph versus running Dijkstra on
+# demand, over all 14 x 14 district pairs.
+#
+# Run from the project root:  python benchmarks/bench_route_planning.py
+
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from backend.district_graph import DistrictGraph
+
+random.seed(7)
+
+
+def per_lookup_us(fn, pairs, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for source, destination in pairs:
+            fn(source, destination)
+    return (time.perf_counter() - start) / (rounds * len(pairs)) * 1e6
+
+
+for weight in (0.0, 0.5):
+    risk = {name: random.random() for name in DistrictGraph().districts} if weight else None
+
+    start = time.perf_counter()
+    graph = DistrictGraph(risk=risk, safety_weight=weight)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    pairs = [(a, b) for a in graph.districts for b in graph.districts]
+    # Sanity check: the table must agree with Dijkstra on every pair
+    for source, destination in pairs:
+        assert abs(graph.cost(source, destination) - graph.dijkstra(source, destination)[0]) < 1e-9
+
+    print(f"safety_weight={weight}  ({len(pairs)} pairs)")
+    print(f"  table build (Floyd-Warshall) : {build_ms:8.3f} ms")
+    print(f"  table lookup                 : {per_lookup_us(graph.path, pairs, 200):8.3f} us/path")
+    print(f"  Dijkstra on demand           : {per_lookup_us(graph.dijkstra, pairs, 200):8.3f} us/path")
@@ -0,0 +1,81 @@
+# benchmarks/bench_search_index.py
+#
+# Typeahead latency of /api/search-destinations at 100k destinations: the
+# ILIKE '%q%' query on Place/Name (one page, ordered by Name) versus the
+# in-memory backend.search_index.DestinationSearchIndex. Uses a throwaway
+# in-memory SQLite database.
+#
+# Run from the project root:  python benchmarks/bench_search_index.py [destinations]
+
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from flask import Flask
+
+from db import db
+from models import Destination
+from backend.search_index import DestinationSearchIndex
+
+COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+PAGE = 24
+
+random.seed(5)
+districts = ['Alappuzha', 'Ernakulam', 'Idukki', 'Kannur', 'Kasaragod', 'Kollam', 'Kottayam',
+             'Kozhikode', 'Malappuram', 'Palakkad', 'Pathanamthitta', 'Thiruvananthapuram', 'Thrissur', 'Wayanad']
+stems = ['Munnar', 'Kovalam', 'Varkala', 'Thekkady', 'Marari', 'Cherai', 'Bekal', 'Ponmudi', 'Vagamon',
+         'Athirappilly', 'Kumarakom', 'Ashtamudi', 'Banasura', 'Edakkal', 'Nelliyampathy', 'Silent Valley']
+kinds = ['Beach', 'Hills', 'Falls', 'Lake', 'Dam', 'Backwaters', 'Fort', 'Sanctuary', 'Viewpoint']
+words = ['scenic', 'quiet', 'monsoon', 'trekking', 'sunset', 'spice', 'tea', 'boating', 'wildlife', 'heritage']
+
+app = Flask('bench', root_path=ROOT)
+app.config.update(SQLALCHEMY_DATABASE_URI='sqlite://')
+db.init_app(app)
+
+with app.app_context():
+    db.create_all()
+    rows = [{
+        'Name': random.choice(districts),
+        'Place': f"{random.choice(stems)} {random.choice(kinds)} {i}",
+        'Type': random.choice(['beach', 'hill', 'wildlife']),
+        'Description': ' '.join(random.sample(words, 4)),
+        'budget': random.randint(500, 20000),
+    } for i in range(COUNT)]
+    db.session.execute(Destination.__table__.insert(), rows)
+    db.session.commit()
+
+    index = DestinationSearchIndex()
+    index.configure(lambda: db.session.query(Destination.Destination_id, Destination.Place, Destination.Name,
+                                             Destination.Type, Destination.Description).all())
+    start = time.perf_counter()
+    index.rebuild()
+    print(f"Destinations: {COUNT}   index build: {time.perf_counter() - start:.2f} s   {index.stats()}")
+
+    def ilike(q):
+        term = f"%{q}%"
+        return (Destination.query.filter(Destination.Place.ilike(term) | Destination.Name.ilike(term))
+                .order_by(Destination.Name, Destination.Destination_id).limit(PAGE + 1).all())
+
+    def ms(fn, repeat):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        return (time.perf_counter() - start) / repeat * 1000
+
+    def uncached(q):
+        index._clear_results()
+        return index.search(q, PAGE)
+
+    print(f"{'query':<16} | {'ILIKE page':>10} | {'index, new query':>16} | {'index, repeated':>15} | {'next page':>9} | matches")
+    for q in ('k', 'ko', 'kov', 'kovalam', 'munnar falls', 'idukki', 'valley', 'sunset', 'zzz'):
+        ilike_ms = ms(lambda: ilike(q), 5)
+        cold_ms = ms(lambda: uncached(q), 20)
+        warm_ms = ms(lambda: index.search(q, PAGE), 500)
+        ids, cursor = index.search(q, PAGE)
+        next_ms = ms(lambda: index.search(q, PAGE, after=cursor), 500) if cursor else 0.0
+        matches = len(index.search(q, 10 ** 7)[0])
+        print(f"{q:<16} | {ilike_ms:>7.2f} ms | {cold_ms:>13.3f} ms | {warm_ms:>12.4f} ms | {next_ms:>6.4f} ms | {matches}")
@@ -0,0 +1,115 @@
+# benchmarks/bench_worker_memory.py
+#
+# Memory per worker process for the risk data, with N forked workers alive at
+# once (as under Gunicorn):
+#   private   every worker loads the risk log and builds its own snapshot
+#   preload   the master builds and shares the snapshot, workers inherit the mapping
+#   mapped    the master saves the snapshot, each worker maps it itself (what a
+#             worker does after another worker publishes a change)
+# RSS counts shared pages in full, PSS splits them between the processes
+# mapping them, and USS is memory private to the worker.
+#
+# Run from the project root:  python benchmarks/bench_worker_memory.py [workers] [rows]
+
+import datetime
+import multiprocessing
+import os
+import sys
+import tempfile
+import warnings
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ['GEMINI_API_KEY'] = ''
+warnings.filterwarnings('ignore')
+
+from backend.aiservice import _prepare_risk_log
+from backend.risk_dataset import RiskDataset, RiskSnapshot
+from backend.safety_index import SafetyIndex
+
+WORKERS = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+ROWS = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+
+now = datetime.datetime.now()
+two_years_ago = now - datetime.timedelta(days=730)
+
+
+def raw_risk_log(rows):
+    """`rows` events resampled from the shipped risk log, as risk_store.load_dataframe returns them."""
+    base = pd.read_csv(os.path.join(ROOT, 'static', 'data', 'risklog.csv')).drop(columns=['description'])
+    rng = np.random.default_rng(5)
+    df = base.iloc[rng.integers(0, len(base), rows)].reset_index(drop=True)
+    df.insert(0, 'id', np.arange(1, rows + 1))
+    df['date'] = (pd.Timestamp(now) - pd.to_timedelta(rng.integers(0, 4 * 365, rows), unit='D')).strftime('%Y-%m-%d')
+    return df
+
+
+def memory_kb():
+    """Rss, Pss and Uss (private clean + dirty) of this process in kB."""
+    fields = {}
+    with open('/proc/self/smaps_rollup') as rollup:
+        for line in rollup:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return fields['Rss'], fields['Pss'], fields['Private_Clean'] + fields['Private_Dirty']
+
+
+def serve(dataset):
+    """Touches the whole snapshot the way requests do: every bucket and a per-district frame scan."""
+    snapshot = dataset.current
+    for district, place in snapshot.index.keys:
+        snapshot.index.counts(district, place, since=two_years_ago)
+        if place:
+            snapshot.index.alerts(district, place, since=two_years_ago)
+    df = snapshot.df
+    for district in df['district_key'].cat.categories:
+        rows = df[(df['district_key'] == district) & (df['date'] > two_years_ago)]
+        rows['disaster_event'].value_counts()
+        rows['disease_cases'].sum()
+
+
+def worker(mode, dataset, barrier, results):
+    before = memory_kb()
+    if mode in ('private', 'mapped'):
+        dataset.reload()  # 'mapped' finds the published version already saved and maps it
+    serve(dataset)
+    barrier.wait()  # every worker is alive and loaded before anyone measures
+    after = memory_kb()
+    results.put((before, after))
+    barrier.wait()
+
+
+def run(mode, raw_path, work_dir):
+    dataset = RiskDataset(prepare=_prepare_risk_log)
+    shared_dir = os.path.join(work_dir, mode, 'shared') if mode != 'private' else None
+    dataset.configure(lambda: pd.read_pickle(raw_path), os.path.join(work_dir, mode, 'stamp'), shared_dir)
+    if mode != 'private':
+        dataset.reload(publish=True)
+        if mode == 'mapped':
+            # Forget the master's mapping; workers find the saved snapshot of the published version
+            dataset.current = RiskSnapshot(pd.DataFrame(), SafetyIndex(), version='0')
+    context = multiprocessing.get_context('fork')
+    barrier, results = context.Barrier(WORKERS), context.Queue()
+    processes = [context.Process(target=worker, args=(mode, dataset, barrier, results)) for _ in range(WORKERS)]
+    for process in processes:
+        process.start()
+    samples = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    added = [tuple(a - b for a, b in zip(after, before)) for before, after in samples]
+    rss, pss, uss = (sum(column) / len(added) / 1024 for column in zip(*added))
+    print(f"{mode:<8} | {rss:9.1f} MB | {pss:9.1f} MB | {uss:9.1f} MB | {pss * WORKERS:9.1f} MB")
+
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as work_dir:
+        raw_path = os.path.join(work_dir, 'risklog.pkl')
+        raw_risk_log(ROWS).to_pickle(raw_path)
+        print(f"{WORKERS} workers, {ROWS} risk events; memory each worker added after forking")
+        print(f"{'mode':<8} | {'RSS':>12} | {'PSS':>12} | {'USS':>12} | {'PSS total':>12}")
+        for mode in ('private', 'preload', 'mapped'):
+            run(mode, raw_path, work_dir)
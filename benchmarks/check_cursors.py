@@ -0,0 +1,101 @@
+# benchmarks/check_cursors.py
+#
+# Checks that malformed ?cursor= values are treated as "first page" instead
+# of failing the request. Each cursor below (base64 of JSON that is not a
+# list, has the wrong length or the wrong types, or is not base64 at all) is
+# sent to /api/route-history and to /api/search-destinations, both with a
+# query (search index) and without one (database). Every response must be a
+# 200 with the first page. Exits 1 if one is not.
+#
+# Run from the project root:  python benchmarks/check_cursors.py
+
+import base64
+import datetime
+import json
+import os
+import sys
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+os.environ['GEMINI_API_KEY'] = ''
+warnings.filterwarnings('ignore')
+
+from flask import Flask
+
+from db import db
+from models import Destination, RouteHistory, User
+from backend.auth import auth_bp
+from backend.views import views_bp
+from backend.admin import admin_bp
+from backend.aiservice import ai_bp
+from backend.search_index import init_search_index
+
+
+def encoded(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+CURSORS = {
+    'object': encoded({}),
+    'object with keys': encoded({'0': '2024-01-01T00:00:00', '1': 5}),
+    'null': encoded(None),
+    'string': encoded('2024-01-01T00:00:00'),
+    'number': encoded(7),
+    'empty list': encoded([]),
+    'too short': encoded(['2024-01-01T00:00:00']),
+    'too long': encoded(['2024-01-01T00:00:00', 5, 9]),
+    'not a date': encoded(['yesterday', 5]),   # a valid (Name, id) cursor for destinations
+    'nested values': encoded([{'a': 1}, [2]]),
+    'not base64': '!!!',
+    'not json': base64.urlsafe_b64encode(b'\xff\xfe').decode('ascii'),
+}
+
+app = Flask('app', root_path=ROOT)
+app.config.update(SQLALCHEMY_DATABASE_URI='sqlite://', SECRET_KEY='check-cursors', TESTING=True,
+                  PROPAGATE_EXCEPTIONS=False)  # a failing request shows as a 500
+db.init_app(app)
+for blueprint in (auth_bp, views_bp, admin_bp, ai_bp):
+    app.register_blueprint(blueprint)
+
+with app.app_context():
+    db.create_all()
+    user = User(Username='check', name='check', Email='check@example.com', Password='x', role='user')
+    db.session.add(user)
+    db.session.add_all([Destination(Name='Idukki', Place=f'Hill View {i}', Type='hill', budget=1000)
+                        for i in range(30)])
+    db.session.flush()
+    now = datetime.datetime.now()
+    db.session.add_all([RouteHistory(user_id=user.User_id, source='Kochi', destination=f'Munnar {i}', stops_data='[]',
+                                     created_at=now - datetime.timedelta(minutes=i)) for i in range(15)])
+    db.session.commit()
+    user_id = user.User_id
+init_search_index(app, background=False)
+
+client = app.test_client()
+with client.session_transaction() as session:
+    session.update(user_id=user_id, role='user', username='check')
+
+endpoints = {
+    '/api/route-history': lambda cursor: client.get('/api/route-history', query_string={'cursor': cursor}),
+    '/api/search-destinations?q=hill': lambda cursor: client.get(
+        '/api/search-destinations', query_string={'q': 'hill', 'cursor': cursor}),
+    '/api/search-destinations': lambda cursor: client.get('/api/search-destinations', query_string={'cursor': cursor}),
+}
+
+failures = []
+print(f"{'endpoint':<34} | {'cursor':<16} | status")
+for endpoint, send in endpoints.items():
+    first_page = send('').get_json()
+    for name, cursor in CURSORS.items():
+        if name == 'not a date' and endpoint != '/api/route-history':
+            continue
+        response = send(cursor)
+        ok = response.status_code == 200 and response.get_json() == first_page
+        print(f"{endpoint:<34} | {name:<16} | {response.status_code}{'' if ok else '  FAILED'}")
+        if not ok:
+            failures.append(f'{endpoint} ({name})')
+
+print('every malformed cursor got the first page' if not failures else f"FAILED: {', '.join(failures)}")
+sys.exit(1 if failures else 0)
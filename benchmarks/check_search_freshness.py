@@ -0,0 +1,80 @@
+# benchmarks/check_search_freshness.py
+#
+# Checks that /api/search-destinations does not keep serving a page built
+# from a stale search index. A destination is inserted behind this worker's
+# back and destination_version is bumped, as another worker's admin write
+# does. The first search may still answer from the old index while it
+# rebuilds; once the rebuild finishes, the same search (with and without the
+# ETag of the first answer) must find the new destination. Exits 1 if not.
+#
+# Run from the project root:  python benchmarks/check_search_freshness.py
+
+import os
+import sys
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+os.environ['GEMINI_API_KEY'] = ''
+warnings.filterwarnings('ignore')
+
+from flask import Flask
+
+from db import db
+from models import Destination
+from backend.auth import auth_bp
+from backend.views import views_bp
+from backend.admin import admin_bp
+from backend.aiservice import ai_bp
+from backend.data_version import destination_version
+from backend.search_index import destination_index, init_search_index
+
+app = Flask('app', root_path=ROOT)
+app.config.update(SQLALCHEMY_DATABASE_URI='sqlite://', SECRET_KEY='search-freshness', TESTING=True)
+db.init_app(app)
+for blueprint in (auth_bp, views_bp, admin_bp, ai_bp):
+    app.register_blueprint(blueprint)
+
+with app.app_context():
+    db.create_all()
+    db.session.add_all([Destination(Name='Idukki', Place=f'Hill View {i}', Type='hill', budget=1000)
+                        for i in range(50)])
+    db.session.commit()
+init_search_index(app, background=False)
+
+client = app.test_client()
+failures = []
+
+
+def search(label, expect, headers=None):
+    response = client.get('/api/search-destinations?q=zebra', headers=headers or {})
+    places = [item['place'] for item in response.get_json()['items']] if response.status_code == 200 else []
+    ok = expect is None or (response.status_code == 200 and ('Zebra Point' in places) == expect)
+    print(f"{label:<40} | {response.status_code} | {places}")
+    if not ok:
+        failures.append(label)
+    return response
+
+
+search('before the insert', expect=False)
+
+# Another worker's admin write: the row is committed and the version bumped, this index is not touched
+with app.app_context():
+    db.session.add(Destination(Name='Wayanad', Place='Zebra Point', Type='wildlife', budget=1500))
+    db.session.commit()
+destination_version.bump()
+
+first = search('right after the bump (index may lag)', expect=None)
+thread = destination_index.rebuild_async()
+if thread is not None:
+    thread.join()
+while destination_index.version != destination_version.current():
+    destination_index.rebuild()
+
+search('after the rebuild', expect=True)
+if first.headers.get('ETag'):
+    search('after the rebuild, with the first ETag', expect=True, headers={'If-None-Match': first.headers['ETag']})
+
+print('search pages follow the index rebuild' if not failures else f"FAILED: {', '.join(failures)}")
+sys.exit(1 if failures else 0)
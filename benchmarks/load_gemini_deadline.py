@@ -0,0 +1,109 @@
+# benchmarks/load_gemini_deadline.py
+#
+# Checks that the Gemini pool drains after requests time out. A burst of
+# route predictions (distinct prompts, so nothing is coalesced) is sent
+# through gemini_client.shared_generate / wait_for, as /api/generate-route
+# does, to a local stand-in for the Gemini REST API that
+#   hangs        never answers within the deadline
+#   unavailable  answers 503 (the SDK's default retry repeated these for 10 minutes)
+# Every request falls back at its deadline. The check is that the calls left
+# on the pool finish soon after (within the deadline plus slack), and that
+# the next request after the upstream recovers gets a real answer instead of
+# queueing behind abandoned calls. Exits 1 if either fails.
+#
+# Needs google-generativeai; no API key or network access.
+#
+# Run from the project root:  python benchmarks/load_gemini_deadline.py [requests] [deadline seconds]
+
+import json
+import os
+import sys
+import threading
+import time
+import warnings
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+warnings.filterwarnings('ignore')
+
+import google.generativeai as genai
+
+from backend import gemini_client
+
+REQUESTS = int(sys.argv[1]) if len(sys.argv) > 1 else 4 * gemini_client.executor._max_workers
+DEADLINE = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+SLACK = 1.0
+ANSWER = json.dumps({'candidates': [{'content': {'parts': [{'text': '{"overall_safety_level": "Low Risk"}'}],
+                                                 'role': 'model'}, 'finishReason': 'STOP', 'index': 0}]}).encode()
+UNAVAILABLE = json.dumps({'error': {'code': 503, 'message': 'overloaded', 'status': 'UNAVAILABLE'}}).encode()
+upstream = {'mode': 'healthy'}
+
+
+class StandIn(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        mode = upstream['mode']
+        if mode == 'hangs':
+            time.sleep(60)
+            return
+        time.sleep(0.2 if mode == 'unavailable' else 0.05)
+        status, body = (503, UNAVAILABLE) if mode == 'unavailable' else (200, ANSWER)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def route_request(model, i, outcomes):
+    try:
+        gemini_client.wait_for(gemini_client.shared_generate(model, f"Predict risks for route {i}", DEADLINE), DEADLINE)
+        outcomes.append('answer')
+    except Exception:
+        outcomes.append('fallback')
+
+
+def run(model, mode):
+    upstream['mode'] = mode
+    outcomes = []
+    threads = [threading.Thread(target=route_request, args=(model, i, outcomes)) for i in range(REQUESTS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    burst_end = time.perf_counter()
+    while gemini_client.gemini_calls.stats()['in_flight'] and time.perf_counter() - burst_end < 30:
+        time.sleep(0.01)
+    drained = time.perf_counter() - burst_end
+    upstream['mode'] = 'healthy'
+    after = []
+    start = time.perf_counter()
+    route_request(model, f'{mode}-after', after)
+    next_ms = (time.perf_counter() - start) * 1000
+    print(f"{mode:<12} | {REQUESTS:>8} | {outcomes.count('fallback'):>9} | {drained:9.2f} s | {after[0]:>7} {next_ms:6.0f} ms")
+    return drained <= DEADLINE + SLACK and after[0] == 'answer'
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass  # clients hang up at their deadline
+
+
+if __name__ == '__main__':
+    server = StandInServer(('127.0.0.1', 0), StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    genai.configure(api_key='load-test', transport='rest',
+                    client_options={'api_endpoint': f'http://127.0.0.1:{server.server_port}'})
+    model = genai.GenerativeModel('gemini-flash-lite-latest')
+    print(f"{REQUESTS} route predictions at once, {gemini_client.executor._max_workers} pool threads, "
+          f"{DEADLINE:.1f} s deadline")
+    print(f"{'upstream':<12} | {'requests':>8} | {'fell back':>9} | {'drained':>11} | {'next request':>14}")
+    ok = all([run(model, 'hangs'), run(model, 'unavailable')])
+    print('pool drained after every burst' if ok else 'FAILED: abandoned calls kept the pool busy')
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,110 @@
+# benchmarks/load_route_history.py
+#
+# Load test of /api/generate-route on SQLite with route history written
+#   sync    in the request (ROUTE_HISTORY_FLUSH_SECONDS = 0, the previous behaviour)
+#   queued  by the background writer in bulk inserts (the default)
+# Every client thread logs in as its own user and requests routes back to
+# back; latency is measured around each request. Each mode runs in a fresh
+# interpreter against its own database file, and the saved rows are counted
+# at the end to check that no route was lost.
+#
+# Run from the project root:  python benchmarks/load_route_history.py [threads] [requests per thread]
+
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+THREADS = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+REQUESTS = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+ROUTES = [('Thiruvananthapuram', 'Idukki', 'hill'), ('Kozhikode', 'Wayanad', None),
+          ('Ernakulam', 'Alappuzha', None), ('Thrissur', 'Palakkad', None)]
+
+
+def client_run(app, user, latencies, barrier, errors):
+    import time
+    client = app.test_client()
+    client.post('/auth/login', data={'username': user, 'password': 'p'})
+    barrier.wait()
+    for i in range(REQUESTS):
+        source, destination, interest = ROUTES[i % len(ROUTES)]
+        start = time.perf_counter()
+        response = client.post('/api/generate-route', json={'source': source, 'destination': destination,
+                                                             'interest': interest, 'budget': '5000'})
+        latencies.append(time.perf_counter() - start)
+        if not (response.get_json() or {}).get('success'):
+            errors.append(f"{source} -> {destination}: {response.status_code}")
+
+
+def child(work_dir):
+    """Runs one mode (set through the environment) and prints its latency percentiles."""
+    import threading
+    import time
+    import warnings
+    import numpy as np
+    import pandas as pd
+
+    warnings.filterwarnings('ignore')
+    sys.path.insert(0, work_dir)
+    sys.path.insert(1, ROOT)
+    from app import create_app
+    from backend.history_writer import route_history
+    from models import db, Destination, User, RouteHistory
+
+    app = create_app()
+    with app.app_context():
+        pairs = pd.read_csv(os.path.join(ROOT, 'static', 'data', 'risklog.csv'))[['district', 'place']].drop_duplicates()
+        types = ('beach', 'hill', 'wildlife')
+        for i, (district, place) in enumerate(pairs.itertuples(index=False)):
+            db.session.add(Destination(Name=district, Place=place, Type=types[i % 3], Description=place,
+                                       budget=1000 + i * 50))
+        for t in range(THREADS):
+            db.session.add(User(Username=f'user{t}', name=f'user{t}', Email=f'user{t}@example.com',
+                                Password='p', role='user'))
+        db.session.commit()
+
+    latencies, errors, barrier = [], [], threading.Barrier(THREADS + 1)
+    threads = [threading.Thread(target=client_run, args=(app, f'user{t}', latencies, barrier, errors))
+               for t in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    if errors:
+        raise SystemExit(f"{len(errors)} route requests failed, e.g. {errors[0]}")
+    route_history.flush()
+    with app.app_context():
+        saved = RouteHistory.query.count()
+    ms = np.array(latencies) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    print(f"RESULT {p50:.2f} {p95:.2f} {p99:.2f} {ms.max():.2f} {len(ms) / elapsed:.0f} {saved}")
+
+
+def run(mode):
+    with tempfile.TemporaryDirectory() as work_dir:
+        with open(os.path.join(work_dir, 'config_local.py'), 'w') as config:
+            config.write(f"SQLALCHEMY_DATABASE_URI = 'sqlite:///{os.path.join(work_dir, 'app.db')}'\n"
+                         "SECRET_KEY = 'bench'\n")
+        env = dict(os.environ, GEMINI_API_KEY='', RISK_DATA_SHARED_DIR='', RISK_DATA_POLL_SECONDS='0',
+                   SEARCH_COUNT_FLUSH_SECONDS='0', ROUTE_HISTORY_FLUSH_SECONDS='0' if mode == 'sync' else '0.5',
+                   PYTHONWARNINGS='ignore')
+        result = subprocess.run([sys.executable, __file__, str(THREADS), str(REQUESTS), '--child', work_dir],
+                                cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+        line = next(line for line in result.stdout.splitlines() if line.startswith('RESULT '))
+        p50, p95, p99, worst, throughput, saved = line.split()[1:]
+        print(f"{mode:<7} | {p50:>8} | {p95:>8} | {p99:>8} | {worst:>8} | {throughput:>9} | {saved:>6}")
+
+
+if __name__ == '__main__':
+    if '--child' in sys.argv:
+        child(sys.argv[sys.argv.index('--child') + 1])
+    else:
+        print(f"{THREADS} threads x {REQUESTS} route requests, SQLite; latency in ms")
+        print(f"{'history':<7} | {'p50':>8} | {'p95':>8} | {'p99':>8} | {'max':>8} | {'req/s':>9} | {'saved':>6}")
+        for mode in ('sync', 'queued'):
+            run(mode)
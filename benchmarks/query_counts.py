@@ -0,0 +1,88 @@
+# benchmarks/query_counts.py
+#
+# Query-count harness for the favorites-related views: seeds an in-memory
+# SQLite database with many destinations and favorites, then counts the SQL
+# statements each view runs and asserts they stay within a fixed budget
+# that does not grow with the number of favorites.
+#
+# Run from the project root:  python benchmarks/query_counts.py [favorites]
+
+import os
+import sys
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+os.environ['GEMINI_API_KEY'] = ''
+warnings.filterwarnings('ignore')
+
+from flask import Flask
+from sqlalchemy import event
+
+from db import db
+from models import Destination, User
+from backend.auth import auth_bp
+from backend.views import views_bp
+from backend.admin import admin_bp
+from backend.aiservice import ai_bp
+
+FAVORITES = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+# Maximum statements per request, independent of FAVORITES
+BUDGETS = {
+    'GET /dashboard': 2,
+    'GET /search': 2,
+    'GET /favorites': 1,
+    'POST /api/favorites/add (new)': 1,
+    'POST /api/favorites/add (existing)': 2,
+    'POST /api/favorites/remove': 1,
+}
+
+app = Flask('app', root_path=ROOT)
+app.config.update(SQLALCHEMY_DATABASE_URI='sqlite://', SECRET_KEY='query-counts', TESTING=True)
+db.init_app(app)
+for blueprint in (auth_bp, views_bp, admin_bp, ai_bp):
+    app.register_blueprint(blueprint)
+
+with app.app_context():
+    db.create_all()
+    user = User(Username='bench', name='bench', Email='bench@example.com', Password='x', role='user')
+    destinations = [Destination(Name='Idukki', Place=f'Place {i}', Type='hill', budget=1000)
+                    for i in range(FAVORITES + 1)]
+    db.session.add_all([user] + destinations)
+    db.session.flush()
+    user.favorites.extend(destinations[:FAVORITES])
+    db.session.commit()
+    user_id, spare_id, existing_id = user.User_id, destinations[-1].Destination_id, destinations[0].Destination_id
+
+    statements = []
+    event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+
+client = app.test_client()
+with client.session_transaction() as session:
+    session.update(user_id=user_id, role='user', username='bench')
+
+requests = {
+    'GET /dashboard': lambda: client.get('/dashboard'),
+    'GET /search': lambda: client.get('/search'),
+    'GET /favorites': lambda: client.get('/favorites'),
+    'POST /api/favorites/add (new)': lambda: client.post(f'/api/favorites/add/{spare_id}'),
+    'POST /api/favorites/add (existing)': lambda: client.post(f'/api/favorites/add/{existing_id}'),
+    'POST /api/favorites/remove': lambda: client.post(f'/api/favorites/remove/{spare_id}'),
+}
+
+print(f"Favorites per user: {FAVORITES}")
+failures = []
+for name, send in requests.items():
+    statements.clear()
+    response = send()
+    count = len(statements)
+    status = 'ok' if count <= BUDGETS[name] and response.status_code < 400 else 'OVER BUDGET'
+    if status != 'ok':
+        failures.append(name)
+    print(f"{name:<36} {response.status_code}  {count:>3} queries (budget {BUDGETS[name]})  {status}")
+    for statement in statements if status != 'ok' else ():
+        print('    ', ' '.join(statement.split())[:140])
+
+assert not failures, f"Query budget exceeded: {failures}"
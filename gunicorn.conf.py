@@ -0,0 +1,26 @@
+# gunicorn.conf.py
+#
+# Usage: gunicorn -c gunicorn.conf.py "app:create_app()"
+#
+# The app is created once in the master (preload), which loads the risk data,
+# saves it to RISK_DATA_SHARED_DIR and maps it read-only. Forked workers
+# inherit that mapping, so the risk data and the safety model are held once
+# per host instead of once per worker.
+
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('WEB_CONCURRENCY', '4'))
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+preload_app = True
+
+
+def post_fork(server, worker):
+    from app import init_worker
+    init_worker(server.app.wsgi())
+
+
+def worker_exit(server, worker):
+    # Write the routes still queued by this worker before it goes away
+    from backend.history_writer import route_history
+    route_history.flush()
@@ -20,7 +20,8 @@ class User(db.Model):
     Create_id = db.Column(db.DateTime, nullable=False, default=datetime.datetime.now)
     role = db.Column(db.String(45), nullable=False)
 
-    favorites = db.relationship('Destination', secondary=user_favorites, lazy='subquery',
+    # Loaded only on access; views go through backend.favorites for ids and membership
+    favorites = db.relationship('Destination', secondary=user_favorites, lazy='select',
                                 backref=db.backref('favorited_by', lazy=True))
 
     route_histories = db.relationship('RouteHistory', backref='user', lazy=True, cascade="all, delete-orphan")
@@ -40,15 +41,27 @@ class Destination(db.Model):
     search_count = db.Column(db.Integer, nullable=False, default=0)
     image_url = db.Column(db.String(255), nullable=True)
 
+    # Keyset pagination of destination listings orders by (Name, Destination_id)
+    __table_args__ = (
+        db.Index('ix_destination_name_id', 'Name', 'Destination_id'),
+    )
+
+    # Per-instance safety result, filled by backend.aiservice.prefetch_safety or on first access
+    _safety_info = None
+
     @property
     def safety_info(self):
         """
         Dynamic property that returns a dictionary with safety rating data,
         calculated using the centralized safety function for consistency.
+        The result is kept on the instance, so repeated reads in a template cost nothing.
         """
+        if self._safety_info is not None:
+            return self._safety_info
         try:
             from backend.aiservice import calculate_safety
-            return calculate_safety(self.Name, self.Place)
+            self._safety_info = calculate_safety(self.Name, self.Place)
+            return self._safety_info
         except Exception as e:
             print(f"Error calculating safety for {self.Name}, {self.Place}: {e}")
             # Return a consistent default safety object if calculation fails
@@ -62,6 +75,34 @@ class Destination(db.Model):
         return f'<Destination {self.Name}>'
 
 
+# RouteHistory.stops_data encoding: a version prefix and one compact JSON array per stop,
+# [id, name, district, type, budget, level], where level indexes STOP_SAFETY_LEVELS.
+# Rows written before it hold a JSON list of stop dicts; decode_stops reads both.
+STOPS_FORMAT = 's1:'
+STOP_SAFETY_LEVELS = (('Low Risk', 'safe'), ('Moderate Risk', 'caution'), ('High Risk', 'unsafe'))
+_LEVEL_CODES = {text: code for code, (text, _) in enumerate(STOP_SAFETY_LEVELS)}
+_LEVEL_CLASSES = dict(STOP_SAFETY_LEVELS)
+
+def encode_stops(stops):
+    """Encodes route stops (the dicts generate_ai_route returns) for RouteHistory.stops_data."""
+    rows = [[stop['id'], stop['name'], stop['district'], stop['type'], stop['budget'],
+             _LEVEL_CODES.get(stop['safety_text'], stop['safety_text'])] for stop in stops]
+    return STOPS_FORMAT + json.dumps(rows, separators=(',', ':'), ensure_ascii=False)
+
+def decode_stops(data):
+    """Decodes RouteHistory.stops_data in either encoding back into stop dicts."""
+    if not data:
+        return []
+    if not data.startswith(STOPS_FORMAT):
+        return json.loads(data)
+    stops = []
+    for dest_id, name, district, type_, budget, level in json.loads(data[len(STOPS_FORMAT):]):
+        text = STOP_SAFETY_LEVELS[level][0] if isinstance(level, int) else level
+        stops.append({'id': dest_id, 'name': name, 'district': district, 'type': type_, 'budget': budget,
+                      'safety_text': text, 'safety_class': _LEVEL_CLASSES.get(text, 'caution')})
+    return stops
+
+
 # Model to store generated route history
 class RouteHistory(db.Model):
     __tablename__ = 'route_history'
@@ -74,10 +115,111 @@ class RouteHistory(db.Model):
     stops_data = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.datetime.now)
 
+    # A user's history is paged newest first by (created_at, id)
+    __table_args__ = (
+        db.Index('ix_route_history_user_created_id', 'user_id', 'created_at', 'id'),
+    )
+
+    # (stops_data, decoded stops) of this instance, so templates can read `stops` repeatedly
+    _stops = None
+
     @property
     def stops(self):
-        """Returns the stops data from JSON string."""
-        return json.loads(self.stops_data) if self.stops_data else []
+        """Returns the decoded stops; decoded once per instance unless stops_data changes."""
+        cached = self._stops
+        if cached is None or cached[0] is not self.stops_data:
+            cached = self._stops = (self.stops_data, decode_stops(self.stops_data))
+        return cached[1]
+
+    def __repr__(self):
+        return f'<RouteHistory {self.id} for User {self.user_id}>'
+
+# Model to store risk log events (replaces the read-modify-write risklog.csv)
+class RiskEvent(db.Model):
+    __tablename__ = 'risk_event'
+    id = db.Column(db.Integer, primary_key=True)
+    date = db.Column(db.Date, nullable=True, index=True)
+    district = db.Column(db.String(45), nullable=True, index=True)
+    place = db.Column(db.String(100), nullable=True, index=True)
+    temperature_c = db.Column(db.Float, nullable=True)
+    rainfall_mm = db.Column(db.Float, nullable=True)
+    humidity_percent = db.Column(db.Integer, nullable=True)
+    disease_cases = db.Column(db.Integer, nullable=True)
+    disaster_event = db.Column(db.String(45), nullable=True)
+    description = db.Column(db.Text, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_risk_event_district_place_date', 'district', 'place', 'date'),
+    )
+
+    def to_dict(self):
+        """Returns the event in the same shape as a risklog.csv row, plus its id."""
+        return {
+            'id': self.id,
+            'date': self.date.strftime('%Y-%m-%d') if self.date else None,
+            'district': self.district, 'place': self.place,
+            'temperature_c': self.temperature_c, 'rainfall_mm': self.rainfall_mm,
+            'humidity_percent': self.humidity_percent, 'disease_cases': self.disease_cases,
+            'disaster_event': self.disaster_event, 'description': self.description
+        }
+
+    def __repr__(self):
+        return f'<RiskEvent {self.id} {self.district}/{self.place}>'
+
+
+# Model to store the materialized safety result of every location in the risk log
+# (refreshed in the background by backend.safety_snapshot, read by calculate_safety)
+class SafetySnapshot(db.Model):
+    __tablename__ = 'safety_snapshot'
+    id = db.Column(db.Integer, primary_key=True)
+    district = db.Column(db.String(45), nullable=False)            # lowercased, as the safety index keys
+    place = db.Column(db.String(100), nullable=False, default='')  # '' for the whole district
+    score = db.Column(db.Integer, nullable=False)
+    level = db.Column(db.String(20), nullable=False)               # 'Low Risk', 'Moderate Risk' or 'High Risk'
+    disasters = db.Column(db.Integer, nullable=False, default=0)
+    disease = db.Column(db.Integer, nullable=False, default=0)
+    heat = db.Column(db.Integer, nullable=False, default=0)
+    rain = db.Column(db.Integer, nullable=False, default=0)
+    engine = db.Column(db.String(10), nullable=False)              # safety engine that scored the row
+    risk_version = db.Column(db.String(32), nullable=False)        # risk data version it was computed from
+    computed_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.now)
+
+    __table_args__ = (
+        db.Index('ix_safety_snapshot_district_place', 'district', 'place', unique=True),
+    )
 
     def __repr__(self):
-        return f'<RouteHistory {self.id} for User {self.user_id}>'
\ No newline at end of file
+        return f'<SafetySnapshot {self.district}/{self.place} {self.level}>'
+
+
+def ensure_indexes():
+    """
+    Creates indexes declared on the models that are missing from existing tables
+    (db.create_all only creates whole tables). Call inside an app context.
+    """
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+
+
+def compact_route_history(batch_size=1000):
+    """
+    Rewrites RouteHistory rows still stored as JSON dicts in the compact stops
+    encoding, in batches of `batch_size` rows. Returns the number of rows
+    rewritten. Call inside an app context; safe to run again.
+    """
+    table = RouteHistory.__table__
+    rewritten, last_id = 0, 0
+    while True:
+        rows = db.session.execute(
+            db.select(table.c.id, table.c.stops_data)
+            .where(table.c.id > last_id, ~table.c.stops_data.startswith(STOPS_FORMAT))
+            .order_by(table.c.id).limit(batch_size)
+        ).all()
+        if not rows:
+            return rewritten
+        db.session.execute(table.update().where(table.c.id == db.bindparam('row_id')),
+                           [{'row_id': row.id, 'stops_data': encode_stops(decode_stops(row.stops_data))} for row in rows])
+        db.session.commit()
+        rewritten += len(rows)
+        last_id = rows[-1].id